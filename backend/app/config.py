@@ -1,8 +1,11 @@
+import os
 from pathlib import Path
 
 MEDIA_DIR = Path(__file__).resolve().parent.parent.parent / "media"
 TRASH_DIR = MEDIA_DIR / ".trash"
 THUMBNAIL_DIR = MEDIA_DIR / ".thumbnails"
+UPLOAD_DIR = MEDIA_DIR / ".uploads"
+DOWNLOAD_DIR = MEDIA_DIR / ".downloads"
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".tiff", ".svg"}
 VIDEO_EXTENSIONS = {
@@ -16,3 +19,66 @@ VIDEO_EXTENSIONS = {
     ".m4v",
     ".ts",
 }
+
+# Import pipeline parallelism. Hashing runs on a process pool sized to the CPU
+# count by default; copies run on threads and mostly wait on disk I/O.
+IMPORT_HASH_WORKERS = int(os.environ.get("MEDIAHIVE_IMPORT_HASH_WORKERS", 0)) or (
+    os.cpu_count() or 1
+)
+IMPORT_COPY_WORKERS = int(os.environ.get("MEDIAHIVE_IMPORT_COPY_WORKERS", 4))
+# Files per import batch: one duplicate lookup, one bulk insert, one commit.
+IMPORT_BATCH_SIZE = int(os.environ.get("MEDIAHIVE_IMPORT_BATCH_SIZE", 500))
+
+# Shared outbound HTTP client (downloads and any other remote fetching).
+HTTP_MAX_CONNECTIONS = int(os.environ.get("MEDIAHIVE_HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("MEDIAHIVE_HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("MEDIAHIVE_HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = float(os.environ.get("MEDIAHIVE_HTTP_TIMEOUT", 120))
+# Negotiated through ALPN, so HTTP/1.1-only servers are unaffected
+HTTP_HTTP2 = os.environ.get("MEDIAHIVE_HTTP_HTTP2", "1") != "0"
+
+# Remote downloads. HLS segments are fetched concurrently within a sliding
+# window and appended to the output in playlist order.
+DOWNLOAD_SEGMENT_CONCURRENCY = int(
+    os.environ.get("MEDIAHIVE_DOWNLOAD_SEGMENT_CONCURRENCY", 8)
+)
+DOWNLOAD_SEGMENT_RETRIES = int(os.environ.get("MEDIAHIVE_DOWNLOAD_SEGMENT_RETRIES", 3))
+# Files at least this large are fetched as parallel ranged parts when the server
+# supports it.
+DOWNLOAD_PARALLEL_THRESHOLD = int(
+    os.environ.get("MEDIAHIVE_DOWNLOAD_PARALLEL_THRESHOLD", 64 * 1024 * 1024)
+)
+DOWNLOAD_PARALLEL_PARTS = int(os.environ.get("MEDIAHIVE_DOWNLOAD_PARALLEL_PARTS", 4))
+
+# Download queue: downloads running at once, overall and per remote host, and
+# how often a transient failure is retried.
+DOWNLOAD_CONCURRENCY = int(os.environ.get("MEDIAHIVE_DOWNLOAD_CONCURRENCY", 4))
+DOWNLOAD_PER_HOST = int(os.environ.get("MEDIAHIVE_DOWNLOAD_PER_HOST", 2))
+DOWNLOAD_RETRIES = int(os.environ.get("MEDIAHIVE_DOWNLOAD_RETRIES", 3))
+# Seconds during which a URL that was already downloaded is not fetched again;
+# after that a conditional request checks whether it changed.
+DOWNLOAD_URL_CACHE_TTL = int(os.environ.get("MEDIAHIVE_DOWNLOAD_URL_CACHE_TTL", 3600))
+
+# Video thumbnails are rendered by a background worker pool; this caps how many
+# ffmpeg processes run at once.
+THUMBNAIL_CONCURRENCY = int(os.environ.get("MEDIAHIVE_THUMBNAIL_CONCURRENCY", 2))
+THUMBNAIL_RETRIES = int(os.environ.get("MEDIAHIVE_THUMBNAIL_RETRIES", 3))
+# Thumbnails are rendered at each of these widths, in THUMBNAIL_IMAGE_FORMAT
+# ("webp" or "jpg"). Resource.thumbnail points at the default width.
+THUMBNAIL_WIDTHS = sorted(
+    int(w)
+    for w in os.environ.get("MEDIAHIVE_THUMBNAIL_WIDTHS", "160,320,640,1280").split(",")
+)
+THUMBNAIL_DEFAULT_WIDTH = int(os.environ.get("MEDIAHIVE_THUMBNAIL_DEFAULT_WIDTH", 320))
+# Automatic video thumbnails: the most representative of the first
+# THUMBNAIL_CANDIDATES keyframes from THUMBNAIL_SEEK seconds on.
+THUMBNAIL_SEEK = float(os.environ.get("MEDIAHIVE_THUMBNAIL_SEEK", 1))
+THUMBNAIL_CANDIDATES = int(os.environ.get("MEDIAHIVE_THUMBNAIL_CANDIDATES", 5))
+# Scrubbing previews: one frame every SPRITE_INTERVAL seconds, tiled into a
+# single sheet per video. Long videos use a longer interval so that the sheet
+# holds at most SPRITE_MAX_TILES frames.
+SPRITE_INTERVAL = float(os.environ.get("MEDIAHIVE_SPRITE_INTERVAL", 10))
+SPRITE_MAX_TILES = int(os.environ.get("MEDIAHIVE_SPRITE_MAX_TILES", 100))
+SPRITE_COLUMNS = int(os.environ.get("MEDIAHIVE_SPRITE_COLUMNS", 10))
+SPRITE_TILE_WIDTH = int(os.environ.get("MEDIAHIVE_SPRITE_TILE_WIDTH", 320))
+THUMBNAIL_IMAGE_FORMAT = os.environ.get("MEDIAHIVE_THUMBNAIL_IMAGE_FORMAT", "webp")
@@ -1,12 +1,25 @@
 from .image_format import to_jpg, to_png, to_webp
+from .image_thumbnail import make_placeholder, make_thumbnails, read_image_size
 from .image_ico import to_ico
 from .image_resize import resize_image
+from .media_header import read_image_header, read_media_header
 from .probe import probe_video
 from .remux import remux_to_mp4
+from .sprite import crop_tile, make_sprite_sheet
+from .thumbnail import extract_frame, frame_args
 from .transcode import transcode_to_mp4
 
 __all__ = [
+    "crop_tile",
+    "extract_frame",
+    "frame_args",
+    "make_placeholder",
+    "make_sprite_sheet",
+    "make_thumbnails",
     "probe_video",
+    "read_image_header",
+    "read_image_size",
+    "read_media_header",
     "remux_to_mp4",
     "transcode_to_mp4",
     "resize_image",
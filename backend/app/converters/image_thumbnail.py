@@ -0,0 +1,120 @@
+import base64
+import io
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from .media_header import read_image_header
+
+_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height
+_TRANSPOSED = {5, 6, 7, 8}
+
+
+def _flatten(img: Image.Image, ext: str) -> Image.Image:
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    if img.mode == "RGBA" and ext in (".jpg", ".jpeg"):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        img = background
+    return img
+
+
+def _save(img: Image.Image, output_path: Path) -> None:
+    ext = output_path.suffix.lower()
+    save_kwargs: dict = {"quality": 80}
+    if ext == ".webp":
+        save_kwargs["method"] = 4
+    else:
+        save_kwargs["optimize"] = True
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    _flatten(img, ext).save(output_path, **save_kwargs)
+
+
+def read_image_size(input_path: Path) -> tuple[int, int] | None:
+    """
+    Width and height as displayed, from the header only. None on failure.
+
+    PNG, JPEG, WebP and GIF headers are parsed directly; other formats are
+    opened with Pillow.
+    """
+    header = read_image_header(input_path)
+    if header is None:
+        try:
+            with Image.open(input_path) as img:
+                header = (*img.size, img.getexif().get(_ORIENTATION, 1))
+        except Exception:
+            return None
+    width, height, orientation = header
+    if orientation in _TRANSPOSED:
+        return height, width
+    return width, height
+
+
+def make_thumbnails(input_path: Path, outputs: dict[int, Path]) -> list[int]:
+    """
+    Write downscaled copies of an image, one per target width.
+
+    ``outputs`` maps a width to the path of that variant. The image is decoded
+    once: JPEGs are decoded with ``Image.draft``, which lets libjpeg scale the
+    image down by 1/2, 1/4 or 1/8 while decoding, so a phone photo is never
+    fully decoded. Each smaller variant is then resized (LANCZOS) from the
+    previous one rather than from the original.
+
+    Widths larger than the image are skipped rather than upscaled; an image
+    narrower than every width gets only the smallest variant, at its own size.
+    Output format is inferred from each path's extension (WebP or JPEG).
+    Returns the widths written, or an empty list on failure.
+    """
+    if not outputs:
+        return []
+    try:
+        with Image.open(input_path) as img:
+            widest = max(outputs)
+            # Stored width and height, as displayed once EXIF rotation is applied
+            width, height = img.size
+            if img.getexif().get(_ORIENTATION, 1) in _TRANSPOSED:
+                width, height = height, width
+            if width > widest:
+                # draft() picks the smallest scale that is still at least the
+                # requested size; a no-op for formats other than JPEG.
+                box = (widest, widest * height // width)
+                if (width, height) != img.size:
+                    box = box[::-1]
+                img.draft("RGB", box)
+            img = ImageOps.exif_transpose(img)
+            img.load()
+
+            widths = sorted((w for w in outputs if w <= img.width), reverse=True)
+            if not widths:
+                _save(img, outputs[min(outputs)])
+                return [min(outputs)]
+            for width in widths:
+                height = max(1, round(img.height * width / img.width))
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+                _save(img, outputs[width])
+            return sorted(widths)
+    except Exception:
+        return []
+
+
+def make_placeholder(input_path: Path, size: int = 16) -> str | None:
+    """
+    Encode a tiny blurred preview of an image as a ``data:`` URI.
+
+    The image is shrunk to fit ``size`` x ``size`` and saved as a low quality
+    WebP, typically well under 200 bytes once base64 encoded, so it can be
+    inlined in API responses and stretched (the browser blurs it) while the
+    real thumbnail loads. Returns None on failure.
+    """
+    try:
+        with Image.open(input_path) as img:
+            img.draft("RGB", (size, size))
+            img = img.convert("RGB")
+            img.thumbnail((size, size), Image.Resampling.BOX)
+            buf = io.BytesIO()
+            img.save(buf, format="WEBP", quality=30)
+        return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode()
+    except Exception:
+        return None
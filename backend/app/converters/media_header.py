@@ -0,0 +1,436 @@
+import mmap
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+
+from .probe import ProbeResult
+
+# format_name as reported by ffprobe, so that stored values do not depend on
+# which reader probed the file
+MP4_CONTAINER = "mov,mp4,m4a,3gp,3g2,mj2"
+MATROSKA_CONTAINER = "matroska,webm"
+
+# Box types a QuickTime/ISO BMFF file can start with
+_MP4_TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+
+# Sample entry type -> ffprobe codec_name. "mp4a" is resolved through esds.
+_MP4_CODECS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+    b"av01": "av1",
+    b"vp08": "vp8",
+    b"vp09": "vp9",
+    b"mp4v": "mpeg4",
+    b"Opus": "opus",
+    b"fLaC": "flac",
+    b"ac-3": "ac3",
+    b"ec-3": "eac3",
+    b".mp3": "mp3",
+    b"alac": "alac",
+}
+# MPEG-4 objectTypeIndication of an "mp4a" sample entry -> codec_name
+_MP4A_OBJECT_TYPES = {
+    0x40: "aac",
+    0x66: "aac",
+    0x67: "aac",
+    0x68: "aac",
+    0x69: "mp3",
+    0x6B: "mp3",
+}
+
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_TIMESTAMP_SCALE = 0x2AD7B1
+_MKV_DURATION = 0x4489
+_MKV_TRACKS = 0x1654AE6B
+_MKV_TRACK_ENTRY = 0xAE
+_MKV_TRACK_TYPE = 0x83
+_MKV_CODEC_ID = 0x86
+_MKV_VIDEO = 0xE0
+_MKV_PIXEL_WIDTH = 0xB0
+_MKV_PIXEL_HEIGHT = 0xBA
+_MKV_CLUSTER = 0x1F43B675
+
+# Matroska CodecID -> ffprobe codec_name. Any "A_AAC..." is AAC.
+_MATROSKA_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_AV1": "av1",
+    "V_VP8": "vp8",
+    "V_VP9": "vp9",
+    "A_OPUS": "opus",
+    "A_VORBIS": "vorbis",
+    "A_FLAC": "flac",
+    "A_AC3": "ac3",
+    "A_EAC3": "eac3",
+    "A_MPEG/L3": "mp3",
+}
+
+_ORIENTATION = 0x0112
+# JPEG start-of-frame markers (all SOFn but DHT, JPG and DAC)
+_JPEG_SOF = {
+    0xC0,
+    0xC1,
+    0xC2,
+    0xC3,
+    0xC5,
+    0xC6,
+    0xC7,
+    0xC9,
+    0xCA,
+    0xCB,
+    0xCD,
+    0xCE,
+    0xCF,
+}
+_WEBP_EXIF_FLAG = 0x08
+
+
+def read_media_header(path: Path) -> ProbeResult | None:
+    """
+    Read codecs, duration and frame size of an MP4/MOV or Matroska/WebM file
+    without spawning ffprobe.
+
+    The file is memory mapped and only its box (MP4) or element (Matroska)
+    headers are visited: the sample tables and media data are skipped by
+    size, so only a few KB at the start and around the ``moov`` box (often at
+    the end of the file) are ever read from disk.
+
+    Values match what ``probe_video`` reports for the same file. Returns None
+    for other formats and for anything not fully understood (fragmented MP4,
+    Matroska without a duration, an unknown codec, a truncated header...), in
+    which case the caller falls back to ffprobe.
+    """
+    try:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            if data[4:8] in _MP4_TOP_LEVEL:
+                return _read_mp4(data)
+            if data[:4] == _EBML_MAGIC:
+                return _read_matroska(data)
+            return None
+    except Exception:
+        return None
+
+
+def read_image_header(path: Path) -> tuple[int, int, int] | None:
+    """
+    Stored width, height and EXIF orientation of a PNG, JPEG, WebP or GIF.
+
+    Reads only the header through a memory map. Returns None for other
+    formats, and for WebP and PNG files carrying EXIF data, which are left to
+    Pillow.
+    """
+    try:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            if data[:8] == b"\x89PNG\r\n\x1a\n":
+                return _read_png(data)
+            if data[:2] == b"\xff\xd8":
+                return _read_jpeg(data)
+            if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+                return _read_webp(data)
+            if data[:6] in (b"GIF87a", b"GIF89a"):
+                return (*struct.unpack_from("<HH", data, 6), 1)
+            return None
+    except Exception:
+        return None
+
+
+# MP4 / QuickTime
+
+
+def _boxes(data: mmap.mmap, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield type, body start and body end of each box in ``data[start:end]``."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:  # extends to the end of the file
+            size = end - pos
+        if size < header or pos + size > end:
+            raise ValueError(f"truncated {kind!r} box")
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _child(data: mmap.mmap, start: int, end: int, *path: bytes) -> tuple[int, int]:
+    """Body start and end of the first box at ``path`` under ``data[start:end]``."""
+    for kind in path:
+        start, end = next((s, e) for k, s, e in _boxes(data, start, end) if k == kind)
+    return start, end
+
+
+def _media_time(data: mmap.mmap, pos: int) -> tuple[int, int]:
+    """Timescale and duration of an ``mvhd`` or ``mdhd`` body."""
+    if data[pos] == 1:
+        _, _, timescale, duration = struct.unpack_from(">QQIQ", data, pos + 4)
+    else:
+        _, _, timescale, duration = struct.unpack_from(">IIII", data, pos + 4)
+        if duration == 0xFFFFFFFF:
+            duration = 0
+    return timescale, duration
+
+
+def _descriptor(data: mmap.mmap, pos: int) -> tuple[int, int]:
+    """Tag and body start of an MPEG-4 descriptor."""
+    tag = data[pos]
+    pos += 1
+    for _ in range(4):  # size: up to four 7-bit groups
+        pos += 1
+        if not data[pos - 1] & 0x80:
+            break
+    return tag, pos
+
+
+def _mp4a_codec(data: mmap.mmap, start: int, end: int) -> str | None:
+    # Sound sample entry: QuickTime versions 1 and 2 append extra fields
+    (version,) = struct.unpack_from(">H", data, start + 8)
+    children = start + 28 + {0: 0, 1: 16, 2: 36}[version]
+    esds, _ = _child(data, children, end, b"esds")
+    tag, pos = _descriptor(data, esds + 4)
+    if tag != 0x03:  # ES_Descriptor
+        return None
+    flags = data[pos + 2]
+    pos += 3
+    if flags & 0x80:  # streamDependenceFlag
+        pos += 2
+    if flags & 0x40:  # URL_Flag
+        pos += 1 + data[pos]
+    if flags & 0x20:  # OCRstreamFlag
+        pos += 2
+    tag, pos = _descriptor(data, pos)
+    if tag != 0x04:  # DecoderConfigDescriptor
+        return None
+    return _MP4A_OBJECT_TYPES.get(data[pos])
+
+
+def _read_mp4(data: mmap.mmap) -> ProbeResult | None:
+    moov = _child(data, 0, len(data), b"moov")
+    timescale, duration = _media_time(data, _child(data, *moov, b"mvhd")[0])
+    if not timescale or not duration:  # fragmented: the duration is in moofs
+        return None
+
+    video = audio = None
+    width = height = None
+    for kind, start, end in _boxes(data, *moov):
+        if kind != b"trak":
+            continue
+        mdia = _child(data, start, end, b"mdia")
+        hdlr = _child(data, *mdia, b"hdlr")[0]
+        handler = data[hdlr + 8 : hdlr + 12]
+        if handler not in (b"vide", b"soun") or (
+            video if handler == b"vide" else audio
+        ):
+            continue
+        stsd, stsd_end = _child(data, *mdia, b"minf", b"stbl", b"stsd")
+        entry, body, entry_end = next(_boxes(data, stsd + 8, stsd_end))
+        if entry == b"mp4a":
+            codec = _mp4a_codec(data, body, entry_end)
+        else:
+            codec = _MP4_CODECS.get(entry)
+        if codec is None:
+            return None
+        if handler == b"vide":
+            video = codec
+            width, height = struct.unpack_from(">HH", data, body + 24)
+        else:
+            audio = codec
+
+    return ProbeResult(
+        video_codec=video,
+        audio_codec=audio,
+        container=MP4_CONTAINER,
+        duration=duration / timescale,
+        width=width,
+        height=height,
+    )
+
+
+# Matroska / WebM
+
+
+def _ebml_vint(data: mmap.mmap, pos: int, marker: bool) -> tuple[int | None, int]:
+    """
+    Read a variable length integer. IDs keep their length ``marker`` bit,
+    sizes drop it; a size with all value bits set (unknown) reads as None.
+    """
+    first = data[pos]
+    length = 1
+    while not first & (0x80 >> (length - 1)):
+        length += 1
+        if length > 8:
+            raise ValueError("invalid EBML integer")
+    value = first if marker else first & (0xFF >> length)
+    for byte in data[pos + 1 : pos + length]:
+        value = value << 8 | byte
+    if not marker and value == (1 << 7 * length) - 1:
+        return None, pos + length
+    return value, pos + length
+
+
+def _elements(data: mmap.mmap, start: int, end: int) -> Iterator[tuple[int, int, int]]:
+    """Yield ID, body start and body end of each element in ``data[start:end]``."""
+    pos = start
+    while pos < end:
+        element, pos = _ebml_vint(data, pos, marker=True)
+        size, pos = _ebml_vint(data, pos, marker=False)
+        stop = end if size is None else min(pos + size, end)
+        yield element, pos, stop
+        pos = stop
+
+
+def _uint(data: mmap.mmap, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big")
+
+
+def _read_matroska(data: mmap.mmap) -> ProbeResult | None:
+    _, _, header_end = next(_elements(data, 0, len(data)))
+    segment = next(
+        (s, e)
+        for i, s, e in _elements(data, header_end, len(data))
+        if i == _MKV_SEGMENT
+    )
+
+    info = tracks = None
+    for element, start, end in _elements(data, *segment):
+        if element == _MKV_INFO:
+            info = start, end
+        elif element == _MKV_TRACKS:
+            tracks = start, end
+        if element == _MKV_CLUSTER or (info and tracks):
+            break
+    if info is None or tracks is None:
+        return None
+
+    scale, duration = 1_000_000, None
+    for element, start, end in _elements(data, *info):
+        if element == _MKV_TIMESTAMP_SCALE:
+            scale = _uint(data, start, end)
+        elif element == _MKV_DURATION:
+            fmt = ">f" if end - start == 4 else ">d"
+            (duration,) = struct.unpack_from(fmt, data, start)
+    if not duration:
+        return None
+
+    video = audio = None
+    width = height = None
+    for element, start, end in _elements(data, *tracks):
+        if element != _MKV_TRACK_ENTRY:
+            continue
+        track_type, codec_id, size = None, "", (None, None)
+        for child, c_start, c_end in _elements(data, start, end):
+            if child == _MKV_TRACK_TYPE:
+                track_type = _uint(data, c_start, c_end)
+            elif child == _MKV_CODEC_ID:
+                codec_id = data[c_start:c_end].rstrip(b"\0").decode("ascii")
+            elif child == _MKV_VIDEO:
+                pixels = {
+                    i: _uint(data, s, e) for i, s, e in _elements(data, c_start, c_end)
+                }
+                size = pixels.get(_MKV_PIXEL_WIDTH), pixels.get(_MKV_PIXEL_HEIGHT)
+        if track_type not in (1, 2) or (video if track_type == 1 else audio):
+            continue
+        codec = (
+            "aac" if codec_id.startswith("A_AAC") else _MATROSKA_CODECS.get(codec_id)
+        )
+        if codec is None:
+            return None
+        if track_type == 1:
+            video = codec
+            width, height = size
+        else:
+            audio = codec
+
+    return ProbeResult(
+        video_codec=video,
+        audio_codec=audio,
+        container=MATROSKA_CONTAINER,
+        duration=duration * scale / 1e9,
+        width=width,
+        height=height,
+    )
+
+
+# Images
+
+
+def _read_png(data: mmap.mmap) -> tuple[int, int, int] | None:
+    width, height = struct.unpack_from(">II", data, 16)
+    # eXIf may carry an orientation; it is only honoured before the image data
+    pos = 8
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack_from(">I4s", data, pos)
+        if kind == b"eXIf":
+            return None
+        if kind == b"IDAT":
+            break
+        pos += 12 + length
+    return width, height, 1
+
+
+def _exif_orientation(data: mmap.mmap, tiff: int) -> int:
+    """Orientation tag of the IFD0 of the TIFF structure at ``tiff``."""
+    order = "<" if data[tiff : tiff + 2] == b"II" else ">"
+    (ifd,) = struct.unpack_from(order + "I", data, tiff + 4)
+    (count,) = struct.unpack_from(order + "H", data, tiff + ifd)
+    for i in range(count):
+        entry = tiff + ifd + 2 + 12 * i
+        tag, _, _, value = struct.unpack_from(order + "HHIH", data, entry)
+        if tag == _ORIENTATION:
+            return value
+    return 1
+
+
+def _read_jpeg(data: mmap.mmap) -> tuple[int, int, int] | None:
+    orientation = 1
+    pos = 2
+    while True:
+        while data[pos] == 0xFF and data[pos + 1] == 0xFF:  # fill bytes
+            pos += 1
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        pos += 2
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # no payload
+            continue
+        if marker in (0xD9, 0xDA):  # end of image, start of scan
+            return None
+        (length,) = struct.unpack_from(">H", data, pos)
+        if marker == 0xE1 and data[pos + 2 : pos + 8] == b"Exif\0\0":
+            orientation = _exif_orientation(data, pos + 8)
+        elif marker in _JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, pos + 3)
+            return width, height, orientation
+        pos += length
+
+
+def _read_webp(data: mmap.mmap) -> tuple[int, int, int] | None:
+    chunk = data[12:16]
+    if chunk == b"VP8 ":  # lossy: keyframe header after a 3-byte frame tag
+        if data[23:26] != b"\x9d\x01\x2a":
+            return None
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF, 1
+    if chunk == b"VP8L":  # lossless: 14-bit width-1 and height-1
+        if data[20] != 0x2F:
+            return None
+        (bits,) = struct.unpack_from("<I", data, 21)
+        return (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1, 1
+    if chunk == b"VP8X":  # extended: 24-bit canvas width-1 and height-1
+        if data[20] & _WEBP_EXIF_FLAG:
+            return None
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height, 1
+    return None
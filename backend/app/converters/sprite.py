@@ -0,0 +1,65 @@
+import asyncio
+from pathlib import Path
+
+from PIL import Image
+
+
+async def make_sprite_sheet(
+    video_path: Path,
+    output_path: Path,
+    *,
+    interval: float,
+    columns: int,
+    rows: int,
+    tile_width: int,
+) -> bool:
+    """
+    Render a grid of video frames, one every ``interval`` seconds, as a JPEG.
+
+    The whole sheet comes from a single ffmpeg pass:
+        fps=1/<interval>
+            Keep one frame per interval.
+        scale=<tile_width>:-2
+            Shrink each frame, keeping the aspect ratio (even height).
+        tile=<columns>x<rows>
+            Lay the frames out left to right, top to bottom; unused cells
+            at the end stay black.
+        -frames:v 1
+            Stop after the one tiled image.
+
+    Returns True on success, False on failure.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-i",
+            str(video_path),
+            "-vf",
+            f"fps=1/{interval},scale={tile_width}:-2,tile={columns}x{rows}",
+            "-frames:v",
+            "1",
+            "-q:v",
+            "3",
+            str(output_path),
+            "-y",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        await proc.communicate()
+        return proc.returncode == 0 and output_path.is_file()
+    except Exception:
+        return False
+
+
+def crop_tile(
+    sheet_path: Path, output_path: Path, index: int, columns: int, rows: int
+) -> bool:
+    """Save tile ``index`` of a sprite sheet as an image. Returns True on success."""
+    try:
+        with Image.open(sheet_path) as sheet:
+            tile_w, tile_h = sheet.width // columns, sheet.height // rows
+            x, y = (index % columns) * tile_w, (index // columns) * tile_h
+            sheet.crop((x, y, x + tile_w, y + tile_h)).save(output_path, quality=95)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+
+
+def frame_args(
+    video_path: Path,
+    output_path: Path,
+    timestamp: float = 1.0,
+    *,
+    exact: bool = True,
+    max_width: int | None = None,
+    candidates: int = 1,
+) -> list[str]:
+    """
+    Build the ffmpeg command extracting one frame of a video as a JPEG.
+
+    FFmpeg flags used:
+        -skip_frame nokey  (when not exact)
+            Have the decoder drop everything but keyframes, so that no
+            inter frame is ever decoded.
+        -ss <timestamp>
+            Seek before opening the input, which jumps to a keyframe.
+        -noaccurate_seek  (when not exact)
+            Take the keyframe at or before the timestamp instead of decoding
+            forward from it to the exact time. Videos shorter than the
+            timestamp then still yield their first keyframe.
+        -an -sn -dn
+            Ignore audio, subtitle and data streams.
+        -vf scale=w='min(<max_width>,iw)':h=-2
+            Downscale right after decoding (never upscale), so the rest of the
+            chain and the JPEG encoder only see a small frame.
+        -vf thumbnail=<candidates>
+            Keep the most representative of the next <candidates> frames (the
+            one closest to their average colour histogram), which skips black
+            and fade frames within the same single pass.
+        -frames:v 1
+            Stop after one video frame.
+        -q:v 2
+            High JPEG quality.
+    """
+    args = ["ffmpeg"]
+    if not exact:
+        args += ["-skip_frame", "nokey"]
+    args += ["-ss", str(timestamp)]
+    if not exact:
+        args += ["-noaccurate_seek"]
+    args += ["-i", str(video_path), "-an", "-sn", "-dn"]
+
+    filters = []
+    if max_width is not None:
+        filters.append(f"scale=w='min({max_width},iw)':h=-2")
+    if candidates > 1:
+        filters.append(f"thumbnail={candidates}")
+    if filters:
+        args += ["-vf", ",".join(filters)]
+
+    args += ["-frames:v", "1", "-q:v", "2", str(output_path), "-y"]
+    return args
+
+
+async def extract_frame(
+    video_path: Path,
+    output_path: Path,
+    timestamp: float = 1.0,
+    *,
+    exact: bool = True,
+    max_width: int | None = None,
+    candidates: int = 1,
+) -> bool:
+    """
+    Extract a single frame from a video as a JPEG.
+
+    Args:
+        video_path: Path to the source video.
+        output_path: Path where the JPEG will be written.
+        timestamp: Position of the frame in seconds.
+        exact: Decode up to the exact timestamp. Otherwise only keyframes are
+            decoded and the nearest one at or before the timestamp is used,
+            which is much faster on long, high-resolution videos.
+        max_width: Downscale the frame to at most this width.
+        candidates: Pick the most representative of this many frames
+            (keyframes when not exact) from the timestamp on.
+
+    Returns:
+        True on success, False on failure.
+    """
+    args = frame_args(
+        video_path,
+        output_path,
+        timestamp,
+        exact=exact,
+        max_width=max_width,
+        candidates=candidates,
+    )
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        await proc.communicate()
+        return proc.returncode == 0 and output_path.is_file()
+    except Exception:
+        return False
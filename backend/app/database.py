@@ -31,6 +31,34 @@ async def lifespan(app):
             "CREATE UNIQUE INDEX IF NOT EXISTS ix_resources_filename ON resources(filename)",
             "ALTER TABLE resources ADD COLUMN deleted_at DATETIME",
             "ALTER TABLE resources ADD COLUMN thumbnail VARCHAR",
+            "ALTER TABLE resources ADD COLUMN size INTEGER",
+            "CREATE INDEX IF NOT EXISTS ix_resources_size ON resources(size)",
+            "ALTER TABLE import_jobs ADD COLUMN strategy VARCHAR NOT NULL DEFAULT 'copy'",
+            "CREATE INDEX IF NOT EXISTS ix_download_jobs_url ON download_jobs(url)",
+            "ALTER TABLE resources ADD COLUMN thumbnail_status VARCHAR",
+            "ALTER TABLE resources ADD COLUMN thumbnail_attempts INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE resources ADD COLUMN thumbnail_error VARCHAR",
+            "CREATE INDEX IF NOT EXISTS ix_resources_thumbnail_status ON resources(thumbnail_status)",
+            "ALTER TABLE resources ADD COLUMN thumbnail_widths JSON",
+            "ALTER TABLE resources ADD COLUMN sprite VARCHAR",
+            "ALTER TABLE resources ADD COLUMN sprite_interval FLOAT",
+            "ALTER TABLE resources ADD COLUMN sprite_columns INTEGER",
+            "ALTER TABLE resources ADD COLUMN sprite_count INTEGER",
+            "ALTER TABLE resources ADD COLUMN placeholder VARCHAR",
+            "ALTER TABLE resources ADD COLUMN duration FLOAT",
+            "ALTER TABLE resources ADD COLUMN width INTEGER",
+            "ALTER TABLE resources ADD COLUMN height INTEGER",
+            "ALTER TABLE resources ADD COLUMN video_codec VARCHAR",
+            "ALTER TABLE resources ADD COLUMN audio_codec VARCHAR",
+            "ALTER TABLE resources ADD COLUMN container VARCHAR",
+            "ALTER TABLE resources ADD COLUMN probed_at DATETIME",
+            "CREATE INDEX IF NOT EXISTS ix_resources_duration ON resources(duration)",
+            "CREATE INDEX IF NOT EXISTS ix_resources_height ON resources(height)",
+            "CREATE INDEX IF NOT EXISTS ix_resources_video_codec ON resources(video_codec)",
+            "ALTER TABLE scan_index ADD COLUMN parent VARCHAR",
+            "CREATE INDEX IF NOT EXISTS ix_scan_index_parent ON scan_index(parent)",
+            # Rows from before the parent column are unreachable; rescan them
+            "DELETE FROM scan_index WHERE parent IS NULL",
         ]:
             try:
                 await conn.execute(text(stmt))
@@ -0,0 +1,185 @@
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+@dataclass
+class Variant:
+    uri: str
+    bandwidth: int = 0
+    resolution: tuple[int, int] | None = None
+
+    @property
+    def height(self) -> int:
+        return self.resolution[1] if self.resolution else 0
+
+
+@dataclass(frozen=True)
+class SegmentKey:
+    method: str
+    uri: str
+    iv: bytes | None = None
+
+
+@dataclass
+class Segment:
+    uri: str
+    # (length, offset) when only part of the resource is the segment
+    byterange: tuple[int, int] | None = None
+    key: SegmentKey | None = None
+    sequence: int = 0
+
+    @property
+    def iv(self) -> bytes:
+        """Explicit IV, or the media sequence number as the spec defaults to."""
+        if self.key and self.key.iv:
+            return self.key.iv
+        return self.sequence.to_bytes(16, "big")
+
+
+@dataclass
+class Playlist:
+    variants: list[Variant] = field(default_factory=list)
+    # Media segments in order, with EXT-X-MAP init sections inserted where the
+    # map changes, so writing every entry in turn yields a playable stream.
+    segments: list[Segment] = field(default_factory=list)
+    init_sections: int = 0
+
+    @property
+    def is_master(self) -> bool:
+        return bool(self.variants)
+
+
+def parse_attributes(value: str) -> dict[str, str]:
+    """Parse an HLS attribute list (``KEY=value,KEY="quoted, value"``)."""
+    return {
+        key: raw[1:-1] if raw.startswith('"') else raw
+        for key, raw in _ATTRIBUTE_RE.findall(value)
+    }
+
+
+def _parse_byterange(value: str, next_offset: int) -> tuple[int, int]:
+    length, _, offset = value.partition("@")
+    return int(length), int(offset) if offset else next_offset
+
+
+def _parse_key(attrs: dict[str, str], base_url: str) -> SegmentKey | None:
+    method = attrs.get("METHOD", "NONE")
+    if method == "NONE":
+        return None
+    if method != "AES-128":
+        raise ValueError(f"Unsupported HLS encryption method: {method}")
+    iv = attrs.get("IV")
+    return SegmentKey(
+        method=method,
+        uri=urljoin(base_url, attrs["URI"]),
+        iv=bytes.fromhex(iv[2:].rjust(32, "0")) if iv else None,
+    )
+
+
+def parse_playlist(text: str, base_url: str) -> Playlist:
+    """
+    Parse a master or media m3u8 playlist.
+
+    Handles ``EXT-X-STREAM-INF`` variants, ``EXT-X-KEY`` (AES-128),
+    ``EXT-X-MAP`` init sections and ``EXT-X-BYTERANGE`` segments. Relative
+    URIs are resolved against ``base_url``.
+    """
+    playlist = Playlist()
+    sequence = 0
+    key: SegmentKey | None = None
+    pending_variant: Variant | None = None
+    pending_range: str | None = None
+    # Where a byte range without an explicit offset starts, per resource
+    range_ends: dict[str, int] = {}
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        tag, _, value = line.partition(":")
+        if tag == "#EXT-X-STREAM-INF":
+            attrs = parse_attributes(value)
+            resolution = None
+            if "RESOLUTION" in attrs:
+                width, _, height = attrs["RESOLUTION"].partition("x")
+                resolution = (int(width), int(height))
+            pending_variant = Variant(
+                uri="",
+                bandwidth=int(attrs.get("BANDWIDTH", 0)),
+                resolution=resolution,
+            )
+        elif tag == "#EXT-X-MEDIA-SEQUENCE":
+            sequence = int(value)
+        elif tag == "#EXT-X-KEY":
+            key = _parse_key(parse_attributes(value), base_url)
+        elif tag == "#EXT-X-MAP":
+            attrs = parse_attributes(value)
+            uri = urljoin(base_url, attrs["URI"])
+            byterange = None
+            if "BYTERANGE" in attrs:
+                byterange = _parse_byterange(attrs["BYTERANGE"], 0)
+            playlist.segments.append(
+                Segment(uri=uri, byterange=byterange, key=key, sequence=sequence)
+            )
+            playlist.init_sections += 1
+        elif tag == "#EXT-X-BYTERANGE":
+            pending_range = value
+        elif line.startswith("#"):
+            continue
+        elif pending_variant is not None:
+            pending_variant.uri = urljoin(base_url, line)
+            playlist.variants.append(pending_variant)
+            pending_variant = None
+        else:
+            uri = urljoin(base_url, line)
+            byterange = None
+            if pending_range is not None:
+                byterange = _parse_byterange(pending_range, range_ends.get(uri, 0))
+                range_ends[uri] = byterange[1] + byterange[0]
+                pending_range = None
+            playlist.segments.append(
+                Segment(uri=uri, byterange=byterange, key=key, sequence=sequence)
+            )
+            sequence += 1
+
+    return playlist
+
+
+def select_variant(variants: list[Variant], max_height: int | None = None) -> Variant:
+    """
+    Pick the highest-bandwidth variant, optionally capped at ``max_height``.
+
+    Falls back to the smallest variant when none fits under the cap.
+    """
+    candidates = variants
+    if max_height is not None:
+        fitting = [v for v in variants if v.height and v.height <= max_height]
+        candidates = fitting or [min(variants, key=lambda v: (v.height, v.bandwidth))]
+    return max(candidates, key=lambda v: (v.bandwidth, v.height))
+
+
+class SegmentDecryptor:
+    """
+    Incremental AES-128-CBC decryption of one segment.
+
+    ``update`` can be fed network chunks of any size as they arrive; the
+    PKCS#7 padding is stripped in ``finalize``.
+    """
+
+    def __init__(self, key: bytes, iv: bytes):
+        self._decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        self._unpadder = padding.PKCS7(128).unpadder()
+
+    def update(self, chunk: bytes) -> bytes:
+        return self._unpadder.update(self._decryptor.update(chunk))
+
+    def finalize(self) -> bytes:
+        return self._unpadder.update(self._decryptor.finalize()) + (
+            self._unpadder.finalize()
+        )
@@ -0,0 +1,90 @@
+import httpx
+
+from app.config import (
+    HTTP_HTTP2,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_TIMEOUT,
+)
+
+_client: httpx.AsyncClient | None = None
+_requests_total = 0
+
+
+async def _on_request(request: httpx.Request) -> None:
+    global _requests_total
+    _requests_total += 1
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide client used for all outbound HTTP.
+
+    Sharing one client lets downloads reuse pooled keep-alive connections
+    (and HTTP/2 multiplexing with servers that offer it) instead of paying a fresh
+    TCP/TLS handshake per request.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=HTTP_TIMEOUT,
+            http2=HTTP_HTTP2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [_on_request]},
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def http_pool_stats() -> dict:
+    """
+    Connection pool usage of the shared client, for tuning its limits.
+
+    httpx does not expose its pool, so the connection and queue figures come
+    from httpx/httpcore internals; they read as None if a release changes
+    those.
+    """
+    stats = {
+        "http2": HTTP_HTTP2,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+        "requests_total": _requests_total,
+        "requests_queued": 0,
+        "connections": 0,
+        "connections_idle": 0,
+        "connections_active": 0,
+    }
+    if _client is None or _client.is_closed:
+        return stats
+    try:
+        pool = _client._transport._pool
+        connections = list(pool.connections)
+        idle = sum(1 for c in connections if c.is_idle())
+        # Requests waiting for a free connection (max_connections reached)
+        queued = sum(1 for r in pool._requests if r.connection is None)
+    except Exception:
+        for key in (
+            "requests_queued",
+            "connections",
+            "connections_idle",
+            "connections_active",
+        ):
+            stats[key] = None
+        return stats
+    stats["connections"] = len(connections)
+    stats["connections_idle"] = idle
+    stats["connections_active"] = len(connections) - idle
+    stats["requests_queued"] = queued
+    return stats
@@ -1,10 +1,13 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 
 from app.config import MEDIA_DIR, THUMBNAIL_DIR
-from app.database import lifespan
+from app.database import lifespan as database_lifespan
+from app.http_client import close_http_client
 from app.routers import (
     bookmarks,
     convert,
@@ -12,9 +15,37 @@ from app.routers import (
     imports,
     resources,
     stats,
+    storage,
     tags,
+    thumbnails,
     trash,
 )
+from app.storage import ShardedStaticFiles, shutdown_hash_pool
+
+
+@asynccontextmanager
+async def lifespan(app):
+    async with database_lifespan(app):
+        backfill = asyncio.create_task(resources.backfill_resource_sizes())
+        await imports.resume_import_jobs()
+        await resources.resume_download_jobs()
+        await thumbnails.start_thumbnail_workers()
+        thumbnail_backfill = asyncio.create_task(thumbnails.backfill_thumbnails())
+        placeholder_backfill = asyncio.create_task(thumbnails.backfill_placeholders())
+        probe_backfill = asyncio.create_task(thumbnails.backfill_probes())
+        sprite_backfill = asyncio.create_task(thumbnails.backfill_sprites())
+        yield
+        backfill.cancel()
+        thumbnail_backfill.cancel()
+        placeholder_backfill.cancel()
+        probe_backfill.cancel()
+        sprite_backfill.cancel()
+        await imports.shutdown_import_jobs()
+        await resources.shutdown_download_jobs()
+        await thumbnails.stop_thumbnail_workers()
+        await close_http_client()
+        shutdown_hash_pool()
+
 
 app = FastAPI(title="MediaHive", version="0.1.0", lifespan=lifespan)
 
@@ -34,11 +65,15 @@ app.include_router(bookmarks.router, prefix="/api")
 app.include_router(stats.router, prefix="/api")
 app.include_router(trash.router, prefix="/api")
 app.include_router(convert.router, prefix="/api")
+app.include_router(storage.router, prefix="/api")
+app.include_router(thumbnails.router, prefix="/api")
 
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
 THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/api/thumbnails", StaticFiles(directory=THUMBNAIL_DIR), name="thumbnails")
-app.mount("/api/media", StaticFiles(directory=MEDIA_DIR), name="media")
+app.mount(
+    "/api/thumbnails", ShardedStaticFiles(directory=THUMBNAIL_DIR), name="thumbnails"
+)
+app.mount("/api/media", ShardedStaticFiles(directory=MEDIA_DIR), name="media")
 
 
 @app.get("/")
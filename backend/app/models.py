@@ -1,6 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Table, func
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Table,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -45,10 +56,42 @@ class Resource(Base):
     filename: Mapped[str | None] = mapped_column(String, nullable=True, unique=True)
     title: Mapped[str | None] = mapped_column(String, nullable=True)
     folder: Mapped[str | None] = mapped_column(String, nullable=True)
+    size: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
     )
     thumbnail: Mapped[str | None] = mapped_column(String, nullable=True, default=None)
+    # "pending", "ready", "failed", or "removed" once the user deleted it.
+    # None for files that get no thumbnail (SVGs, bookmarks) and for legacy
+    # rows the startup backfill has not queued yet.
+    thumbnail_status: Mapped[str | None] = mapped_column(
+        String, nullable=True, default=None, index=True
+    )
+    thumbnail_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    thumbnail_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Widths rendered alongside `thumbnail`; None for single-size legacy ones
+    thumbnail_widths: Mapped[list[int] | None] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )
+    # Media metadata, read once at ingest (ffprobe for videos, the header for
+    # images). probed_at is set even when probing failed.
+    duration: Mapped[float | None] = mapped_column(Float, nullable=True, index=True)
+    width: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    height: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    video_codec: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
+    audio_codec: Mapped[str | None] = mapped_column(String, nullable=True)
+    container: Mapped[str | None] = mapped_column(String, nullable=True)
+    probed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Inline low quality preview (data: URI) shown until the thumbnail loads;
+    # empty when none could be encoded from the thumbnail
+    placeholder: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Scrubbing preview sheet of a video: sprite_count frames, one every
+    # sprite_interval seconds, in rows of sprite_columns. sprite_count is 0
+    # when rendering it failed.
+    sprite: Mapped[str | None] = mapped_column(String, nullable=True)
+    sprite_interval: Mapped[float | None] = mapped_column(Float, nullable=True)
+    sprite_columns: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sprite_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     deleted_at: Mapped[datetime | None] = mapped_column(
         DateTime, nullable=True, default=None
     )
@@ -73,3 +116,89 @@ class Bookmark(Base):
     tags: Mapped[list["Tag"]] = relationship(
         secondary=bookmark_tags, back_populates="bookmarks", lazy="selectin"
     )
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    title: Mapped[str | None] = mapped_column(String, nullable=True)
+    tags: Mapped[list[str]] = mapped_column(JSON, nullable=False, default=list)
+    size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[str | None] = mapped_column(String, nullable=True)
+    offset: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    strategy: Mapped[str] = mapped_column(String, nullable=False, default="copy")
+    # Requested files as [{"path": ..., "type": ...}]; deferred because the
+    # list can be large and status polling never needs it.
+    files: Mapped[list[dict]] = mapped_column(JSON, nullable=False, deferred=True)
+    total_files: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # files[:files_done] have been fully processed and committed
+    files_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    imported: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    bytes_copied: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class DownloadJob(Base):
+    __tablename__ = "download_jobs"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    url: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    ext: Mapped[str] = mapped_column(String, nullable=False)
+    max_height: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    status: Mapped[str] = mapped_column(
+        String, nullable=False, default="pending", index=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    bytes_received: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resource_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class DownloadSource(Base):
+    """The resource a URL was downloaded into, with the response's validators."""
+
+    __tablename__ = "download_sources"
+
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+    etag: Mapped[str | None] = mapped_column(String, nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(String, nullable=True)
+    resource_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ScanIndexEntry(Base):
+    """Last seen stat of a scanned file or directory, keyed by absolute path."""
+
+    __tablename__ = "scan_index"
+
+    path: Mapped[str] = mapped_column(String, primary_key=True)
+    # Containing directory, so a scan loads one directory's entries at a time
+    parent: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    is_dir: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(Integer, nullable=False)
+    inode: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -11,12 +11,18 @@ from app.config import MEDIA_DIR
 from app.converters.image_format import to_jpg, to_png, to_webp
 from app.converters.image_ico import to_ico
 from app.converters.image_resize import resize_image
-from app.converters.probe import probe_video
 from app.converters.remux import remux_to_mp4
 from app.converters.transcode import transcode_to_mp4
 from app.database import get_db
 from app.models import Resource
+from app.routers.thumbnails import (
+    enqueue_thumbnail,
+    probe_resource,
+    stored_probe,
+    wants_thumbnail,
+)
 from app.schemas import ResourceResponse
+from app.storage import commit_temp, find_file, shard_path
 
 router = APIRouter(tags=["Convert"])
 
@@ -35,7 +41,7 @@ async def _get_resource(resource_id: int, db: AsyncSession, category: str) -> Re
 
 def _build_source_path(resource: Resource) -> Path:
     """Build the source file path and validate it exists."""
-    source_path = MEDIA_DIR / (resource.folder or "") / resource.filename
+    source_path = find_file(MEDIA_DIR, resource.filename, resource.folder)
     if not source_path.is_file():
         raise HTTPException(status_code=400, detail="Source file not found")
     return source_path
@@ -56,13 +62,9 @@ async def _finalize_conversion(
     sha256 = hashlib.sha256(content).hexdigest()
     new_filename = f"{sha256}.{ext}"
 
-    folder_path = MEDIA_DIR / (resource.folder or "")
-    final_path = folder_path / new_filename
+    final_path = shard_path(MEDIA_DIR, new_filename)
 
-    if final_path.exists():
-        temp_path.unlink(missing_ok=True)
-    else:
-        temp_path.rename(final_path)
+    commit_temp(temp_path, final_path)
 
     # Build new title: replace extension in original title
     original_title = resource.title or resource.filename
@@ -74,10 +76,14 @@ async def _finalize_conversion(
         title=new_title,
         filename=new_filename,
         folder=resource.folder,
+        size=len(content),
+        thumbnail_status="pending" if wants_thumbnail(new_filename) else None,
     )
     db.add(new_resource)
     await db.commit()
     await db.refresh(new_resource)
+    if new_resource.thumbnail_status == "pending":
+        enqueue_thumbnail(new_resource.id)
     return new_resource
 
 
@@ -96,7 +102,7 @@ async def convert_resize(
 
     ext = source_path.suffix.lstrip(".")
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
+    temp_path = MEDIA_DIR / temp_name
 
     ok = await asyncio.to_thread(
         resize_image,
@@ -126,7 +132,7 @@ async def convert_webp(
 
     ext = "webp"
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
+    temp_path = MEDIA_DIR / temp_name
 
     ok = await asyncio.to_thread(to_webp, source_path, temp_path, body.quality)
     if not ok:
@@ -149,7 +155,7 @@ async def convert_jpg(
 
     ext = "jpg"
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
+    temp_path = MEDIA_DIR / temp_name
 
     ok = await asyncio.to_thread(to_jpg, source_path, temp_path, body.quality)
     if not ok:
@@ -166,7 +172,7 @@ async def convert_png(resource_id: int, db: AsyncSession = Depends(get_db)):
 
     ext = "png"
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
+    temp_path = MEDIA_DIR / temp_name
 
     ok = await asyncio.to_thread(to_png, source_path, temp_path)
     if not ok:
@@ -189,7 +195,7 @@ async def convert_ico(
 
     ext = "ico"
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
+    temp_path = MEDIA_DIR / temp_name
 
     ok = await asyncio.to_thread(to_ico, source_path, temp_path, body.sizes)
     if not ok:
@@ -216,10 +222,14 @@ async def convert_mp4(
 
     ext = "mp4"
     temp_name = f"{uuid.uuid4()}.{ext}"
-    temp_path = MEDIA_DIR / (resource.folder or "") / temp_name
-
-    # Probe codec to decide: remux (fast) vs transcode (re-encode)
-    probe = await probe_video(source_path)
+    temp_path = MEDIA_DIR / temp_name
+
+    # Stored codecs decide: remux (fast) vs transcode (re-encode). Videos
+    # ingested before probing was stored are probed once here.
+    if resource.probed_at is None:
+        await probe_resource(resource)
+        await db.commit()
+    probe = stored_probe(resource)
     if probe and probe.is_mp4_ready:
         ok = await remux_to_mp4(source_path, temp_path)
     else:
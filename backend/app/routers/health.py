@@ -1,8 +1,16 @@
 from fastapi import APIRouter
 
+from app.http_client import http_pool_stats
+
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@router.get("/health/http")
+async def http_pool():
+    """Usage of the shared outbound HTTP connection pool."""
+    return http_pool_stats()
@@ -1,22 +1,50 @@
-import hashlib
+import asyncio
+import json
 import os
-import shutil
+import stat
+import time
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import IMAGE_EXTENSIONS, MEDIA_DIR, VIDEO_EXTENSIONS
-from app.database import get_db
-from app.models import Resource
+from app.config import (
+    IMAGE_EXTENSIONS,
+    IMPORT_BATCH_SIZE,
+    IMPORT_COPY_WORKERS,
+    MEDIA_DIR,
+    TRASH_DIR,
+    VIDEO_EXTENSIONS,
+)
+from app.database import async_session, get_db
+from app.models import ImportJob, Resource, ScanIndexEntry
+from app.routers.thumbnails import enqueue_thumbnail, wants_thumbnail
 from app.schemas import (
+    ImportFileItem,
+    ImportJobResponse,
+    ImportJobStatus,
     ImportRequest,
     ImportResponse,
+    ImportStrategy,
     ScanRequest,
     ScanResponse,
     ScannedFile,
 )
+from app.storage import (
+    StoredFile,
+    copy_hashed,
+    find_file,
+    hash_file,
+    partial_hash,
+    place_file,
+    shard_path,
+)
 
 router = APIRouter(prefix="/imports", tags=["Imports"])
 
@@ -32,66 +60,684 @@ def _classify(ext: str) -> str | None:
     return None
 
 
-@router.post("/scan", response_model=ScanResponse)
-async def scan_folder(body: ScanRequest):
-    folder = Path(body.path)
-    if not folder.exists() or not folder.is_dir():
+# (is_dir, size, mtime_ns, inode)
+_IndexRow = tuple[bool, int, int, int]
+# (path, stat, indexed row) of a directory waiting to be scanned
+_PendingDir = tuple[str, os.stat_result, _IndexRow | None]
+
+# Directories read per round trip to the scan index and the worker thread
+_SCAN_DIR_BATCH = 64
+
+
+class _TreeScanner:
+    """
+    Walk a folder with ``os.scandir`` against the persistent scan index.
+
+    A directory whose mtime and inode match the index has had no entries added,
+    removed or renamed, so in incremental mode it is not listed again: its
+    indexed files are taken as unchanged and only its subdirectories are
+    stat'ed and descended into (a change deep in a subtree does not bubble up
+    to its ancestors' mtime). Files rewritten in place without a rename are
+    only picked up by a full scan. Everything else is listed, and the stat
+    from the directory read is reused.
+
+    Directories are scanned in batches and the index is consulted one batch of
+    directories at a time, so memory is bounded by the batch and the pending
+    directories rather than the size of the tree. Index rows of entries that
+    are no longer listed are dropped along with their subtrees.
+    """
+
+    def __init__(self, root: str, incremental: bool):
+        self.root = root
+        self.incremental = incremental
+        self.updates: list[dict] = []
+        self.removed: list[str] = []
+        self.removed_trees: list[str] = []
+        self.dirs_scanned = 0
+        self.files_seen = 0
+        self.files_matched = 0
+
+    def _record(self, path: str, row: _IndexRow, indexed: _IndexRow | None) -> bool:
+        """Queue an index update for ``path`` if new or changed."""
+        if indexed == row:
+            return False
+        is_dir, size, mtime_ns, inode = row
+        self.updates.append(
+            {
+                "path": path,
+                "parent": os.path.dirname(path),
+                "is_dir": is_dir,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "inode": inode,
+            }
+        )
+        return True
+
+    def scan(
+        self, dirs: list[_PendingDir], children: dict[str, dict[str, _IndexRow]]
+    ) -> tuple[list[ScannedFile], list[_PendingDir]]:
+        """
+        Scan a batch of directories given the indexed entries of each one.
+
+        Returns the matching files and the subdirectories still to scan.
+        """
+        files: list[ScannedFile] = []
+        subdirs: list[_PendingDir] = []
+        for dirpath, st, indexed in dirs:
+            self.dirs_scanned += 1
+            known = children.get(dirpath, {})
+            dir_unchanged = not self._record(
+                dirpath, (True, 0, st.st_mtime_ns, st.st_ino), indexed
+            )
+
+            if self.incremental and dir_unchanged:
+                for child, row in known.items():
+                    if not row[0]:
+                        self.files_seen += 1
+                        continue
+                    try:
+                        subdirs.append((child, os.stat(child), row))
+                    except OSError:
+                        continue
+                continue
+
+            try:
+                entries = os.scandir(dirpath)
+            except OSError:
+                continue
+            # path -> is_dir of every entry the index keeps
+            listed: dict[str, bool] = {}
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in EXCLUDED_DIRS:
+                                est = entry.stat(follow_symlinks=False)
+                                listed[entry.path] = True
+                                subdirs.append((entry.path, est, known.get(entry.path)))
+                            continue
+                        if not entry.is_file():
+                            continue
+                        file_type = _classify(Path(entry.name).suffix.lower())
+                        if file_type is None:
+                            continue
+                        est = entry.stat()
+                    except OSError:
+                        continue
+                    listed[entry.path] = False
+                    changed = self._record(
+                        entry.path,
+                        (False, est.st_size, est.st_mtime_ns, est.st_ino),
+                        known.get(entry.path),
+                    )
+                    self.files_seen += 1
+                    if changed or not self.incremental:
+                        self.files_matched += 1
+                        files.append(
+                            ScannedFile(
+                                path=entry.path,
+                                name=entry.name,
+                                type=file_type,
+                                size=est.st_size,
+                            )
+                        )
+
+            for child, row in known.items():
+                if child not in listed:
+                    self.removed.append(child)
+                if row[0] and not listed.get(child, False):
+                    self.removed_trees.append(child)
+        return files, subdirs
+
+
+async def _load_scan_children(
+    db: AsyncSession, dirs: list[str]
+) -> dict[str, dict[str, _IndexRow]]:
+    """Indexed entries directly inside each of ``dirs``, keyed by directory."""
+    result = await db.execute(
+        select(
+            ScanIndexEntry.parent,
+            ScanIndexEntry.path,
+            ScanIndexEntry.is_dir,
+            ScanIndexEntry.size,
+            ScanIndexEntry.mtime_ns,
+            ScanIndexEntry.inode,
+        ).where(ScanIndexEntry.parent.in_(dirs))
+    )
+    children: dict[str, dict[str, _IndexRow]] = {}
+    for parent, path, is_dir, size, mtime_ns, inode in result.all():
+        # The filesystem root is its own parent
+        if path != parent:
+            children.setdefault(parent, {})[path] = (is_dir, size, mtime_ns, inode)
+    return children
+
+
+async def _save_scan_updates(db: AsyncSession, scanner: _TreeScanner) -> None:
+    """Write and clear the scanner's queued index changes."""
+    updates, scanner.updates = scanner.updates, []
+    for i in range(0, len(updates), IMPORT_BATCH_SIZE):
+        stmt = sqlite_insert(ScanIndexEntry).values(updates[i : i + IMPORT_BATCH_SIZE])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ScanIndexEntry.path],
+                set_={
+                    "parent": stmt.excluded.parent,
+                    "is_dir": stmt.excluded.is_dir,
+                    "size": stmt.excluded.size,
+                    "mtime_ns": stmt.excluded.mtime_ns,
+                    "inode": stmt.excluded.inode,
+                },
+            )
+        )
+    removed, scanner.removed = scanner.removed, []
+    for i in range(0, len(removed), IMPORT_BATCH_SIZE):
+        await db.execute(
+            delete(ScanIndexEntry).where(
+                ScanIndexEntry.path.in_(removed[i : i + IMPORT_BATCH_SIZE])
+            )
+        )
+    trees, scanner.removed_trees = scanner.removed_trees, []
+    for tree in trees:
+        # A range rather than LIKE, which is case-insensitive in SQLite
+        await db.execute(
+            delete(ScanIndexEntry).where(
+                ScanIndexEntry.path > tree + os.sep,
+                ScanIndexEntry.path < tree + chr(ord(os.sep) + 1),
+            )
+        )
+    # A directory's row lands together with its entries, so an interrupted
+    # scan never marks a directory unchanged without what it contains
+    await db.commit()
+
+
+async def _walk_scan(
+    db: AsyncSession, scanner: _TreeScanner
+) -> AsyncIterator[list[ScannedFile]]:
+    """Scan the tree batch by batch, saving each batch's index changes after it."""
+    root = scanner.root
+    result = await db.execute(
+        select(
+            ScanIndexEntry.is_dir,
+            ScanIndexEntry.size,
+            ScanIndexEntry.mtime_ns,
+            ScanIndexEntry.inode,
+        ).where(ScanIndexEntry.path == root)
+    )
+    indexed = result.first()
+    stack: list[_PendingDir] = [
+        (root, await asyncio.to_thread(os.stat, root), indexed and tuple(indexed))
+    ]
+    while stack:
+        batch = stack[-_SCAN_DIR_BATCH:]
+        del stack[-_SCAN_DIR_BATCH:]
+        children = await _load_scan_children(db, [path for path, _, _ in batch])
+        files, subdirs = await asyncio.to_thread(scanner.scan, batch, children)
+        stack.extend(subdirs)
+        yield files
+        # Only once the batch was taken: a stream that stops before then
+        # leaves its files to be reported again by the next incremental scan
+        await _save_scan_updates(db, scanner)
+
+
+async def _scan_root(path: str) -> str:
+    root = os.path.abspath(path)
+    if not await asyncio.to_thread(os.path.isdir, root):
         raise HTTPException(
             status_code=400, detail="Path does not exist or is not a directory"
         )
+    return root
 
-    files: list[ScannedFile] = []
-    for dirpath, dirnames, filenames in os.walk(folder):
-        dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
-        for fname in filenames:
-            ext = Path(fname).suffix.lower()
-            file_type = _classify(ext)
-            if file_type is None:
-                continue
-            full_path = Path(dirpath) / fname
-            files.append(
-                ScannedFile(
-                    path=str(full_path),
-                    name=fname,
-                    type=file_type,
-                    size=full_path.stat().st_size,
+
+@router.post("/scan", response_model=ScanResponse)
+async def scan_folder(body: ScanRequest, db: AsyncSession = Depends(get_db)):
+    root = await _scan_root(body.path)
+    scanner = _TreeScanner(root, body.incremental)
+    files = [f async for batch in _walk_scan(db, scanner) for f in batch]
+
+    return ScanResponse(files=files)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event) + "\n").encode()
+
+
+@router.post("/scan/stream")
+async def scan_folder_stream(body: ScanRequest):
+    """
+    Scan a folder and stream results as NDJSON while the walk runs.
+
+    Emits ``{"event": "file", "file": ScannedFile}`` per matching file and
+    ``{"event": "progress", ...}`` counters after every batch of directories,
+    ending with ``{"event": "done", ...}``. The walk advances only as fast as
+    the client reads, and neither results nor the scan index are held in full.
+    """
+    root = await _scan_root(body.path)
+
+    async def events() -> AsyncIterator[bytes]:
+        async with async_session() as db:
+            scanner = _TreeScanner(root, body.incremental)
+
+            def progress(event: str) -> bytes:
+                return _ndjson(
+                    {
+                        "event": event,
+                        "dirs": scanner.dirs_scanned,
+                        "files": scanner.files_seen,
+                        "matched": scanner.files_matched,
+                    }
                 )
+
+            async for batch in _walk_scan(db, scanner):
+                for scanned in batch:
+                    yield _ndjson(
+                        {"event": "file", "file": scanned.model_dump(mode="json")}
+                    )
+                yield progress("progress")
+            yield progress("done")
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _stat_source(item: ImportFileItem) -> tuple[Path, int] | None:
+    src = Path(item.path)
+    try:
+        st = src.stat()
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return src, st.st_size
+
+
+def _existing_path(filename: str, folder: str | None, deleted: bool) -> Path:
+    if deleted:
+        return find_file(TRASH_DIR, filename)
+    return find_file(MEDIA_DIR, filename, folder)
+
+
+async def _import_batch(
+    db: AsyncSession, job: ImportJob, batch: list[ImportFileItem]
+) -> None:
+    """
+    Import one batch of files, then commit it together with the job cursor.
+
+    Duplicates are found without hashing most files. Only a file whose size
+    and extension match an existing resource is fingerprinted (first and last
+    blocks), and only a matching fingerprint triggers a full SHA-256 on the
+    process pool. With the copy strategy every other file is hashed while it
+    is being copied, which reads it once instead of twice; the other
+    strategies hash on the process pool and then link or move the file.
+    Moves happen in order after hashing, and each moved file is committed
+    right away with the cursor just past it, since its source is then gone.
+    """
+    sources = await asyncio.gather(
+        *(asyncio.to_thread(_stat_source, item) for item in batch)
+    )
+
+    # Existing resources of the same size and extension are the only
+    # possible duplicates
+    sizes = {source[1] for source in sources if source}
+    result = await db.execute(
+        select(
+            Resource.filename,
+            Resource.folder,
+            Resource.deleted_at.isnot(None),
+            Resource.size,
+        ).where(Resource.size.in_(sizes))
+    )
+    existing_rows = result.all()
+    # find_file stats each candidate location, so look them up off the loop
+    paths = await asyncio.to_thread(
+        lambda: [
+            _existing_path(filename, folder, deleted)
+            for filename, folder, deleted, _ in existing_rows
+        ]
+    )
+    candidates: dict[tuple[int, str], list[tuple[str, Path]]] = {}
+    for (filename, _, _, size), path in zip(existing_rows, paths):
+        ext = Path(filename).suffix.lower()
+        candidates.setdefault((size, ext), []).append((filename, path))
+
+    fingerprints: dict[Path, asyncio.Task] = {}
+
+    def fingerprint(path: Path) -> asyncio.Task:
+        if path not in fingerprints:
+            fingerprints[path] = asyncio.create_task(
+                asyncio.to_thread(partial_hash, path)
             )
+        return fingerprints[path]
 
-    return ScanResponse(files=files)
+    async def is_possible_duplicate(src: Path, matches: list[tuple[str, Path]]):
+        own = await fingerprint(src)
+        for _, path in matches:
+            try:
+                if await fingerprint(path) == own:
+                    return True
+            except OSError:
+                # Existing file is unreadable, only a full hash can tell
+                return True
+        return False
 
+    copy_slots = asyncio.Semaphore(IMPORT_COPY_WORKERS)
+    # Moved files are placed one at a time below, each committed with its row
+    moving = job.strategy == ImportStrategy.move.value
 
-@router.post("/execute", response_model=ImportResponse)
-async def execute_import(body: ImportRequest, db: AsyncSession = Depends(get_db)):
+    async def process(source: tuple[Path, int]) -> StoredFile | str:
+        """Return the stored copy, or the name of the existing duplicate."""
+        src, size = source
+        ext = src.suffix.lower()
+        sha256 = None
+        matches = candidates.get((size, ext))
+        if matches and await is_possible_duplicate(src, matches):
+            sha256 = await hash_file(src)
+            new_name = f"{sha256}{ext}"
+            if any(filename == new_name for filename, _ in matches):
+                return new_name
+
+        if job.strategy == ImportStrategy.copy.value:
+            async with copy_slots:
+                return await asyncio.to_thread(copy_hashed, src, MEDIA_DIR, ext)
+
+        # Linking or moving never reads the file, so hash it on its own
+        sha256 = sha256 or await hash_file(src)
+        dest = shard_path(MEDIA_DIR, f"{sha256}{ext}")
+        if not moving:
+            async with copy_slots:
+                await asyncio.to_thread(place_file, src, dest, job.strategy)
+        return StoredFile(sha256=sha256, path=dest, size=size)
+
+    readable = [source for source in sources if source]
+    results = iter(
+        await asyncio.gather(
+            *(process(source) for source in readable), return_exceptions=True
+        )
+    )
+    outcomes = [next(results) if source else None for source in sources]
+
+    # Catch content already present under a name whose size was not known,
+    # and identical files within this batch
+    stored_names = {o.filename for o in outcomes if isinstance(o, StoredFile)}
+    existing = set(
+        (
+            await db.scalars(
+                select(Resource.filename).where(Resource.filename.in_(stored_names))
+            )
+        ).all()
+    )
+
+    done = job.files_done
+    rows: list[dict] = []
+    for position, (item, source, outcome) in enumerate(
+        zip(batch, sources, outcomes), start=1
+    ):
+        if source is None or isinstance(outcome, OSError):
+            job.failed += 1
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        elif isinstance(outcome, str) or outcome.filename in existing:
+            job.skipped += 1
+        else:
+            row = {
+                "category": item.type.value,
+                "title": Path(item.path).name,
+                "filename": outcome.filename,
+                "size": outcome.size,
+                "thumbnail_status": (
+                    "pending" if wants_thumbnail(outcome.filename) else None
+                ),
+            }
+            if moving:
+                # The source is gone once moved, so its row is committed
+                # straight away, even if the job is cancelled meanwhile
+                step = asyncio.ensure_future(
+                    _move_and_record(db, job, source[0], outcome, row, done + position)
+                )
+                try:
+                    moved = await asyncio.shield(step)
+                except asyncio.CancelledError:
+                    await asyncio.gather(step, return_exceptions=True)
+                    raise
+                if moved:
+                    existing.add(outcome.filename)
+                continue
+            existing.add(outcome.filename)
+            rows.append(row)
+            job.imported += 1
+            job.bytes_copied += outcome.size
+
+    job.files_done = done + len(batch)
+    await _commit_rows(db, rows)
+
+
+async def _move_and_record(
+    db: AsyncSession,
+    job: ImportJob,
+    src: Path,
+    stored: StoredFile,
+    row: dict,
+    files_done: int,
+) -> bool:
+    """Move a source into storage and commit its row with the job cursor."""
+    try:
+        await asyncio.to_thread(place_file, src, stored.path, "move")
+    except OSError:
+        job.failed += 1
+        return False
+    job.imported += 1
+    job.bytes_copied += stored.size
+    job.files_done = files_done
+    await _commit_rows(db, [row])
+    return True
+
+
+async def _commit_rows(db: AsyncSession, rows: list[dict]) -> None:
+    """Insert imported resources, commit with the job, and queue thumbnails."""
+    pending: list[int] = []
+    if rows:
+        result = await db.execute(
+            insert(Resource).returning(Resource.id, Resource.thumbnail_status), rows
+        )
+        pending = [id_ for id_, status in result.all() if status == "pending"]
+    await db.commit()
+    for resource_id in pending:
+        enqueue_thumbnail(resource_id)
+
+
+async def _run_import(
+    db: AsyncSession, job: ImportJob, items: list[ImportFileItem]
+) -> None:
+    """
+    Import ``items[job.files_done:]`` and record progress on ``job``.
+
+    Each batch is looked up with set-based queries, bulk inserted and
+    committed together with the job cursor, which bounds memory and
+    transaction size and lets an interrupted job resume from the last
+    committed batch.
+    """
     MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+    for start in range(job.files_done, len(items), IMPORT_BATCH_SIZE):
+        await _import_batch(db, job, items[start : start + IMPORT_BATCH_SIZE])
 
-    imported = 0
-    skipped = 0
 
-    for item in body.files:
-        src = Path(item.path)
-        if not src.is_file():
-            continue
+# ---------------------------------------------------------------------------
+# Background import jobs
+# ---------------------------------------------------------------------------
+
+# Live state for jobs running in this process. The persisted ImportJob row is
+# the source of truth; these only drive cancellation and rate estimates.
+_job_tasks: dict[str, asyncio.Task] = {}
+_job_clock: dict[str, tuple[float, int, int]] = {}
+_cancel_requested: set[str] = set()
+
+
+def _items_of(files: list[dict]) -> list[ImportFileItem]:
+    return [ImportFileItem.model_validate(f) for f in files]
 
-        sha256 = hashlib.sha256(src.read_bytes()).hexdigest()
-        ext = src.suffix.lower()
-        new_name = f"{sha256}{ext}"
-        dest = MEDIA_DIR / new_name
 
-        # Check if resource with same url (hash filename) already exists
-        existing = await db.scalar(
-            select(Resource).where(Resource.filename == new_name)
+async def _execute_job(
+    db: AsyncSession, job: ImportJob, items: list[ImportFileItem]
+) -> None:
+    # Rolling back expires ``job``; its id must not be read lazily afterwards
+    job_id = job.id
+    job.status = ImportJobStatus.running.value
+    job.started_at = datetime.now(timezone.utc)
+    await db.commit()
+    _job_clock[job_id] = (time.monotonic(), job.files_done, job.bytes_copied)
+
+    try:
+        await _run_import(db, job, items)
+    except asyncio.CancelledError:
+        await db.rollback()
+        # On shutdown the job stays "running" so it resumes on restart
+        if job_id in _cancel_requested:
+            job = await db.get(ImportJob, job_id)
+            job.status = ImportJobStatus.cancelled.value
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+        raise
+    except Exception as exc:
+        await db.rollback()
+        job = await db.get(ImportJob, job_id)
+        job.status = ImportJobStatus.failed.value
+        job.error = str(exc)
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+        raise
+    else:
+        job.status = ImportJobStatus.completed.value
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+    finally:
+        _job_clock.pop(job_id, None)
+        _cancel_requested.discard(job_id)
+
+
+async def _run_job(job_id: str) -> None:
+    try:
+        async with async_session() as db:
+            job = await db.get(ImportJob, job_id)
+            if job is None:
+                return
+            files = await db.scalar(
+                select(ImportJob.files).where(ImportJob.id == job_id)
+            )
+            await _execute_job(db, job, _items_of(files))
+    except Exception:
+        # Already recorded on the job row
+        pass
+    finally:
+        _job_tasks.pop(job_id, None)
+
+
+def _start_job(job_id: str) -> None:
+    _job_tasks[job_id] = asyncio.create_task(_run_job(job_id))
+
+
+async def resume_import_jobs() -> None:
+    """Restart jobs that were pending or running when the server stopped."""
+    async with async_session() as db:
+        result = await db.execute(
+            select(ImportJob.id).where(
+                ImportJob.status.in_(
+                    [ImportJobStatus.pending.value, ImportJobStatus.running.value]
+                )
+            )
         )
-        if existing:
-            skipped += 1
-            continue
+        for job_id in result.scalars().all():
+            _start_job(job_id)
+
+
+async def shutdown_import_jobs() -> None:
+    """Stop running jobs, keeping their committed progress for resumption."""
+    tasks = list(_job_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 
-        if not dest.exists():
-            shutil.copy2(src, dest)
+def _job_response(job: ImportJob) -> ImportJobResponse:
+    response = ImportJobResponse.model_validate(job)
+    clock = _job_clock.get(job.id)
+    if clock is not None:
+        started, files_base, bytes_base = clock
+        elapsed = time.monotonic() - started
+        if elapsed > 0:
+            response.bytes_per_second = (job.bytes_copied - bytes_base) / elapsed
+            response.files_per_second = (job.files_done - files_base) / elapsed
+            if response.files_per_second > 0:
+                response.eta_seconds = (
+                    job.total_files - job.files_done
+                ) / response.files_per_second
+    return response
 
-        resource = Resource(category=item.type.value, title=src.name, filename=new_name)
-        db.add(resource)
-        imported += 1
 
+def _new_job(body: ImportRequest) -> ImportJob:
+    files = body.files
+    return ImportJob(
+        id=uuid.uuid4().hex,
+        status=ImportJobStatus.pending.value,
+        strategy=body.strategy.value,
+        files=[f.model_dump(mode="json") for f in files],
+        total_files=len(files),
+        files_done=0,
+        imported=0,
+        skipped=0,
+        failed=0,
+        bytes_copied=0,
+    )
+
+
+@router.post("/jobs", response_model=ImportJobResponse, status_code=202)
+async def start_import_job(body: ImportRequest, db: AsyncSession = Depends(get_db)):
+    job = _new_job(body)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    _start_job(job.id)
+    return _job_response(job)
+
+
+@router.get("/jobs", response_model=list[ImportJobResponse])
+async def list_import_jobs(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(ImportJob).order_by(ImportJob.created_at.desc()))
+    return [_job_response(job) for job in result.scalars().all()]
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return _job_response(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ImportJobResponse)
+async def cancel_import_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    task = _job_tasks.get(job_id)
+    if task is not None:
+        _cancel_requested.add(job_id)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # A cancel before the job started running never reached its handler
+        _cancel_requested.discard(job_id)
+        await db.refresh(job)
+    if job.status in (ImportJobStatus.pending.value, ImportJobStatus.running.value):
+        job.status = ImportJobStatus.cancelled.value
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+    return _job_response(job)
+
+
+@router.post("/execute", response_model=ImportResponse)
+async def execute_import(body: ImportRequest, db: AsyncSession = Depends(get_db)):
+    """Run an import inline. Large imports should use ``POST /imports/jobs``."""
+    job = _new_job(body)
+    db.add(job)
     await db.commit()
-    return ImportResponse(imported=imported, skipped=skipped)
+    await _execute_job(db, job, body.files)
+    return ImportResponse(imported=job.imported, skipped=job.skipped)
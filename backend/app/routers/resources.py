@@ -1,17 +1,26 @@
 import asyncio
 import hashlib
+import json
+import os
+import re
 import shutil
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 
 import httpx
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
+    Header,
     HTTPException,
     Query,
+    Request,
     UploadFile,
 )
 from pydantic import BaseModel
@@ -20,56 +29,68 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.types import String
 
 from app.config import (
+    DOWNLOAD_CONCURRENCY,
+    DOWNLOAD_DIR,
+    DOWNLOAD_PARALLEL_PARTS,
+    DOWNLOAD_PARALLEL_THRESHOLD,
+    DOWNLOAD_PER_HOST,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_URL_CACHE_TTL,
+    DOWNLOAD_SEGMENT_CONCURRENCY,
+    DOWNLOAD_SEGMENT_RETRIES,
     IMAGE_EXTENSIONS,
     MEDIA_DIR,
-    THUMBNAIL_DIR,
     TRASH_DIR,
+    UPLOAD_DIR,
     VIDEO_EXTENSIONS,
 )
 from app.converters import remux_to_mp4
 from app.database import async_session, get_db
-from app.models import Resource, Tag, resource_tags
+from app.hls import Segment, SegmentDecryptor, parse_playlist, select_variant
+from app.http_client import get_http_client
+from app.models import (
+    DownloadJob,
+    DownloadSource,
+    Resource,
+    Tag,
+    UploadSession,
+    resource_tags,
+)
+from app.routers.thumbnails import (
+    delete_sprite_file,
+    delete_thumbnail_files,
+    enqueue_thumbnail,
+    render_thumbnails,
+    wants_thumbnail,
+)
 from app.schemas import (
     BatchDeleteRequest,
     BatchDeleteResponse,
+    DownloadJobResponse,
+    DownloadJobStatus,
     PaginatedResponse,
     ResourceCreate,
     ResourceResponse,
     ResourceUpdate,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
+from app.storage import (
+    CHUNK_SIZE,
+    StoredFile,
+    commit_temp,
+    find_file,
+    hash_file,
+    iter_upload,
+    sha256_file,
+    shard_path,
+    store_stream,
+    temp_path,
 )
 
 router = APIRouter(tags=["Resources"])
 
 
-async def _generate_thumbnail(video_path: Path, sha_prefix: str) -> str | None:
-    """Extract a frame at 1s from a video and save as a JPEG thumbnail."""
-    thumb_filename = f"{sha_prefix}_thumb.jpg"
-    THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
-    thumb_path = THUMBNAIL_DIR / thumb_filename
-    try:
-        proc = await asyncio.create_subprocess_exec(
-            "ffmpeg",
-            "-ss",
-            "1",
-            "-i",
-            str(video_path),
-            "-frames:v",
-            "1",
-            "-q:v",
-            "2",
-            str(thumb_path),
-            "-y",
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        await proc.communicate()
-        if proc.returncode == 0 and thumb_path.is_file():
-            return thumb_filename
-    except Exception:
-        pass
-    return None
-
-
 async def _resolve_tags(db: AsyncSession, tag_names: list[str]) -> list[Tag]:
     """Resolve tag names to Tag objects, creating missing ones."""
     tags: list[Tag] = []
@@ -83,6 +104,35 @@ async def _resolve_tags(db: AsyncSession, tag_names: list[str]) -> list[Tag]:
     return tags
 
 
+async def backfill_resource_sizes(batch_size: int = 500) -> None:
+    """Record the file size of resources created before sizes were stored."""
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Resource)
+                .where(Resource.size.is_(None))
+                .where(Resource.filename.isnot(None))
+                .where(Resource.id > last_id)
+                .order_by(Resource.id)
+                .limit(batch_size)
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return
+            for resource in resources:
+                if resource.deleted_at is not None:
+                    path = find_file(TRASH_DIR, resource.filename)
+                else:
+                    path = find_file(MEDIA_DIR, resource.filename, resource.folder)
+                try:
+                    resource.size = (await asyncio.to_thread(path.stat)).st_size
+                except OSError:
+                    pass
+            last_id = resources[-1].id
+            await db.commit()
+
+
 @router.post("/resources", response_model=ResourceResponse, status_code=201)
 async def create_resource(body: ResourceCreate, db: AsyncSession = Depends(get_db)):
     resource = Resource(
@@ -105,9 +155,34 @@ SORTABLE_COLUMNS = {
     "filename": Resource.filename,
     "ext": _ext_expr,
     "created_at": Resource.created_at,
+    "duration": Resource.duration,
+    "height": Resource.height,
+    "video_codec": Resource.video_codec,
 }
 
 
+def _media_conditions(
+    min_duration: float | None,
+    max_duration: float | None,
+    min_height: int | None,
+    max_height: int | None,
+    video_codec: list[str] | None,
+) -> list:
+    """Filters on the stored probe metadata; no file is opened."""
+    conditions = []
+    if min_duration is not None:
+        conditions.append(Resource.duration >= min_duration)
+    if max_duration is not None:
+        conditions.append(Resource.duration <= max_duration)
+    if min_height is not None:
+        conditions.append(Resource.height >= min_height)
+    if max_height is not None:
+        conditions.append(Resource.height <= max_height)
+    if video_codec:
+        conditions.append(Resource.video_codec.in_(video_codec))
+    return conditions
+
+
 @router.get("/resources", response_model=PaginatedResponse)
 async def list_resources(
     page: int = Query(1, ge=1),
@@ -117,6 +192,11 @@ async def list_resources(
     ext: list[str] = Query(None),
     tag: list[str] = Query(None),
     folder: str | None = Query(None),
+    min_duration: float | None = Query(None, ge=0),
+    max_duration: float | None = Query(None, ge=0),
+    min_height: int | None = Query(None, ge=0),
+    max_height: int | None = Query(None, ge=0),
+    video_codec: list[str] = Query(None),
     sort_by: str = Query("created_at"),
     sort_desc: bool = Query(True),
     db: AsyncSession = Depends(get_db),
@@ -157,6 +237,13 @@ async def list_resources(
             base_query = base_query.where(Resource.id.in_(tag_subq))
             count_query = count_query.where(Resource.id.in_(tag_subq))
 
+    media_conds = _media_conditions(
+        min_duration, max_duration, min_height, max_height, video_codec
+    )
+    if media_conds:
+        base_query = base_query.where(*media_conds)
+        count_query = count_query.where(*media_conds)
+
     col = SORTABLE_COLUMNS.get(sort_by, Resource.created_at)
     order = desc(col) if sort_desc else asc(col)
 
@@ -173,6 +260,11 @@ async def list_resource_ids(
     ext: list[str] = Query(None),
     tag: list[str] = Query(None),
     folder: str | None = Query(None),
+    min_duration: float | None = Query(None, ge=0),
+    max_duration: float | None = Query(None, ge=0),
+    min_height: int | None = Query(None, ge=0),
+    max_height: int | None = Query(None, ge=0),
+    video_codec: list[str] = Query(None),
     sort_by: str = Query("created_at"),
     sort_desc: bool = Query(True),
     db: AsyncSession = Depends(get_db),
@@ -197,6 +289,11 @@ async def list_resource_ids(
                 .where(Tag.name.icontains(t))
             )
             query = query.where(Resource.id.in_(tag_subq))
+    media_conds = _media_conditions(
+        min_duration, max_duration, min_height, max_height, video_codec
+    )
+    if media_conds:
+        query = query.where(*media_conds)
 
     col = SORTABLE_COLUMNS.get(sort_by, Resource.created_at)
     order = desc(col) if sort_desc else asc(col)
@@ -227,15 +324,14 @@ async def batch_delete_resources(
         resource = await db.get(Resource, resource_id)
         if not resource or resource.deleted_at is not None:
             continue
-        if resource.thumbnail:
-            thumb_path = THUMBNAIL_DIR / resource.thumbnail
-            if thumb_path.is_file():
-                thumb_path.unlink()
+        delete_thumbnail_files(resource)
+        delete_sprite_file(resource)
         if resource.filename:
-            src = MEDIA_DIR / (resource.folder or "") / resource.filename
+            src = find_file(MEDIA_DIR, resource.filename, resource.folder)
             if src.is_file():
-                TRASH_DIR.mkdir(parents=True, exist_ok=True)
-                shutil.move(str(src), str(TRASH_DIR / resource.filename))
+                dest = shard_path(TRASH_DIR, resource.filename)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(src), str(dest))
         resource.deleted_at = now
         deleted += 1
     await db.commit()
@@ -274,10 +370,12 @@ async def update_resource(
             raise HTTPException(status_code=400, detail="Invalid folder path")
         old_folder = resource.folder
         if new_folder != old_folder:
+            # Folders are logical; a file still at its legacy per-folder
+            # location is moved into the sharded layout on the way.
             if resource.filename:
-                old_path = MEDIA_DIR / (old_folder or "") / resource.filename
-                new_path = MEDIA_DIR / (new_folder or "") / resource.filename
-                if old_path.is_file():
+                old_path = find_file(MEDIA_DIR, resource.filename, old_folder)
+                new_path = shard_path(MEDIA_DIR, resource.filename)
+                if old_path != new_path and old_path.is_file():
                     new_path.parent.mkdir(parents=True, exist_ok=True)
                     shutil.move(str(old_path), str(new_path))
             resource.folder = new_folder
@@ -292,103 +390,659 @@ async def delete_resource(resource_id: int, db: AsyncSession = Depends(get_db)):
     resource = await db.get(Resource, resource_id)
     if not resource or resource.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Resource not found")
-    if resource.thumbnail:
-        thumb_path = THUMBNAIL_DIR / resource.thumbnail
-        if thumb_path.is_file():
-            thumb_path.unlink()
+    delete_thumbnail_files(resource)
+    delete_sprite_file(resource)
     if resource.filename:
-        src = MEDIA_DIR / (resource.folder or "") / resource.filename
+        src = find_file(MEDIA_DIR, resource.filename, resource.folder)
         if src.is_file():
-            TRASH_DIR.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(src), str(TRASH_DIR / resource.filename))
+            dest = shard_path(TRASH_DIR, resource.filename)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(src), str(dest))
     resource.deleted_at = datetime.now(timezone.utc)
     await db.commit()
 
 
 class DownloadRequest(BaseModel):
     url: str
+    # For HLS master playlists: highest variant whose height fits, else best
+    max_height: int | None = None
 
 
-async def _download_direct(url: str) -> bytes:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=120.0) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return resp.content
+async def _counted(
+    chunks: AsyncIterator[bytes], on_chunk: Callable[[int], None] | None
+) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+        yield chunk
 
 
-async def _download_m3u8(url: str) -> tuple[bytes, str]:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=120.0) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        playlist = resp.text
+# ---------------------------------------------------------------------------
+# Resumable direct downloads
+#
+# Bytes land in DOWNLOAD_DIR/<key>.part; a JSON sidecar records the server's
+# validators and, per byte range ("part"), how much has been written. A failed
+# download resumes each unfinished part with a Range + If-Range request, and
+# large files from range-capable servers are fetched as parallel parts.
+# ---------------------------------------------------------------------------
 
-        segments: list[str] = []
-        for line in playlist.splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            segments.append(urljoin(url, line))
 
-        chunks: list[bytes] = []
-        for seg_url in segments:
-            seg_resp = await client.get(seg_url)
-            seg_resp.raise_for_status()
-            chunks.append(seg_resp.content)
+class _RestartDownload(Exception):
+    """The remote file changed (or lost range support) since the partial."""
 
-        return b"".join(chunks), ".ts"
 
+class _NotModified(Exception):
+    """A conditional request found the previously downloaded file unchanged."""
 
-_ALLOWED_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS | {".m3u8"}
 
+def _partial_paths(url: str) -> tuple[Path, Path]:
+    key = hashlib.sha256(url.encode()).hexdigest()[:32]
+    return DOWNLOAD_DIR / f"{key}.part", DOWNLOAD_DIR / f"{key}.json"
 
-async def _bg_download(url: str, ext: str) -> None:
-    if ext == ".m3u8":
-        content, _ = await _download_m3u8(url)
-    else:
-        content = await _download_direct(url)
 
-    sha = hashlib.sha256(content).hexdigest()
-    MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+def _discard_partial(url: str) -> None:
+    for path in _partial_paths(url):
+        path.unlink(missing_ok=True)
+
+
+def _load_partial(url: str) -> dict | None:
+    part, meta_path = _partial_paths(url)
+    if not part.is_file():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+    # Resuming blindly could splice two different versions of the file
+    if not (meta.get("etag") or meta.get("last_modified")):
+        return None
+    return meta
+
+
+def _save_partial(url: str, meta: dict) -> None:
+    _, meta_path = _partial_paths(url)
+    tmp = temp_path(DOWNLOAD_DIR)
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, meta_path)
+
+
+def _new_partial(resp: httpx.Response) -> dict:
+    """Describe a fresh download from the headers of its first response."""
+    size = None
+    if "content-encoding" not in resp.headers:
+        length = resp.headers.get("content-length")
+        size = int(length) if length and length.isdigit() else None
+    ranged = (
+        size is not None
+        and resp.headers.get("accept-ranges") == "bytes"
+        and bool(resp.headers.get("etag") or resp.headers.get("last-modified"))
+    )
+    return {
+        "etag": resp.headers.get("etag"),
+        "last_modified": resp.headers.get("last-modified"),
+        "size": size,
+        "ranged": ranged,
+        # [start, end (exclusive, None if unknown), bytes written]
+        "parts": [[0, size, 0]],
+    }
+
+
+def _split_parts(size: int, count: int) -> list[list]:
+    step = -(-size // count)
+    return [[start, min(start + step, size), 0] for start in range(0, size, step)]
+
+
+async def _write_part(
+    resp: httpx.Response,
+    part_path: Path,
+    part: list,
+    on_chunk: Callable[[int], None] | None,
+    hasher=None,
+) -> None:
+    """Append a response body to ``part`` at its current write position."""
+    start, end, _ = part
+    with open(part_path, "r+b") as f:
+        f.seek(start + part[2])
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            if end is not None:
+                chunk = chunk[: end - start - part[2]]
+            await asyncio.to_thread(f.write, chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            part[2] += len(chunk)
+            if on_chunk is not None:
+                on_chunk(len(chunk))
+            if end is not None and start + part[2] >= end:
+                break
+
+
+async def _resume_part(
+    url: str,
+    meta: dict,
+    part: list,
+    on_chunk: Callable[[int], None] | None,
+    hasher=None,
+) -> None:
+    """
+    Fetch the rest of ``part``. A 206 body that ends short of the range is
+    requested again from where it stopped; one that adds nothing fails.
+    """
+    start, end, _ = part
+    while end is None or start + part[2] < end:
+        written = part[2]
+        stop = "" if end is None else str(end - 1)
+        headers = {
+            "Range": f"bytes={start + written}-{stop}",
+            "If-Range": meta["etag"] or meta["last_modified"],
+        }
+        part_path, _ = _partial_paths(url)
+        async with get_http_client().stream("GET", url, headers=headers) as resp:
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                raise _RestartDownload(url)
+            await _write_part(resp, part_path, part, on_chunk, hasher)
+        if end is None:
+            return
+        if part[2] == written:
+            raise httpx.RemoteProtocolError(
+                f"Empty response for bytes {start + written}-{stop} of {url}"
+            )
+
+
+def _missing_bytes(meta: dict) -> int:
+    """Bytes of the known-size parts that have not been written yet."""
+    return sum(end - start - done for start, end, done in meta["parts"] if end)
+
+
+def _conditional_headers(validators: dict | None) -> dict[str, str]:
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+async def _fetch_to_partial(
+    url: str,
+    on_chunk: Callable[[int], None] | None,
+    validators: dict | None = None,
+) -> tuple[dict, str | None]:
+    """
+    Bring the partial file for ``url`` up to date.
+
+    Returns the partial's metadata and, when the whole file was streamed in
+    one pass, its SHA-256 (otherwise the caller hashes the finished file).
+    A fresh transfer is made conditional on ``validators`` from an earlier
+    download and raises ``_NotModified`` on a 304.
+    """
+    part_path, _ = _partial_paths(url)
+    meta = _load_partial(url)
+    if meta is None:
+        _discard_partial(url)
+        headers = _conditional_headers(validators)
+        async with get_http_client().stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 304:
+                raise _NotModified(url)
+            resp.raise_for_status()
+            DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            meta = _new_partial(resp)
+            parallel = meta["ranged"] and meta["size"] >= DOWNLOAD_PARALLEL_THRESHOLD
+            with open(part_path, "wb") as f:
+                if parallel:
+                    f.truncate(meta["size"])
+            if not parallel:
+                hasher = hashlib.sha256()
+                try:
+                    await _write_part(
+                        resp, part_path, meta["parts"][0], on_chunk, hasher
+                    )
+                finally:
+                    _save_partial(url, meta)
+                return meta, hasher.hexdigest()
+        # Large file from a range-capable server: fetch parallel parts below
+        meta["parts"] = _split_parts(meta["size"], DOWNLOAD_PARALLEL_PARTS)
+        _save_partial(url, meta)
+
+    tasks = [
+        asyncio.create_task(_resume_part(url, meta, part, on_chunk))
+        for part in meta["parts"]
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        _save_partial(url, meta)
+    return meta, None
+
+
+async def _download_direct(
+    url: str,
+    ext: str,
+    on_chunk: Callable[[int], None] | None = None,
+    validators: dict | None = None,
+) -> tuple[StoredFile, dict]:
+    """
+    Download a remote file into MEDIA_DIR under its content hash.
+
+    An interrupted download keeps its partial file and resumes from where it
+    stopped; if the remote file changed meanwhile it starts over. Returns the
+    stored file and the response's validators (``etag``, ``last_modified``).
+    """
+    part_path, _ = _partial_paths(url)
+    try:
+        meta, sha256 = await _fetch_to_partial(url, on_chunk, validators)
+    except _RestartDownload:
+        _discard_partial(url)
+        meta, sha256 = await _fetch_to_partial(url, on_chunk, validators)
+
+    # A pre-sized partial always has the right size: check the parts instead,
+    # keeping the partial so that a retry resumes what is missing
+    if _missing_bytes(meta):
+        raise httpx.RemoteProtocolError(f"Incomplete download of {url}")
+    size = part_path.stat().st_size
+    if meta["size"] is not None and size != meta["size"]:
+        _discard_partial(url)
+        raise httpx.RemoteProtocolError(f"Incomplete download of {url}")
+    if sha256 is None:
+        sha256 = await hash_file(part_path)
+
+    dest = shard_path(MEDIA_DIR, f"{sha256}{ext}")
+    commit_temp(part_path, dest)
+    _discard_partial(url)
+    stored = StoredFile(sha256=sha256, path=dest, size=size)
+    return stored, {"etag": meta["etag"], "last_modified": meta["last_modified"]}
+
+
+_SEGMENT_RETRY_DELAY = 0.5  # seconds, doubled on each attempt
+
+
+def _is_retryable(exc: httpx.HTTPError) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class _KeyCache:
+    """AES keys of one HLS download, fetched once per key URI."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self._client = client
+        self._keys: dict[str, asyncio.Task[bytes]] = {}
+
+    async def _fetch(self, uri: str) -> bytes:
+        resp = await self._client.get(uri)
+        resp.raise_for_status()
+        if len(resp.content) != 16:
+            raise ValueError(f"Invalid AES-128 key at {uri}")
+        return resp.content
+
+    async def get(self, uri: str) -> bytes:
+        task = self._keys.get(uri)
+        if task is None or (
+            task.done() and (task.cancelled() or task.exception() is not None)
+        ):
+            task = self._keys[uri] = asyncio.create_task(self._fetch(uri))
+        return await asyncio.shield(task)
+
+
+async def _read_segment(
+    client: httpx.AsyncClient, segment: Segment, keys: _KeyCache
+) -> bytes:
+    decryptor = None
+    if segment.key is not None:
+        decryptor = SegmentDecryptor(await keys.get(segment.key.uri), segment.iv)
+
+    headers = {}
+    skip = 0
+    remaining = None
+    if segment.byterange is not None:
+        length, offset = segment.byterange
+        headers["Range"] = f"bytes={offset}-{offset + length - 1}"
+        remaining = length
+
+    parts: list[bytes] = []
+    async with client.stream("GET", segment.uri, headers=headers) as resp:
+        resp.raise_for_status()
+        if remaining is not None and resp.status_code != 206:
+            # Server ignored the Range header: cut the window out ourselves
+            skip = segment.byterange[1]
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            if skip:
+                dropped = min(skip, len(chunk))
+                chunk = chunk[dropped:]
+                skip -= dropped
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                parts.append(decryptor.update(chunk) if decryptor else chunk)
+            if remaining == 0:
+                break
+    if decryptor:
+        parts.append(decryptor.finalize())
+    return b"".join(parts)
+
+
+async def _fetch_segment(
+    client: httpx.AsyncClient, segment: Segment, keys: _KeyCache
+) -> bytes:
+    """Fetch one HLS segment, retrying transient failures with backoff."""
+    attempt = 0
+    while True:
+        try:
+            return await _read_segment(client, segment, keys)
+        except httpx.HTTPError as exc:
+            if attempt >= DOWNLOAD_SEGMENT_RETRIES or not _is_retryable(exc):
+                raise
+            await asyncio.sleep(_SEGMENT_RETRY_DELAY * 2**attempt)
+            attempt += 1
+
+
+async def _iter_segments(
+    client: httpx.AsyncClient, segments: list[Segment]
+) -> AsyncIterator[bytes]:
+    """
+    Yield segment bodies in playlist order while fetching ahead concurrently.
+
+    At most ``DOWNLOAD_SEGMENT_CONCURRENCY`` segments are in flight or waiting
+    to be written, so memory is bounded by the window, not the stream length.
+    Encrypted segments are decrypted chunk by chunk as they are received.
+    """
+    keys = _KeyCache(client)
+    remaining = iter(segments)
+    window: deque[asyncio.Task[bytes]] = deque(
+        asyncio.create_task(_fetch_segment(client, segment, keys))
+        for segment in islice(remaining, DOWNLOAD_SEGMENT_CONCURRENCY)
+    )
+    try:
+        while window:
+            data = await window.popleft()
+            for segment in islice(remaining, 1):
+                window.append(
+                    asyncio.create_task(_fetch_segment(client, segment, keys))
+                )
+            yield data
+    finally:
+        for task in window:
+            task.cancel()
+        await asyncio.gather(*window, return_exceptions=True)
+
+
+async def _download_m3u8(
+    url: str,
+    max_height: int | None = None,
+    on_chunk: Callable[[int], None] | None = None,
+) -> StoredFile:
+    """
+    Concatenate an HLS stream's segments into a staged file.
+
+    Master playlists are resolved to one variant first. Streams with
+    ``EXT-X-MAP`` init sections are fragmented MP4 rather than MPEG-TS.
+    """
+    client = get_http_client()
+    resp = await client.get(url)
+    resp.raise_for_status()
+    playlist = parse_playlist(resp.text, str(resp.url))
+
+    if playlist.is_master:
+        variant = select_variant(playlist.variants, max_height)
+        resp = await client.get(variant.uri)
+        resp.raise_for_status()
+        playlist = parse_playlist(resp.text, str(resp.url))
+
+    ext = ".mp4" if playlist.init_sections else ".ts"
+    return await store_stream(
+        _counted(_iter_segments(client, playlist.segments), on_chunk),
+        DOWNLOAD_DIR,
+        ext,
+    )
+
+
+_ALLOWED_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS | {".m3u8"}
+
 
+async def _bg_download(
+    url: str,
+    ext: str,
+    max_height: int | None = None,
+    on_chunk: Callable[[int], None] | None = None,
+) -> int | None:
+    """
+    Download ``url`` into the library and return the resource id.
+
+    A URL downloaded before is not fetched again while its record is fresh
+    (DOWNLOAD_URL_CACHE_TTL), and afterwards only through a conditional
+    request. Returns None when a stream could not be remuxed to MP4.
+    """
+    source = await _cached_source(url)
+    if source is not None:
+        age = datetime.now(timezone.utc) - _as_utc(source.fetched_at)
+        if age.total_seconds() < DOWNLOAD_URL_CACHE_TTL:
+            return source.resource_id
+
+    validators = {}
     if ext == ".m3u8":
-        # Write TS to a temp file, remux to MP4, then delete the temp
-        tmp_ts = MEDIA_DIR / f"{sha}.ts.tmp"
-        with open(tmp_ts, "wb") as f:
-            f.write(content)
-        mp4_path = MEDIA_DIR / f"{sha}.mp4"
-        ok = await remux_to_mp4(tmp_ts, mp4_path)
-        tmp_ts.unlink(missing_ok=True)
+        # Remux the staged stream to MP4, then drop it
+        ts = await _download_m3u8(url, max_height, on_chunk)
+        mp4_path = shard_path(MEDIA_DIR, f"{ts.sha256}.mp4")
+        mp4_path.parent.mkdir(parents=True, exist_ok=True)
+        ok = await remux_to_mp4(ts.path, mp4_path)
+        ts.path.unlink(missing_ok=True)
         if not ok:
-            return
-        ext = ".mp4"
+            return None
+        stored = StoredFile(
+            sha256=ts.sha256, path=mp4_path, size=mp4_path.stat().st_size
+        )
     else:
-        dest = MEDIA_DIR / f"{sha}{ext}"
-        if not dest.exists():
-            with open(dest, "wb") as f:
-                f.write(content)
+        cached = None
+        if source is not None:
+            cached = {"etag": source.etag, "last_modified": source.last_modified}
+        try:
+            stored, validators = await _download_direct(url, ext, on_chunk, cached)
+        except _NotModified:
+            await _record_source(url, cached, source.resource_id)
+            return source.resource_id
+
+    resource_id = await _create_downloaded_resource(stored)
+    await _record_source(url, validators, resource_id)
+    return resource_id
 
-    filename = f"{sha}{ext}"
-    category = "video" if ext in VIDEO_EXTENSIONS else "image"
 
-    thumbnail = None
-    if category == "video":
-        thumbnail = await _generate_thumbnail(MEDIA_DIR / filename, sha)
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands datetimes back naive
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _cached_source(url: str) -> DownloadSource | None:
+    """The earlier download of ``url``, if its resource is still in the library."""
+    async with async_session() as db:
+        source = await db.get(DownloadSource, url)
+        if source is None:
+            return None
+        resource = await db.get(Resource, source.resource_id)
+        if resource is None or resource.deleted_at is not None:
+            return None
+        return source
+
+
+async def _record_source(url: str, validators: dict, resource_id: int) -> None:
+    async with async_session() as db:
+        source = await db.get(DownloadSource, url) or DownloadSource(url=url)
+        source.etag = validators.get("etag")
+        source.last_modified = validators.get("last_modified")
+        source.resource_id = resource_id
+        source.fetched_at = datetime.now(timezone.utc)
+        db.add(source)
+        await db.commit()
+
+
+async def _create_downloaded_resource(stored: StoredFile) -> int:
+    filename = stored.filename
+    category = "video" if stored.path.suffix in VIDEO_EXTENSIONS else "image"
 
     async with async_session() as db:
         existing = await db.scalar(
             select(Resource).where(Resource.filename == filename)
         )
         if existing:
-            return
+            return existing.id
         resource = Resource(
-            category=category, title=filename, filename=filename, thumbnail=thumbnail
+            category=category,
+            title=filename,
+            filename=filename,
+            size=stored.size,
+            thumbnail_status="pending" if wants_thumbnail(filename) else None,
         )
         db.add(resource)
         await db.commit()
+    if resource.thumbnail_status == "pending":
+        enqueue_thumbnail(resource.id)
+    return resource.id
+
+
+# ---------------------------------------------------------------------------
+# Download queue
+#
+# POST /resources/download                   enqueue a URL
+# GET  /resources/downloads/{id}             job status and progress
+# POST /resources/downloads/{id}/cancel      cancel a queued or running job
+# ---------------------------------------------------------------------------
+
+_DOWNLOAD_RETRY_DELAY = 2.0  # seconds, doubled on each attempt
+
+# Live state for downloads in this process. The persisted DownloadJob row is
+# the source of truth; these only drive scheduling and progress reporting.
+_download_tasks: dict[str, asyncio.Task] = {}
+# Unfinished job per (url, max_height), so repeated requests merge into it
+_url_jobs: dict[tuple[str, int | None], str] = {}
+_download_progress: dict[str, tuple[float, int]] = {}
+_download_slots: asyncio.Semaphore | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
 
 
-@router.post("/resources/download", status_code=202)
-async def download_resource(body: DownloadRequest, bg: BackgroundTasks):
+def _global_slot() -> asyncio.Semaphore:
+    global _download_slots
+    if _download_slots is None:
+        _download_slots = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    return _download_slots
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = urlparse(url).hostname or ""
+    if host not in _host_slots:
+        _host_slots[host] = asyncio.Semaphore(DOWNLOAD_PER_HOST)
+    return _host_slots[host]
+
+
+async def _execute_download(db: AsyncSession, job: DownloadJob) -> None:
+    job.status = DownloadJobStatus.running.value
+    job.started_at = datetime.now(timezone.utc)
+    await db.commit()
+    _download_progress[job.id] = (time.monotonic(), 0)
+
+    def on_chunk(size: int) -> None:
+        started, received = _download_progress[job.id]
+        _download_progress[job.id] = (started, received + size)
+
+    try:
+        while True:
+            job.attempts += 1
+            try:
+                resource_id = await _bg_download(
+                    job.url, job.ext, job.max_height, on_chunk
+                )
+                break
+            except httpx.HTTPError as exc:
+                if job.attempts > DOWNLOAD_RETRIES or not _is_retryable(exc):
+                    raise
+                job.error = str(exc)
+                await db.commit()
+                await asyncio.sleep(_DOWNLOAD_RETRY_DELAY * 2 ** (job.attempts - 1))
+                _download_progress[job.id] = (time.monotonic(), 0)
+    except asyncio.CancelledError:
+        # Left "running" so it resumes on restart unless cancelled via the API
+        _download_progress.pop(job.id, None)
+        raise
+    except Exception as exc:
+        job.status = DownloadJobStatus.failed.value
+        job.error = str(exc) or type(exc).__name__
+        _discard_partial(job.url)
+    else:
+        if resource_id is None:
+            job.status = DownloadJobStatus.failed.value
+            job.error = "Could not remux stream to MP4"
+        else:
+            job.status = DownloadJobStatus.completed.value
+            job.resource_id = resource_id
+            job.error = None
+    _, job.bytes_received = _download_progress.pop(job.id)
+    job.finished_at = datetime.now(timezone.utc)
+    await db.commit()
+
+
+async def _run_download(job_id: str, url: str) -> None:
+    try:
+        # Queued jobs wait for a slot without holding a database connection
+        async with _host_slot(url), _global_slot():
+            async with async_session() as db:
+                job = await db.get(DownloadJob, job_id)
+                if job is not None:
+                    await _execute_download(db, job)
+    finally:
+        _download_tasks.pop(job_id, None)
+        for key, active_id in list(_url_jobs.items()):
+            if active_id == job_id:
+                del _url_jobs[key]
+
+
+def _start_download(job_id: str, url: str, max_height: int | None) -> None:
+    _url_jobs[(url, max_height)] = job_id
+    _download_tasks[job_id] = asyncio.create_task(_run_download(job_id, url))
+
+
+async def resume_download_jobs() -> None:
+    """Requeue downloads that were pending or running when the server stopped."""
+    async with async_session() as db:
+        result = await db.execute(
+            select(DownloadJob.id, DownloadJob.url, DownloadJob.max_height)
+            .where(
+                DownloadJob.status.in_(
+                    [DownloadJobStatus.pending.value, DownloadJobStatus.running.value]
+                )
+            )
+            .order_by(DownloadJob.created_at)
+        )
+        for job_id, url, max_height in result.all():
+            _start_download(job_id, url, max_height)
+
+
+async def shutdown_download_jobs() -> None:
+    tasks = list(_download_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _download_response(job: DownloadJob) -> DownloadJobResponse:
+    response = DownloadJobResponse.model_validate(job)
+    progress = _download_progress.get(job.id)
+    if progress is not None:
+        started, received = progress
+        response.bytes_received = received
+        elapsed = time.monotonic() - started
+        if elapsed > 0:
+            response.bytes_per_second = received / elapsed
+    return response
+
+
+@router.post("/resources/download", response_model=DownloadJobResponse, status_code=202)
+async def download_resource(body: DownloadRequest, db: AsyncSession = Depends(get_db)):
     parsed = urlparse(body.url)
     ext = Path(parsed.path).suffix.lower()
 
@@ -398,8 +1052,93 @@ async def download_resource(body: DownloadRequest, bg: BackgroundTasks):
             detail=f"Unsupported URL extension: {ext or '(none)'}",
         )
 
-    bg.add_task(_bg_download, body.url, ext)
-    return {"status": "downloading"}
+    active_id = _url_jobs.get((body.url, body.max_height))
+    if active_id is not None:
+        job = await db.get(DownloadJob, active_id)
+        if job is not None:
+            return _download_response(job)
+
+    job = DownloadJob(
+        id=uuid.uuid4().hex,
+        url=body.url,
+        ext=ext,
+        max_height=body.max_height,
+        status=DownloadJobStatus.pending.value,
+        attempts=0,
+        bytes_received=0,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    _start_download(job.id, job.url, job.max_height)
+    return _download_response(job)
+
+
+@router.get("/resources/downloads/{job_id}", response_model=DownloadJobResponse)
+async def get_download_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(DownloadJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Download job not found")
+    return _download_response(job)
+
+
+@router.post("/resources/downloads/{job_id}/cancel", response_model=DownloadJobResponse)
+async def cancel_download_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(DownloadJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Download job not found")
+
+    task = _download_tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await db.refresh(job)
+    if job.status in (
+        DownloadJobStatus.pending.value,
+        DownloadJobStatus.running.value,
+    ):
+        _discard_partial(job.url)
+        job.status = DownloadJobStatus.cancelled.value
+        job.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+    return _download_response(job)
+
+
+def _category_for_ext(ext: str) -> str:
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    raise HTTPException(status_code=400, detail=f"Unsupported file extension: {ext}")
+
+
+async def _create_stored_resource(
+    db: AsyncSession,
+    stored: StoredFile,
+    category: str,
+    title: str | None,
+    tag_names: list[str],
+) -> Resource:
+    """
+    Create a Resource for a file already committed to MEDIA_DIR.
+
+    Thumbnails are rendered in the background by the thumbnail workers.
+    """
+    resource = Resource(
+        category=category,
+        title=title,
+        filename=stored.filename,
+        size=stored.size,
+        thumbnail_status="pending" if wants_thumbnail(stored.filename) else None,
+    )
+    if tag_names:
+        resource.tags = await _resolve_tags(db, tag_names)
+    db.add(resource)
+    await db.commit()
+    await db.refresh(resource)
+    if resource.thumbnail_status == "pending":
+        enqueue_thumbnail(resource.id)
+    return resource
 
 
 @router.post("/resources/upload", response_model=ResourceResponse, status_code=201)
@@ -409,47 +1148,241 @@ async def upload_resource(
     tags: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    content = await file.read()
-    sha256 = hashlib.sha256(content).hexdigest()
     ext = Path(file.filename or "").suffix.lower()
-    new_name = f"{sha256}{ext}"
+    category = _category_for_ext(ext)
 
-    MEDIA_DIR.mkdir(parents=True, exist_ok=True)
-    dest = MEDIA_DIR / new_name
-    if not dest.exists():
-        with open(dest, "wb") as f:
-            f.write(content)
+    stored = await store_stream(iter_upload(file), MEDIA_DIR, ext)
 
-    category = "image"
-    if ext in VIDEO_EXTENSIONS:
-        category = "video"
-    elif ext not in IMAGE_EXTENSIONS:
-        raise HTTPException(
-            status_code=400, detail=f"Unsupported file extension: {ext}"
-        )
+    tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
+    return await _create_stored_resource(
+        db, stored, category, title or file.filename, tag_names
+    )
 
-    thumbnail = None
-    if category == "video":
-        sha_prefix = sha256
-        thumbnail = await _generate_thumbnail(dest, sha_prefix)
 
-    resource = Resource(
-        category=category,
-        title=title or file.filename,
-        filename=new_name,
-        thumbnail=thumbnail,
+# ---------------------------------------------------------------------------
+# Resumable chunked uploads
+#
+# POST   /resources/uploads                  create a session
+# GET    /resources/uploads/{id}             query the committed offset
+# PUT    /resources/uploads/{id}             append bytes (Content-Range)
+# POST   /resources/uploads/{id}/complete    verify, store and create Resource
+# DELETE /resources/uploads/{id}             abort
+# ---------------------------------------------------------------------------
+
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def _parse_content_range(value: str | None) -> tuple[int, int, int | None]:
+    """Parse ``bytes <start>-<end>/<total|*>`` into (start, end, total)."""
+    match = _CONTENT_RANGE_RE.match(value or "")
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range header")
+    start, end = int(match[1]), int(match[2])
+    total = None if match[3] == "*" else int(match[3])
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range header")
+    return start, end, total
+
+
+# Live state for upload sessions in this process. The part file and the
+# committed offset are the source of truth; the running hash only saves
+# re-reading the part file on completion and is rebuilt from it when missing.
+_upload_locks: dict[str, asyncio.Lock] = {}
+_upload_hashes: dict[str, tuple[int, "hashlib._Hash"]] = {}
+
+
+def _upload_lock(upload_id: str) -> asyncio.Lock:
+    return _upload_locks.setdefault(upload_id, asyncio.Lock())
+
+
+def _forget_upload(upload_id: str) -> None:
+    _upload_locks.pop(upload_id, None)
+    _upload_hashes.pop(upload_id, None)
+
+
+def _upload_part_path(session: UploadSession) -> Path:
+    return UPLOAD_DIR / f"{session.id}.part"
+
+
+async def _get_upload_session(db: AsyncSession, upload_id: str) -> UploadSession:
+    session = await db.get(UploadSession, upload_id)
+    if not session:
+        _forget_upload(upload_id)
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post(
+    "/resources/uploads", response_model=UploadSessionResponse, status_code=201
+)
+async def create_upload_session(
+    body: UploadSessionCreate, db: AsyncSession = Depends(get_db)
+):
+    _category_for_ext(Path(body.filename).suffix.lower())
+    if body.size is not None and body.size < 0:
+        raise HTTPException(status_code=400, detail="Invalid upload size")
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        filename=body.filename,
+        title=body.title,
+        tags=body.tags,
+        size=body.size,
+        sha256=body.sha256.lower() if body.sha256 else None,
+        offset=0,
     )
-    if tags:
-        tag_names = [t.strip() for t in tags.split(",") if t.strip()]
-        resource.tags = await _resolve_tags(db, tag_names)
-    db.add(resource)
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    _upload_part_path(session).touch()
+    db.add(session)
     await db.commit()
-    await db.refresh(resource)
+    await db.refresh(session)
+    return session
+
+
+@router.get("/resources/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str, db: AsyncSession = Depends(get_db)):
+    return await _get_upload_session(db, upload_id)
+
+
+@router.put("/resources/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    content_range: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    start, end, total = _parse_content_range(content_range)
+    # Chunks of one session are written one at a time, so a second PUT for
+    # the same offset sees the first one's bytes and is rejected
+    async with _upload_lock(upload_id):
+        session = await _get_upload_session(db, upload_id)
+        return await _append_chunk(db, session, request, start, end, total)
+
+
+async def _append_chunk(
+    db: AsyncSession,
+    session: UploadSession,
+    request: Request,
+    start: int,
+    end: int,
+    total: int | None,
+) -> UploadSession:
+    if start != session.offset:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chunk starts at {start}, committed offset is {session.offset}",
+        )
+    if session.size is not None and (
+        (total is not None and total != session.size) or end >= session.size
+    ):
+        raise HTTPException(status_code=400, detail="Chunk exceeds upload size")
+
+    part = _upload_part_path(session)
+    if not part.is_file():
+        raise HTTPException(status_code=410, detail="Upload data is gone")
+
+    # Bytes are appended straight to the part file as they arrive. The offset
+    # is committed even if the client disconnects mid-chunk, so a retry can
+    # resume from exactly what reached the disk.
+    expected = end - start + 1
+    written = 0
+    overflow = False
+    # The part file is truncated to the offset, so a chunk at 0 starts afresh
+    offset, hasher = _upload_hashes.pop(session.id, (None, None))
+    if session.offset == 0:
+        hasher = hashlib.sha256()
+    elif offset != session.offset:
+        hasher = None
+    try:
+        with open(part, "r+b") as f:
+            f.truncate(session.offset)
+            f.seek(session.offset)
+            async for chunk in request.stream():
+                if written + len(chunk) > expected:
+                    overflow = True
+                    break
+                await asyncio.to_thread(f.write, chunk)
+                written += len(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+    finally:
+        session.offset += written
+        await db.commit()
+        if hasher is not None:
+            _upload_hashes[session.id] = (session.offset, hasher)
+
+    if overflow or written != expected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk length does not match Content-Range, "
+            f"committed offset is {session.offset}",
+        )
+
+    await db.refresh(session)
+    return session
+
+
+@router.post(
+    "/resources/uploads/{upload_id}/complete",
+    response_model=ResourceResponse,
+    status_code=201,
+)
+async def complete_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    async with _upload_lock(upload_id):
+        session = await _get_upload_session(db, upload_id)
+        resource = await _complete_upload(db, session)
+    _forget_upload(upload_id)
     return resource
 
 
+async def _complete_upload(db: AsyncSession, session: UploadSession) -> Resource:
+    if session.size is not None and session.offset != session.size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload incomplete: {session.offset} of {session.size} bytes",
+        )
+
+    ext = Path(session.filename).suffix.lower()
+    category = _category_for_ext(ext)
+    part = _upload_part_path(session)
+
+    offset, hasher = _upload_hashes.get(session.id, (None, None))
+    if offset == session.offset:
+        sha256 = hasher.hexdigest()
+    else:
+        # Chunks written before a restart were never hashed in this process
+        sha256 = await asyncio.to_thread(sha256_file, part)
+    if session.sha256 and sha256 != session.sha256:
+        part.unlink(missing_ok=True)
+        await db.delete(session)
+        await db.commit()
+        _forget_upload(session.id)
+        raise HTTPException(status_code=400, detail="SHA-256 mismatch")
+
+    dest = shard_path(MEDIA_DIR, f"{sha256}{ext}")
+    commit_temp(part, dest)
+    stored = StoredFile(sha256=sha256, path=dest, size=session.offset)
+
+    title = session.title or session.filename
+    tag_names = list(session.tags)
+    await db.delete(session)
+    return await _create_stored_resource(db, stored, category, title, tag_names)
+
+
+@router.delete("/resources/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    async with _upload_lock(upload_id):
+        session = await _get_upload_session(db, upload_id)
+        _upload_part_path(session).unlink(missing_ok=True)
+        await db.delete(session)
+        await db.commit()
+    _forget_upload(upload_id)
+
+
 class ThumbnailRequest(BaseModel):
     timestamp: float
+    # Use the sprite sheet tile covering the timestamp instead of running ffmpeg
+    from_sprite: bool = False
 
 
 @router.post("/resources/{resource_id}/thumbnail", response_model=ResourceResponse)
@@ -464,42 +1397,17 @@ async def set_thumbnail(
     if not resource.filename:
         raise HTTPException(status_code=400, detail="Video file not found")
 
-    video_path = MEDIA_DIR / (resource.folder or "") / resource.filename
+    video_path = find_file(MEDIA_DIR, resource.filename, resource.folder)
     if not video_path.is_file():
         raise HTTPException(status_code=400, detail="Video file not found")
 
-    # Delete old thumbnail if exists
-    if resource.thumbnail:
-        old_thumb = THUMBNAIL_DIR / resource.thumbnail
-        if old_thumb.is_file():
-            old_thumb.unlink()
-
-    sha_prefix = resource.filename.rsplit(".", 1)[0]
-
     # For manual set_thumbnail, use the user-specified timestamp
-    thumb_filename = f"{sha_prefix}_thumb.jpg"
-    THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
-    thumb_path = THUMBNAIL_DIR / thumb_filename
-    proc = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-ss",
-        str(body.timestamp),
-        "-i",
-        str(video_path),
-        "-frames:v",
-        "1",
-        "-q:v",
-        "2",
-        str(thumb_path),
-        "-y",
-        stdout=asyncio.subprocess.DEVNULL,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    await proc.communicate()
-    if proc.returncode != 0 or not thumb_path.is_file():
-        raise HTTPException(status_code=400, detail="FFmpeg extraction failed")
+    error = await render_thumbnails(resource, body.timestamp, body.from_sprite)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
 
-    resource.thumbnail = thumb_filename
+    resource.thumbnail_status = "ready"
+    resource.thumbnail_error = None
     await db.commit()
     await db.refresh(resource)
     return resource
@@ -511,12 +1419,13 @@ async def remove_thumbnail(resource_id: int, db: AsyncSession = Depends(get_db))
     if not resource or resource.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Resource not found")
 
-    if resource.thumbnail:
-        thumb_path = THUMBNAIL_DIR / resource.thumbnail
-        if thumb_path.is_file():
-            thumb_path.unlink()
-        resource.thumbnail = None
-        await db.commit()
-        await db.refresh(resource)
+    delete_thumbnail_files(resource)
+    resource.thumbnail = None
+    resource.thumbnail_widths = None
+    resource.placeholder = None
+    # Not regenerated by the backfill; POST /thumbnails/{id}/retry renders it again
+    resource.thumbnail_status = "removed"
+    await db.commit()
+    await db.refresh(resource)
 
     return resource
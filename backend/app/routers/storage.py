@@ -0,0 +1,127 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import select
+
+from app.config import IMPORT_BATCH_SIZE, MEDIA_DIR, THUMBNAIL_DIR, TRASH_DIR
+from app.database import async_session
+from app.models import Resource
+from app.schemas import StorageMigrationResponse
+from app.storage import shard_path
+
+router = APIRouter(prefix="/storage", tags=["Storage"])
+
+_migration = StorageMigrationResponse(status="idle")
+_migration_task: asyncio.Task | None = None
+
+
+def _migrate_file(root: Path, name: str, folder: str | None = None) -> str:
+    """
+    Move one legacy file into the sharded layout.
+
+    Returns ``"moved"``, ``"sharded"`` (already migrated) or ``"missing"``.
+    """
+    dest = shard_path(root, name)
+    legacy = root / (folder or "") / name
+    if not legacy.is_file() or legacy == dest:
+        return "sharded" if dest.is_file() else "missing"
+    if dest.exists():
+        # Same content already stored under the new layout
+        legacy.unlink()
+        return "moved"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(legacy, dest)
+    return "moved"
+
+
+def _migrate_resource(resource: Resource) -> tuple[int, int]:
+    moved = missing = 0
+    if resource.filename:
+        if resource.deleted_at is not None:
+            outcome = _migrate_file(TRASH_DIR, resource.filename)
+        else:
+            outcome = _migrate_file(MEDIA_DIR, resource.filename, resource.folder)
+        moved += outcome == "moved"
+        missing += outcome == "missing"
+    if resource.thumbnail:
+        outcome = _migrate_file(THUMBNAIL_DIR, resource.thumbnail)
+        moved += outcome == "moved"
+        missing += outcome == "missing"
+    return moved, missing
+
+
+def _prune_legacy_folders(folders: set[str]) -> None:
+    for folder in sorted(folders, key=len, reverse=True):
+        path = MEDIA_DIR / folder
+        while path != MEDIA_DIR and path.is_dir():
+            try:
+                path.rmdir()
+            except OSError:
+                break  # not empty
+            path = path.parent
+
+
+async def migrate_storage(progress: StorageMigrationResponse) -> None:
+    """
+    Move every file of the flat legacy layout to its sharded location.
+
+    Resources are walked in id order and each file is moved with an atomic
+    rename, so the library stays fully readable while this runs:
+    ``find_file`` serves a file from whichever location it is at. Running it
+    again is harmless.
+    """
+    progress.status = "running"
+    progress.started_at = datetime.now(timezone.utc)
+    folders: set[str] = set()
+    cursor = 0
+    async with async_session() as db:
+        progress.total = len((await db.execute(select(Resource.id))).scalars().all())
+        while True:
+            result = await db.execute(
+                select(Resource)
+                .where(Resource.id > cursor)
+                .order_by(Resource.id)
+                .limit(IMPORT_BATCH_SIZE)
+            )
+            batch = result.scalars().all()
+            if not batch:
+                break
+            for resource in batch:
+                moved, missing = await asyncio.to_thread(_migrate_resource, resource)
+                progress.moved += moved
+                progress.missing += missing
+                progress.processed += 1
+                if resource.folder:
+                    folders.add(resource.folder)
+            cursor = batch[-1].id
+    await asyncio.to_thread(_prune_legacy_folders, folders)
+    progress.status = "completed"
+    progress.finished_at = datetime.now(timezone.utc)
+
+
+async def _run_migration(progress: StorageMigrationResponse) -> None:
+    try:
+        await migrate_storage(progress)
+    except Exception as exc:
+        progress.status = "failed"
+        progress.error = str(exc)
+        progress.finished_at = datetime.now(timezone.utc)
+
+
+@router.post("/migrate", response_model=StorageMigrationResponse, status_code=202)
+async def start_migration():
+    """Start moving legacy flat files into the sharded layout in the background."""
+    global _migration, _migration_task
+    if _migration_task is not None and not _migration_task.done():
+        raise HTTPException(status_code=409, detail="Migration already running")
+    _migration = StorageMigrationResponse(status="pending")
+    _migration_task = asyncio.create_task(_run_migration(_migration))
+    return _migration
+
+
+@router.get("/migrate", response_model=StorageMigrationResponse)
+async def get_migration():
+    return _migration
@@ -0,0 +1,724 @@
+import asyncio
+import logging
+import math
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from PIL import Image
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (
+    MEDIA_DIR,
+    SPRITE_COLUMNS,
+    SPRITE_INTERVAL,
+    SPRITE_MAX_TILES,
+    SPRITE_TILE_WIDTH,
+    THUMBNAIL_CANDIDATES,
+    THUMBNAIL_CONCURRENCY,
+    THUMBNAIL_DIR,
+    THUMBNAIL_DEFAULT_WIDTH,
+    THUMBNAIL_IMAGE_FORMAT,
+    THUMBNAIL_RETRIES,
+    THUMBNAIL_SEEK,
+    THUMBNAIL_WIDTHS,
+    VIDEO_EXTENSIONS,
+)
+from app.converters import (
+    crop_tile,
+    extract_frame,
+    make_placeholder,
+    make_sprite_sheet,
+    make_thumbnails,
+    probe_video,
+    read_image_size,
+    read_media_header,
+)
+from app.converters.probe import ProbeResult
+from app.database import async_session, get_db
+from app.models import Resource
+from app.schemas import ResourceResponse, ThumbnailQueueResponse
+from app.storage import find_file, shard_path
+
+router = APIRouter(tags=["Thumbnails"])
+logger = logging.getLogger(__name__)
+
+_THUMBNAIL_RETRY_DELAY = 5.0  # seconds, doubled on each attempt
+# Stored as the placeholder of a thumbnail none could be encoded from
+_NO_PLACEHOLDER = ""
+
+# thumbnail_status values: None (never considered), "pending", "ready",
+# "failed", and "removed" once the user deleted the thumbnail.
+
+# Resources waiting for a worker. The persisted thumbnail_status is the source
+# of truth; pending resources are requeued on startup.
+_queue: asyncio.Queue[int] | None = None
+_workers: list[asyncio.Task] = []
+_retries: set[asyncio.Task] = set()
+_ffmpeg_slots: asyncio.Semaphore | None = None
+
+
+def ffmpeg_slot() -> asyncio.Semaphore:
+    """Bounds the number of ffmpeg processes spawned for thumbnails at once."""
+    global _ffmpeg_slots
+    if _ffmpeg_slots is None:
+        _ffmpeg_slots = asyncio.Semaphore(THUMBNAIL_CONCURRENCY)
+    return _ffmpeg_slots
+
+
+# Image formats Pillow can decode; SVGs are served as they are.
+_IMAGE_THUMBNAIL_EXTENSIONS = {
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".bmp",
+    ".webp",
+    ".tiff",
+}
+
+
+def wants_thumbnail(filename: str | None) -> bool:
+    """Whether a thumbnail can be rendered for a stored file."""
+    if not filename:
+        return False
+    ext = Path(filename).suffix.lower()
+    return ext in VIDEO_EXTENSIONS or ext in _IMAGE_THUMBNAIL_EXTENSIONS
+
+
+def variant_name(filename: str, width: int) -> str:
+    """Name of the thumbnail of ``filename`` rendered at ``width``."""
+    stem = filename.rpartition(".")[0]
+    return f"{stem}_thumb_{width}.{THUMBNAIL_IMAGE_FORMAT}"
+
+
+def pick_width(widths: list[int], requested: float) -> int:
+    """Smallest width covering ``requested`` pixels, else the largest."""
+    fitting = [w for w in widths if w >= requested]
+    return min(fitting) if fitting else max(widths)
+
+
+def thumbnail_variant(resource: Resource, width: int) -> str:
+    """Name of a rendered width of a resource's thumbnail."""
+    # In the format the default variant was rendered in, which may predate a
+    # change of THUMBNAIL_IMAGE_FORMAT
+    stem = resource.filename.rpartition(".")[0]
+    return f"{stem}_thumb_{width}{Path(resource.thumbnail).suffix}"
+
+
+def thumbnail_files(resource: Resource) -> list[str]:
+    """Names of every thumbnail file of a resource."""
+    if not resource.thumbnail:
+        return []
+    names = {resource.thumbnail}
+    for width in resource.thumbnail_widths or []:
+        names.add(thumbnail_variant(resource, width))
+    return sorted(names)
+
+
+def delete_thumbnail_files(resource: Resource) -> None:
+    """Remove every thumbnail file of a resource from THUMBNAIL_DIR."""
+    for name in thumbnail_files(resource):
+        find_file(THUMBNAIL_DIR, name).unlink(missing_ok=True)
+
+
+def _sprite_rows(resource: Resource) -> int:
+    return math.ceil(resource.sprite_count / resource.sprite_columns)
+
+
+async def _sprite_frame(resource: Resource, timestamp: float, frame: Path) -> bool:
+    """Crop the sprite tile covering ``timestamp`` instead of running ffmpeg."""
+    sheet = find_file(THUMBNAIL_DIR, resource.sprite)
+    index = min(int(timestamp // resource.sprite_interval), resource.sprite_count - 1)
+    return await asyncio.to_thread(
+        crop_tile,
+        sheet,
+        frame,
+        max(index, 0),
+        resource.sprite_columns,
+        _sprite_rows(resource),
+    )
+
+
+def _legacy_thumbnail(resource: Resource) -> Path | None:
+    """The single-size thumbnail file of a video from before the width pyramid."""
+    if resource.category != "video" or not resource.thumbnail:
+        return None
+    if resource.thumbnail_widths:
+        return None
+    path = find_file(THUMBNAIL_DIR, resource.thumbnail)
+    return path if path.is_file() else None
+
+
+async def render_thumbnails(
+    resource: Resource, timestamp: float | None = None, from_sprite: bool = False
+) -> str | None:
+    """
+    Render a resource's thumbnails at every THUMBNAIL_WIDTHS width.
+
+    Videos have one frame extracted by ffmpeg, already downscaled to the
+    largest width, which is then scaled like an image. Without a
+    ``timestamp`` it is the most representative of the first keyframes after
+    THUMBNAIL_SEEK, found by decoding keyframes only; with one, it is the
+    exact frame at that time. With ``from_sprite`` the frame is instead the
+    sprite sheet tile covering ``timestamp``, so no ffmpeg process is spawned;
+    thumbnails are then no wider than SPRITE_TILE_WIDTH. A single-size
+    thumbnail from before the width pyramid, which may be a frame the user
+    picked, is scaled instead of extracting a new frame when neither is given.
+    Sets ``thumbnail`` (the default width) and ``thumbnail_widths``; returns
+    an error or None.
+    """
+    source = find_file(MEDIA_DIR, resource.filename, resource.folder)
+    if not source.is_file():
+        return "Media file not found"
+    outputs = {
+        width: shard_path(THUMBNAIL_DIR, variant_name(resource.filename, width))
+        for width in THUMBNAIL_WIDTHS
+    }
+    frame = None
+    legacy = (
+        None if timestamp is not None or from_sprite else _legacy_thumbnail(resource)
+    )
+    if legacy is not None:
+        source = legacy
+    elif source.suffix.lower() in VIDEO_EXTENSIONS:
+        stem = resource.filename.rpartition(".")[0]
+        frame = shard_path(THUMBNAIL_DIR, f"{stem}_frame.jpg")
+        frame.parent.mkdir(parents=True, exist_ok=True)
+        if from_sprite:
+            if not resource.sprite_count:
+                return "Sprite sheet not available"
+            if not await _sprite_frame(resource, timestamp or 0.0, frame):
+                return "Sprite sheet could not be read"
+        else:
+            async with ffmpeg_slot():
+                if timestamp is None:
+                    ok = await extract_frame(
+                        source,
+                        frame,
+                        THUMBNAIL_SEEK,
+                        exact=False,
+                        max_width=max(THUMBNAIL_WIDTHS),
+                        candidates=THUMBNAIL_CANDIDATES,
+                    )
+                else:
+                    ok = await extract_frame(
+                        source, frame, timestamp, max_width=max(THUMBNAIL_WIDTHS)
+                    )
+            if not ok:
+                return "FFmpeg extraction failed"
+        source = frame
+    try:
+        # Decoding and resizing release the GIL, so a thread per worker is
+        # enough to keep them off the event loop.
+        widths = await asyncio.to_thread(make_thumbnails, source, outputs)
+    finally:
+        if frame is not None:
+            frame.unlink(missing_ok=True)
+    if not widths:
+        return "Image could not be decoded"
+
+    new_names = {outputs[width].name for width in widths}
+    for name in thumbnail_files(resource):
+        if name not in new_names:
+            find_file(THUMBNAIL_DIR, name).unlink(missing_ok=True)
+    resource.thumbnail = variant_name(
+        resource.filename, pick_width(widths, THUMBNAIL_DEFAULT_WIDTH)
+    )
+    resource.thumbnail_widths = widths
+    # From the smallest variant just written, which is quick to decode again
+    resource.placeholder = (
+        await asyncio.to_thread(make_placeholder, outputs[min(widths)])
+        or _NO_PLACEHOLDER
+    )
+    return None
+
+
+async def probe_resource(resource: Resource) -> None:
+    """
+    Read and store a resource's media metadata.
+
+    Videos get their codecs, container, duration and size from their header
+    when they are MP4/MOV or Matroska/WebM, and from ffprobe otherwise; images
+    only have their header read for width and height. ``probed_at`` is set
+    even when probing fails, so that nothing probes the file again.
+    """
+    source = find_file(MEDIA_DIR, resource.filename, resource.folder)
+    if not source.is_file():
+        return
+    if source.suffix.lower() in VIDEO_EXTENSIONS:
+        probe = await asyncio.to_thread(read_media_header, source)
+        if probe is None:
+            async with ffmpeg_slot():
+                probe = await probe_video(source)
+        if probe is not None:
+            resource.duration = probe.duration
+            resource.width = probe.width
+            resource.height = probe.height
+            resource.video_codec = probe.video_codec
+            resource.audio_codec = probe.audio_codec
+            resource.container = probe.container
+    else:
+        size = await asyncio.to_thread(read_image_size, source)
+        if size is not None:
+            resource.width, resource.height = size
+    resource.probed_at = datetime.now(timezone.utc)
+
+
+def stored_probe(resource: Resource) -> ProbeResult | None:
+    """The probe result stored on a video, or None if it was never probed."""
+    if resource.probed_at is None or resource.video_codec is None:
+        return None
+    return ProbeResult(
+        video_codec=resource.video_codec,
+        audio_codec=resource.audio_codec,
+        container=resource.container,
+        duration=resource.duration,
+        width=resource.width,
+        height=resource.height,
+    )
+
+
+def delete_sprite_file(resource: Resource) -> None:
+    if resource.sprite:
+        find_file(THUMBNAIL_DIR, resource.sprite).unlink(missing_ok=True)
+
+
+async def render_sprite(resource: Resource) -> bool:
+    """
+    Render the scrubbing sprite sheet of a video in one ffmpeg pass.
+
+    Needs the duration stored by ``probe_resource``. Sets the ``sprite``
+    fields; ``sprite_count`` is left at 0 on failure so that the backfill does
+    not retry it on every startup.
+    """
+    source = find_file(MEDIA_DIR, resource.filename, resource.folder)
+    delete_sprite_file(resource)
+    resource.sprite = None
+    resource.sprite_count = 0
+    if not resource.duration:
+        return False
+    interval = max(SPRITE_INTERVAL, resource.duration / SPRITE_MAX_TILES)
+    count = max(1, math.ceil(resource.duration / interval))
+    async with ffmpeg_slot():
+        columns = min(SPRITE_COLUMNS, count)
+        name = f"{resource.filename.rpartition('.')[0]}_sprite.jpg"
+        sheet = shard_path(THUMBNAIL_DIR, name)
+        sheet.parent.mkdir(parents=True, exist_ok=True)
+        ok = await make_sprite_sheet(
+            source,
+            sheet,
+            interval=interval,
+            columns=columns,
+            rows=math.ceil(count / columns),
+            tile_width=SPRITE_TILE_WIDTH,
+        )
+    if not ok:
+        return False
+    resource.sprite = name
+    resource.sprite_interval = interval
+    resource.sprite_columns = columns
+    resource.sprite_count = count
+    return True
+
+
+def _image_size(path: Path) -> tuple[int, int]:
+    # Only the header is read
+    with Image.open(path) as img:
+        return img.size
+
+
+def _vtt_time(seconds: float) -> str:
+    millis = round(seconds * 1000)
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    return f"{hours:02}:{minutes:02}:{millis // 1000:02}.{millis % 1000:03}"
+
+
+def sprite_vtt(resource: Resource, sheet_url: str, sheet_size: tuple[int, int]) -> str:
+    """WebVTT track mapping each sprite interval to its tile (``#xywh=``)."""
+    tile_w = sheet_size[0] // resource.sprite_columns
+    tile_h = sheet_size[1] // _sprite_rows(resource)
+    lines = ["WEBVTT", ""]
+    for index in range(resource.sprite_count):
+        start = index * resource.sprite_interval
+        x = (index % resource.sprite_columns) * tile_w
+        y = (index // resource.sprite_columns) * tile_h
+        lines += [
+            f"{_vtt_time(start)} --> {_vtt_time(start + resource.sprite_interval)}",
+            f"{sheet_url}#xywh={x},{y},{tile_w},{tile_h}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+async def _retry_later(resource_id: int, delay: float) -> None:
+    await asyncio.sleep(delay)
+    _get_queue().put_nowait(resource_id)
+
+
+async def _process(resource_id: int) -> None:
+    async with async_session() as db:
+        resource = await db.get(Resource, resource_id)
+        if (
+            resource is None
+            or resource.deleted_at is not None
+            or resource.thumbnail_status != "pending"
+        ):
+            return
+        resource.thumbnail_attempts += 1
+        if resource.probed_at is None:
+            await probe_resource(resource)
+        error = await render_thumbnails(resource)
+        if error is None:
+            if resource.category == "video":
+                # Best effort: a video without a sprite still has its thumbnail
+                await render_sprite(resource)
+            resource.thumbnail_status = "ready"
+            resource.thumbnail_error = None
+        elif resource.thumbnail_attempts < THUMBNAIL_RETRIES:
+            resource.thumbnail_error = error
+            delay = _THUMBNAIL_RETRY_DELAY * 2 ** (resource.thumbnail_attempts - 1)
+            task = asyncio.create_task(_retry_later(resource_id, delay))
+            _retries.add(task)
+            task.add_done_callback(_retries.discard)
+        else:
+            resource.thumbnail_status = "failed"
+            resource.thumbnail_error = error
+        await db.commit()
+
+
+async def _mark_failed(resource_id: int, error: str) -> None:
+    """Record an unexpected error, so that the row does not stay pending."""
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(Resource)
+                .where(Resource.id == resource_id)
+                .where(Resource.thumbnail_status == "pending")
+                .values(thumbnail_status="failed", thumbnail_error=error)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Could not mark thumbnail of resource %s failed", resource_id)
+
+
+async def _worker(queue: asyncio.Queue[int]) -> None:
+    while True:
+        resource_id = await queue.get()
+        try:
+            await _process(resource_id)
+        except Exception as exc:
+            # Shown by /thumbnails/failed and retried with /thumbnails/{id}/retry
+            logger.exception("Thumbnail of resource %s failed", resource_id)
+            await _mark_failed(resource_id, f"{type(exc).__name__}: {exc}")
+        finally:
+            queue.task_done()
+
+
+def _get_queue() -> asyncio.Queue[int]:
+    """Return the work queue, starting the workers on first use."""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+        _workers.extend(
+            asyncio.create_task(_worker(_queue)) for _ in range(THUMBNAIL_CONCURRENCY)
+        )
+    return _queue
+
+
+def enqueue_thumbnail(resource_id: int) -> None:
+    """Queue a resource whose thumbnail_status is "pending"."""
+    _get_queue().put_nowait(resource_id)
+
+
+async def backfill_thumbnails(batch_size: int = 500) -> None:
+    """
+    Queue thumbnails for resources created before they were rendered at ingest.
+
+    Visits rows whose status was never set and single-size thumbnails from
+    before the width pyramid; those that can be rendered are marked "pending"
+    and queued. Existing video thumbnails are scaled rather than replaced by
+    a new frame, see ``render_thumbnails``.
+    """
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Resource)
+                .where(
+                    or_(
+                        Resource.thumbnail_status.is_(None),
+                        and_(
+                            Resource.thumbnail_status == "ready",
+                            Resource.thumbnail.isnot(None),
+                            Resource.thumbnail_widths.is_(None),
+                        ),
+                    )
+                )
+                .where(Resource.filename.isnot(None))
+                .where(Resource.deleted_at.is_(None))
+                .where(Resource.id > last_id)
+                .order_by(Resource.id)
+                .limit(batch_size)
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return
+            queued = []
+            for resource in resources:
+                if wants_thumbnail(resource.filename):
+                    resource.thumbnail_status = "pending"
+                    queued.append(resource.id)
+            last_id = resources[-1].id
+            await db.commit()
+        for resource_id in queued:
+            enqueue_thumbnail(resource_id)
+
+
+async def backfill_sprites(batch_size: int = 50) -> None:
+    """
+    Render sprite sheets of videos thumbnailed before sprites existed.
+
+    Only the sprite is rendered: the poster thumbnail, which the user may
+    have picked with ``set_thumbnail``, is left as it is. Each sheet is
+    committed on its own since rendering one takes a while.
+    """
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Resource)
+                .where(Resource.category == "video")
+                .where(Resource.thumbnail_status == "ready")
+                .where(Resource.thumbnail_widths.isnot(None))
+                .where(Resource.sprite_count.is_(None))
+                .where(Resource.filename.isnot(None))
+                .where(Resource.deleted_at.is_(None))
+                .where(Resource.id > last_id)
+                .order_by(Resource.id)
+                .limit(batch_size)
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return
+            for resource in resources:
+                if resource.probed_at is None:
+                    await probe_resource(resource)
+                await render_sprite(resource)
+                await db.commit()
+            last_id = resources[-1].id
+
+
+def _placeholders(resources: list[Resource]) -> list[str]:
+    """Encode placeholders from each resource's smallest thumbnail variant."""
+    placeholders = []
+    for resource in resources:
+        path = find_file(
+            THUMBNAIL_DIR, thumbnail_variant(resource, min(resource.thumbnail_widths))
+        )
+        placeholders.append(make_placeholder(path) or _NO_PLACEHOLDER)
+    return placeholders
+
+
+async def backfill_placeholders(batch_size: int = 200) -> None:
+    """
+    Compute placeholders for thumbnails rendered before they existed.
+
+    Each batch is looked up and encoded in one worker thread from the
+    smallest thumbnail variant, and committed together. Rows whose variant is
+    missing or undecodable are marked so that they are not visited again.
+    """
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Resource)
+                .where(Resource.placeholder.is_(None))
+                .where(Resource.thumbnail.isnot(None))
+                .where(Resource.thumbnail_widths.isnot(None))
+                .where(Resource.deleted_at.is_(None))
+                .where(Resource.id > last_id)
+                .order_by(Resource.id)
+                .limit(batch_size)
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return
+            placeholders = await asyncio.to_thread(_placeholders, resources)
+            for resource, placeholder in zip(resources, placeholders):
+                resource.placeholder = placeholder
+            last_id = resources[-1].id
+            await db.commit()
+
+
+async def backfill_probes(batch_size: int = 100) -> None:
+    """Store the metadata of resources ingested before it was probed."""
+    last_id = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Resource)
+                .where(Resource.probed_at.is_(None))
+                .where(Resource.filename.isnot(None))
+                .where(Resource.deleted_at.is_(None))
+                .where(Resource.id > last_id)
+                .order_by(Resource.id)
+                .limit(batch_size)
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return
+            for resource in resources:
+                if wants_thumbnail(resource.filename):
+                    await probe_resource(resource)
+            last_id = resources[-1].id
+            await db.commit()
+
+
+async def start_thumbnail_workers() -> None:
+    """Requeue thumbnails that were still pending when the server stopped."""
+    async with async_session() as db:
+        result = await db.execute(
+            select(Resource.id)
+            .where(Resource.thumbnail_status == "pending")
+            .order_by(Resource.id)
+        )
+        for resource_id in result.scalars().all():
+            enqueue_thumbnail(resource_id)
+
+
+async def stop_thumbnail_workers() -> None:
+    global _queue, _ffmpeg_slots
+    tasks = [*_workers, *_retries]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+    _retries.clear()
+    _queue = None
+    _ffmpeg_slots = None
+
+
+@router.get("/thumbnails/queue", response_model=ThumbnailQueueResponse)
+async def thumbnail_queue(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Resource.thumbnail_status, func.count())
+        .where(Resource.thumbnail_status.in_(["pending", "failed"]))
+        .group_by(Resource.thumbnail_status)
+    )
+    counts = dict(result.all())
+    return ThumbnailQueueResponse(
+        queued=_queue.qsize() if _queue is not None else 0,
+        pending=counts.get("pending", 0),
+        failed=counts.get("failed", 0),
+    )
+
+
+@router.get("/thumbnails/failed", response_model=list[ResourceResponse])
+async def failed_thumbnails(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Resource)
+        .where(Resource.thumbnail_status == "failed", Resource.deleted_at.is_(None))
+        .order_by(Resource.id)
+    )
+    return result.scalars().all()
+
+
+@router.post("/thumbnails/{resource_id}/retry", response_model=ResourceResponse)
+async def retry_thumbnail(resource_id: int, db: AsyncSession = Depends(get_db)):
+    resource = await db.get(Resource, resource_id)
+    if not resource or resource.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    if not wants_thumbnail(resource.filename):
+        raise HTTPException(
+            status_code=400, detail="Resource does not support thumbnails"
+        )
+    resource.thumbnail_status = "pending"
+    resource.thumbnail_attempts = 0
+    resource.thumbnail_error = None
+    await db.commit()
+    await db.refresh(resource)
+    enqueue_thumbnail(resource.id)
+    return resource
+
+
+def _revalidated_file(request: Request, path: Path) -> Response:
+    """
+    Serve a file that is re-rendered under the same name (thumbnails after
+    ``set_thumbnail``, sprite sheets). Caches must revalidate it on each use,
+    which costs a 304 while the file is unchanged.
+    """
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    sent = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in sent.split(",")):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, stat_result=stat)
+
+
+@router.get("/resources/{resource_id}/thumbnail")
+async def get_thumbnail(
+    request: Request,
+    resource_id: int,
+    w: int | None = Query(None, ge=1, description="Display width in CSS pixels"),
+    dpr: float = Query(1.0, gt=0, le=4, description="Device pixel ratio"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Serve the thumbnail variant best suited to a display width.
+
+    Returns the smallest rendered width covering ``w * dpr`` pixels, the
+    largest one when none does, and the default width when ``w`` is omitted.
+    """
+    resource = await db.get(Resource, resource_id)
+    if not resource or resource.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    if not resource.thumbnail:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    name = resource.thumbnail
+    if w is not None and resource.thumbnail_widths:
+        width = pick_width(resource.thumbnail_widths, w * dpr)
+        name = thumbnail_variant(resource, width)
+    path = find_file(THUMBNAIL_DIR, name)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return _revalidated_file(request, path)
+
+
+async def _get_sprite_resource(db: AsyncSession, resource_id: int) -> Resource:
+    resource = await db.get(Resource, resource_id)
+    if not resource or resource.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    if not resource.sprite_count:
+        raise HTTPException(status_code=404, detail="Sprite sheet not found")
+    return resource
+
+
+@router.get("/resources/{resource_id}/sprite.jpg")
+async def get_sprite(
+    request: Request, resource_id: int, db: AsyncSession = Depends(get_db)
+):
+    resource = await _get_sprite_resource(db, resource_id)
+    path = find_file(THUMBNAIL_DIR, resource.sprite)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Sprite sheet not found")
+    return _revalidated_file(request, path)
+
+
+@router.get("/resources/{resource_id}/sprite.vtt")
+async def get_sprite_vtt(resource_id: int, db: AsyncSession = Depends(get_db)):
+    """Thumbnail track for the player; cue URLs are relative to this one."""
+    resource = await _get_sprite_resource(db, resource_id)
+    path = find_file(THUMBNAIL_DIR, resource.sprite)
+    try:
+        size = await asyncio.to_thread(_image_size, path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Sprite sheet not found")
+    return PlainTextResponse(
+        sprite_vtt(resource, "sprite.jpg", size), media_type="text/vtt"
+    )
@@ -8,6 +8,7 @@ from app.config import MEDIA_DIR, TRASH_DIR
 from app.database import get_db
 from app.models import Resource
 from app.schemas import TrashResponse
+from app.storage import find_file, shard_path
 
 router = APIRouter(tags=["Trash"])
 
@@ -29,8 +30,8 @@ async def restore_resource(resource_id: int, db: AsyncSession = Depends(get_db))
         raise HTTPException(status_code=404, detail="Trashed resource not found")
 
     if resource.filename:
-        src = TRASH_DIR / resource.filename
-        dest = MEDIA_DIR / (resource.folder or "") / resource.filename
+        src = find_file(TRASH_DIR, resource.filename)
+        dest = shard_path(MEDIA_DIR, resource.filename)
         if src.is_file():
             dest.parent.mkdir(parents=True, exist_ok=True)
             shutil.move(str(src), str(dest))
@@ -48,7 +49,7 @@ async def permanently_delete(resource_id: int, db: AsyncSession = Depends(get_db
         raise HTTPException(status_code=404, detail="Trashed resource not found")
 
     if resource.filename:
-        trash_file = TRASH_DIR / resource.filename
+        trash_file = find_file(TRASH_DIR, resource.filename)
         if trash_file.is_file():
             trash_file.unlink()
 
@@ -63,7 +64,7 @@ async def empty_trash(db: AsyncSession = Depends(get_db)):
 
     for resource in resources:
         if resource.filename:
-            trash_file = TRASH_DIR / resource.filename
+            trash_file = find_file(TRASH_DIR, resource.filename)
             if trash_file.is_file():
                 trash_file.unlink()
         await db.delete(resource)
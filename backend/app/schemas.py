@@ -41,13 +41,44 @@ class ResourceResponse(BaseModel):
     filename: str | None
     title: str | None
     folder: str | None = None
+    size: int | None = None
     thumbnail: str | None = None
+    thumbnail_status: str | None = None
+    thumbnail_error: str | None = None
+    thumbnail_widths: list[int] | None = None
+    placeholder: str | None = None
+    duration: float | None = None
+    width: int | None = None
+    height: int | None = None
+    video_codec: str | None = None
+    audio_codec: str | None = None
+    container: str | None = None
+    sprite: str | None = None
+    sprite_interval: float | None = None
     created_at: datetime
     tags: list[TagResponse] = []
 
     model_config = {"from_attributes": True}
 
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    title: str | None = None
+    tags: list[str] = []
+    size: int | None = None
+    sha256: str | None = None
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    size: int | None = None
+    offset: int
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class TrashResponse(BaseModel):
     id: int
     category: ResourceCategory
@@ -69,6 +100,8 @@ class PaginatedResponse(BaseModel):
 
 class ScanRequest(BaseModel):
     path: str
+    # Only report files that are new or changed since the previous scan
+    incremental: bool = False
 
 
 class ScannedFile(BaseModel):
@@ -87,8 +120,17 @@ class ImportFileItem(BaseModel):
     type: ResourceCategory
 
 
+class ImportStrategy(str, Enum):
+    copy = "copy"
+    hardlink = "hardlink"
+    reflink = "reflink"
+    move = "move"
+
+
 class ImportRequest(BaseModel):
     files: list[ImportFileItem]
+    # How files get into MEDIA_DIR; falls back to copy where unsupported
+    strategy: ImportStrategy = ImportStrategy.copy
 
 
 class ImportResponse(BaseModel):
@@ -96,6 +138,76 @@ class ImportResponse(BaseModel):
     skipped: int
 
 
+class ImportJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    cancelled = "cancelled"
+    failed = "failed"
+
+
+class ImportJobResponse(BaseModel):
+    id: str
+    status: ImportJobStatus
+    strategy: ImportStrategy
+    total_files: int
+    files_done: int
+    imported: int
+    skipped: int
+    failed: int
+    bytes_copied: int
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    bytes_per_second: float | None = None
+    files_per_second: float | None = None
+    eta_seconds: float | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class DownloadJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    cancelled = "cancelled"
+    failed = "failed"
+
+
+class DownloadJobResponse(BaseModel):
+    id: str
+    url: str
+    status: DownloadJobStatus
+    attempts: int
+    bytes_received: int
+    resource_id: int | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    bytes_per_second: float | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class ThumbnailQueueResponse(BaseModel):
+    queued: int
+    pending: int
+    failed: int
+
+
+class StorageMigrationResponse(BaseModel):
+    status: str
+    total: int = 0
+    processed: int = 0
+    moved: int = 0
+    missing: int = 0
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
 class StatsResponse(BaseModel):
     images: int
     videos: int
@@ -0,0 +1,288 @@
+import asyncio
+import errno
+import hashlib
+import multiprocessing
+import os
+import shutil
+import uuid
+from collections.abc import AsyncIterable, AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from fastapi.staticfiles import StaticFiles
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.config import IMPORT_HASH_WORKERS
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+PARTIAL_HASH_BLOCK = 64 * 1024
+
+# ioctl request number for cloning a file's extents (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+@dataclass
+class StoredFile:
+    sha256: str
+    path: Path
+    size: int
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+
+def shard_path(root: Path, name: str) -> Path:
+    """
+    Canonical location of a content-addressed file: ``root/ab/cd/<name>``.
+
+    Fanning out on the first two bytes of the hash keeps directories small
+    enough for fast lookups, listings and backups.
+    """
+    return root / name[:2] / name[2:4] / name
+
+
+def find_file(root: Path, name: str, folder: str | None = None) -> Path:
+    """
+    Locate ``name`` under ``root``, preferring the sharded layout.
+
+    Files that have not been migrated yet are still found at their legacy flat
+    location (``root/<folder>/<name>``). When the file exists nowhere, the
+    sharded path is returned.
+    """
+    path = shard_path(root, name)
+    if path.exists():
+        return path
+    legacy = root / (folder or "") / name
+    if legacy.exists():
+        return legacy
+    return path
+
+
+def temp_path(directory: Path) -> Path:
+    """Return a unique hidden temp path inside ``directory``.
+
+    Temp files live on the same volume as their final destination so that the
+    closing rename is atomic.
+    """
+    return directory / f".{uuid.uuid4().hex}.part"
+
+
+def commit_temp(tmp: Path, dest: Path) -> None:
+    """Atomically move ``tmp`` to ``dest``, or drop it if ``dest`` already exists."""
+    if dest.exists():
+        tmp.unlink(missing_ok=True)
+    else:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, dest)
+
+
+def sha256_file(path: Path, chunk_size: int = CHUNK_SIZE) -> str:
+    """Hash a file on disk without loading it into memory."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool used for hashing files on disk.
+
+    Workers are spawned rather than forked because the server process runs
+    threads (the asyncio default executor, aiosqlite).
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=IMPORT_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+async def hash_file(path: Path) -> str:
+    """Hash a file on the shared process pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_pool(), sha256_file, path)
+
+
+def copy_hashed(src: Path, directory: Path, ext: str) -> StoredFile:
+    """
+    Copy ``src`` into ``directory`` as ``<sha256><ext>`` (sharded).
+
+    The file is hashed in the same read pass as the copy, through a temp file
+    so the content-addressed name is never partial.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(directory)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            while chunk := fin.read(CHUNK_SIZE):
+                hasher.update(chunk)
+                fout.write(chunk)
+                size += len(chunk)
+        shutil.copystat(src, tmp)
+        sha256 = hasher.hexdigest()
+        dest = shard_path(directory, f"{sha256}{ext}")
+        commit_temp(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return StoredFile(sha256=sha256, path=dest, size=size)
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported", str(src))
+    try:
+        with open(src, "rb") as fin, open(dest, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+
+
+def place_file(src: Path, dest: Path, strategy: str) -> str:
+    """
+    Put ``src`` at ``dest`` using an import strategy.
+
+    ``hardlink``, ``reflink`` and ``move`` fall back to a copy when the
+    filesystem cannot do them (different device, no reflink support, ...).
+    When ``dest`` already exists (a duplicate) nothing is placed, and a moved
+    source is left where it is: the source is only removed once its content
+    is at ``dest``. Returns the strategy that was actually used.
+    """
+    if dest.exists():
+        return strategy
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(dest.parent)
+    used = strategy
+    renamed = False
+    try:
+        try:
+            if strategy == "hardlink":
+                os.link(src, tmp)
+            elif strategy == "reflink":
+                _reflink(src, tmp)
+            elif strategy == "move":
+                os.rename(src, tmp)
+                renamed = True
+            else:
+                used = "copy"
+                shutil.copy2(src, tmp)
+        except OSError:
+            if used == "copy":
+                raise
+            used = "copy"
+            shutil.copy2(src, tmp)
+        if renamed and dest.exists():
+            # Placed concurrently by an identical file: restore the source
+            os.rename(tmp, src)
+            return strategy
+        commit_temp(tmp, dest)
+    except BaseException:
+        if renamed and tmp.exists():
+            os.rename(tmp, src)
+        tmp.unlink(missing_ok=True)
+        raise
+    if strategy == "move" and not renamed and dest.exists():
+        src.unlink()
+    return used
+
+
+def partial_hash(path: Path) -> str:
+    """
+    Cheap fingerprint of a file: its size plus its first and last blocks.
+
+    Files with different fingerprints are certainly different; equal
+    fingerprints still need a full hash to confirm a duplicate.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        hasher = hashlib.sha256(str(size).encode())
+        hasher.update(f.read(PARTIAL_HASH_BLOCK))
+        if size > PARTIAL_HASH_BLOCK:
+            f.seek(max(size - PARTIAL_HASH_BLOCK, PARTIAL_HASH_BLOCK))
+            hasher.update(f.read(PARTIAL_HASH_BLOCK))
+    return hasher.hexdigest()
+
+
+async def iter_upload(
+    file: UploadFile, chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield an ``UploadFile`` body in fixed-size chunks."""
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+def _write_chunk(f: BinaryIO, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+async def store_stream(
+    chunks: AsyncIterable[bytes], directory: Path, ext: str
+) -> StoredFile:
+    """
+    Write a byte stream into ``directory`` as ``<sha256><ext>`` (sharded).
+
+    Each chunk is hashed and appended to a temp file as it arrives, so peak
+    memory is bounded by the chunk size rather than the file size. Once the
+    stream is exhausted the temp file is renamed to its content-addressed name,
+    or discarded if that file is already present.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(directory)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as f:
+            async for chunk in chunks:
+                await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+                size += len(chunk)
+        sha256 = hasher.hexdigest()
+        dest = shard_path(directory, f"{sha256}{ext}")
+        commit_temp(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return StoredFile(sha256=sha256, path=dest, size=size)
+
+
+class ShardedStaticFiles(StaticFiles):
+    """
+    Serve content-addressed files by name from the sharded layout.
+
+    URLs keep their flat form (``/<folder>/<name>``); the last path segment is
+    looked up under ``root/ab/cd/`` first, then at its legacy location.
+    """
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        name = os.path.basename(path)
+        if name and not name.startswith("."):
+            for directory in self.all_directories:
+                full_path = shard_path(Path(directory), name)
+                try:
+                    return str(full_path), os.stat(full_path)
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+        return super().lookup_path(path)
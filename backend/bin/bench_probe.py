@@ -0,0 +1,206 @@
+"""
+Compare metadata probing latency: the in-process header readers against
+ffprobe (videos) and Pillow (images), and check that they agree.
+
+    python bin/bench_probe.py FILE_OR_DIR [FILE_OR_DIR ...] [--runs 20]
+    python bin/bench_probe.py --generate
+
+--generate synthesizes a small corpus: PNG, JPEG (with an EXIF orientation),
+WebP and GIF images, plus, when ffmpeg is installed, MP4 (moov first and
+last), MKV and WebM videos. Files the header readers do not understand show
+as "fallback"; they would still be probed by ffprobe or Pillow.
+"""
+
+import argparse
+import asyncio
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+from PIL import Image  # noqa: E402
+
+from app.config import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS  # noqa: E402
+from app.converters import (  # noqa: E402
+    probe_video,
+    read_image_header,
+    read_media_header,
+)
+
+_ORIENTATION = 0x0112
+
+# name -> extra ffmpeg output arguments
+_VIDEOS = {
+    "faststart.mp4": ["-c:v", "libx264", "-c:a", "aac", "-movflags", "+faststart"],
+    "moov_last.mp4": ["-c:v", "libx264", "-c:a", "aac"],
+    "h264.mkv": ["-c:v", "libx264", "-c:a", "aac"],
+    "vp9.webm": ["-c:v", "libvpx-vp9", "-c:a", "libopus", "-deadline", "realtime"],
+}
+
+
+def generate(directory: Path) -> list[Path]:
+    files = []
+    for name, kwargs in {
+        "image.png": {},
+        "image.jpg": {"quality": 90},
+        "image.webp": {},
+        "image.gif": {},
+    }.items():
+        path = directory / name
+        Image.effect_mandelbrot((1920, 1080), (-2, -1, 1, 1), 100).convert("RGB").save(
+            path, **kwargs
+        )
+        files.append(path)
+    exif = Image.Exif()
+    exif[_ORIENTATION] = 6
+    path = directory / "rotated.jpg"
+    Image.new("RGB", (4000, 3000), "gray").save(path, exif=exif)
+    files.append(path)
+
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg not found: generating images only")
+        return files
+    for name, args in _VIDEOS.items():
+        path = directory / name
+        print(f"Generating {name}...")
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-f",
+                "lavfi",
+                "-i",
+                "testsrc2=size=1280x720:rate=30:duration=30",
+                "-f",
+                "lavfi",
+                "-i",
+                "sine=duration=30",
+                *args,
+                str(path),
+                "-y",
+            ],
+            check=True,
+            capture_output=True,
+        )
+        files.append(path)
+    return files
+
+
+def collect(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+        files += [
+            p
+            for p in candidates
+            if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS | IMAGE_EXTENSIONS
+        ]
+    return files
+
+
+def pillow_size(path: Path) -> tuple[int, int, int] | None:
+    """What read_image_size did before the header reader: open with Pillow."""
+    try:
+        with Image.open(path) as img:
+            return (*img.size, img.getexif().get(_ORIENTATION, 1))
+    except Exception:
+        return None
+
+
+def ffprobe(path: Path):
+    return asyncio.run(probe_video(path))
+
+
+def timed(fn: Callable, path: Path, runs: int) -> tuple[float, object]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(path)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def same(native, baseline) -> bool:
+    if hasattr(native, "duration") and hasattr(baseline, "duration"):
+        # ffprobe may derive the duration from the streams rather than the
+        # container header; a few milliseconds apart is the same duration
+        if abs((native.duration or 0) - (baseline.duration or 0)) > 0.05:
+            return False
+        native.duration = baseline.duration
+    return native == baseline
+
+
+def bench(files: list[Path], runs: int) -> None:
+    has_ffprobe = shutil.which("ffprobe") is not None
+    if not has_ffprobe:
+        print("ffprobe not found: timing the header readers only for videos")
+
+    totals = {"native": 0.0, "baseline": 0.0}
+    print(f"\n  {'file':28} {'native':>10} {'baseline':>10} {'speedup':>8}  result")
+    for path in files:
+        if path.suffix.lower() in VIDEO_EXTENSIONS:
+            native_fn, baseline_fn = read_media_header, ffprobe if has_ffprobe else None
+        else:
+            native_fn, baseline_fn = read_image_header, pillow_size
+
+        native_time, native = timed(native_fn, path, runs)
+        if baseline_fn is None:
+            result = "fallback" if native is None else "read"
+            print(
+                f"  {path.name:28} {native_time * 1e3:8.3f}ms"
+                f" {'-':>10} {'-':>8}  {result}"
+            )
+            continue
+        baseline_time, baseline = timed(baseline_fn, path, runs)
+        if native is None:
+            result = "fallback"
+        elif baseline is None:
+            result = "baseline failed"
+        else:
+            result = "ok" if same(native, baseline) else f"differs: {baseline}"
+            totals["native"] += native_time
+            totals["baseline"] += baseline_time
+        print(
+            f"  {path.name:28} {native_time * 1e3:8.3f}ms"
+            f" {baseline_time * 1e3:8.3f}ms {baseline_time / native_time:7.0f}x  {result}"
+        )
+
+    if totals["native"]:
+        print(
+            f"\n  files read natively: {totals['native'] * 1e3:.2f} ms"
+            f" instead of {totals['baseline'] * 1e3:.2f} ms"
+            f" ({totals['baseline'] / totals['native']:.0f}x faster)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark in-process metadata probing against ffprobe."
+    )
+    parser.add_argument("paths", nargs="*", type=Path)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--generate", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = collect(args.paths)
+        if args.generate:
+            files += generate(Path(tmp))
+        if not files:
+            parser.error("pass files or directories, or --generate")
+        bench(files, args.runs)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,141 @@
+"""
+Compare video thumbnail extraction latency: the original command against the
+keyframe-only extractor.
+
+    python bin/bench_thumbnail.py VIDEO [VIDEO ...] [--runs 5]
+    python bin/bench_thumbnail.py --generate 2160 --duration 600
+
+--generate synthesizes a test video of the given height (HEVC when libx265 is
+available, else H.264) with a keyframe every 2 seconds.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+from app.config import (  # noqa: E402
+    THUMBNAIL_CANDIDATES,
+    THUMBNAIL_SEEK,
+    THUMBNAIL_WIDTHS,
+)
+from app.converters import frame_args  # noqa: E402
+
+
+def legacy_args(video: Path, output: Path) -> list[str]:
+    """The command thumbnails were extracted with before keyframe seeking."""
+    return [
+        "ffmpeg",
+        "-ss",
+        "1",
+        "-i",
+        str(video),
+        "-frames:v",
+        "1",
+        "-q:v",
+        "2",
+        str(output),
+        "-y",
+    ]
+
+
+def variants(video: Path, output: Path) -> dict[str, list[str]]:
+    max_width = max(THUMBNAIL_WIDTHS)
+    return {
+        "legacy (-ss 1, full size)": legacy_args(video, output),
+        "exact + scale": frame_args(video, output, THUMBNAIL_SEEK, max_width=max_width),
+        "keyframes + scale + thumbnail": frame_args(
+            video,
+            output,
+            THUMBNAIL_SEEK,
+            exact=False,
+            max_width=max_width,
+            candidates=THUMBNAIL_CANDIDATES,
+        ),
+    }
+
+
+def generate(height: int, duration: int, directory: Path) -> Path:
+    encoders = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True
+    ).stdout
+    codec = "libx265" if "libx265" in encoders else "libx264"
+    video = directory / f"bench_{height}p_{codec}.mkv"
+    width = height * 16 // 9
+    print(f"Generating {duration}s {width}x{height} {codec} test video...")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+            "-c:v",
+            codec,
+            "-preset",
+            "ultrafast",
+            "-g",
+            "60",
+            str(video),
+            "-y",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return video
+
+
+def bench(video: Path, runs: int, directory: Path) -> None:
+    print(f"\n{video.name} ({video.stat().st_size / 1e6:.1f} MB)")
+    output = directory / "frame.jpg"
+    for name, args in variants(video, output).items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.run(args, capture_output=True)
+            timings.append(time.perf_counter() - start)
+            if proc.returncode != 0:
+                print(f"  {name:32} failed: {proc.stderr.decode()[-200:]}")
+                break
+        else:
+            print(
+                f"  {name:32} median {statistics.median(timings) * 1000:7.0f} ms"
+                f"  min {min(timings) * 1000:7.0f} ms"
+                f"  output {output.stat().st_size / 1024:6.0f} KiB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark video thumbnail extraction commands."
+    )
+    parser.add_argument("videos", nargs="*", type=Path)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--generate", type=int, metavar="HEIGHT")
+    parser.add_argument("--duration", type=int, default=600)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        videos = list(args.videos)
+        if args.generate:
+            videos.append(generate(args.generate, args.duration, directory))
+        if not videos:
+            parser.error("pass a video or --generate HEIGHT")
+        for video in videos:
+            bench(video, args.runs, directory)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
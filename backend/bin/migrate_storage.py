@@ -0,0 +1,27 @@
+import asyncio
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+from app.routers.storage import migrate_storage  # noqa: E402
+from app.schemas import StorageMigrationResponse  # noqa: E402
+
+
+async def main():
+    progress = StorageMigrationResponse(status="pending")
+    await migrate_storage(progress)
+    print(
+        f"Processed {progress.processed}/{progress.total} resources: "
+        f"{progress.moved} files moved, {progress.missing} missing"
+    )
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,15 +1,23 @@
+import tempfile
 from collections.abc import AsyncGenerator
+from pathlib import Path
+from unittest.mock import patch
 
 import httpx
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from app.database import Base, get_db
 from app.main import app
+from app.routers import thumbnails
 
-TEST_DATABASE_URL = "sqlite+aiosqlite://"  # in-memory
+# A throwaway file rather than ":memory:" so that concurrent sessions (request
+# handlers plus background jobs) each get their own connection, as in production.
+TEST_DATABASE_PATH = Path(tempfile.mkdtemp()) / "test.sqlite3"
+TEST_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
 
-engine_test = create_async_engine(TEST_DATABASE_URL)
+engine_test = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
 async_session_test = async_sessionmaker(engine_test, expire_on_commit=False)
 
 
@@ -31,6 +39,17 @@ async def setup_database():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+async def thumbnail_workers(tmp_path: Path):
+    """Point the thumbnail workers at the test database and stop them after."""
+    with (
+        patch.object(thumbnails, "async_session", async_session_test),
+        patch.object(thumbnails, "THUMBNAIL_DIR", tmp_path / ".thumbnails"),
+    ):
+        yield
+        await thumbnails.stop_thumbnail_workers()
+
+
 @pytest.fixture
 async def db() -> AsyncGenerator[AsyncSession]:
     """Provide a transactional test database session."""
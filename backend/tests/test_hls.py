@@ -0,0 +1,51 @@
+"""Tests for the m3u8 playlist parser."""
+
+from app.hls import Variant, parse_attributes, parse_playlist, select_variant
+
+
+def test_parse_attributes_handles_quoted_commas():
+    attrs = parse_attributes('BANDWIDTH=1280000,CODECS="avc1.4d401f,mp4a.40.2"')
+    assert attrs == {"BANDWIDTH": "1280000", "CODECS": "avc1.4d401f,mp4a.40.2"}
+
+
+def test_parse_media_playlist_resolves_uris_and_sequence():
+    playlist = parse_playlist(
+        "#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:3\n#EXTINF:4,\na.ts\n#EXTINF:4,\n/b.ts\n",
+        "https://cdn.test/live/index.m3u8",
+    )
+    assert not playlist.is_master
+    assert [s.uri for s in playlist.segments] == [
+        "https://cdn.test/live/a.ts",
+        "https://cdn.test/b.ts",
+    ]
+    assert [s.sequence for s in playlist.segments] == [3, 4]
+    assert playlist.segments[1].iv == (4).to_bytes(16, "big")
+
+
+def test_byterange_without_offset_continues_previous_range():
+    playlist = parse_playlist(
+        "#EXT-X-BYTERANGE:100@50\nm.ts\n#EXT-X-BYTERANGE:20\nm.ts\n",
+        "https://cdn.test/",
+    )
+    assert [s.byterange for s in playlist.segments] == [(100, 50), (20, 150)]
+
+
+def test_key_method_none_clears_encryption():
+    playlist = parse_playlist(
+        '#EXT-X-KEY:METHOD=AES-128,URI="k"\na.ts\n#EXT-X-KEY:METHOD=NONE\nb.ts\n',
+        "https://cdn.test/",
+    )
+    assert playlist.segments[0].key.uri == "https://cdn.test/k"
+    assert playlist.segments[1].key is None
+
+
+def test_select_variant_prefers_bandwidth_within_height_cap():
+    variants = [
+        Variant("a", bandwidth=500, resolution=(640, 360)),
+        Variant("b", bandwidth=3000, resolution=(1280, 720)),
+        Variant("c", bandwidth=8000, resolution=(1920, 1080)),
+    ]
+    assert select_variant(variants).uri == "c"
+    assert select_variant(variants, max_height=720).uri == "b"
+    # Nothing fits: take the smallest
+    assert select_variant(variants, max_height=240).uri == "a"
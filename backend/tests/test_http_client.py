@@ -0,0 +1,37 @@
+"""Tests for the shared outbound HTTP client."""
+
+from unittest.mock import patch
+
+from app import http_client
+
+
+async def test_client_is_shared_until_closed():
+    client = http_client.get_http_client()
+    assert http_client.get_http_client() is client
+
+    await http_client.close_http_client()
+    assert client.is_closed
+    replacement = http_client.get_http_client()
+    assert replacement is not client
+    await http_client.close_http_client()
+
+
+async def test_pool_stats_report_limits_and_connections():
+    http_client.get_http_client()
+    stats = http_client.http_pool_stats()
+    await http_client.close_http_client()
+
+    assert stats["max_connections"] == http_client.HTTP_MAX_CONNECTIONS
+    assert stats["connections"] == 0
+    assert stats["requests_queued"] == 0
+
+
+async def test_pool_stats_degrade_when_internals_change():
+    client = http_client.get_http_client()
+    with patch.object(client, "_transport", object()):
+        stats = http_client.http_pool_stats()
+    await http_client.close_http_client()
+
+    assert stats["max_connections"] == http_client.HTTP_MAX_CONNECTIONS
+    assert stats["connections"] is None
+    assert stats["requests_queued"] is None
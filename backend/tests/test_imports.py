@@ -1,12 +1,20 @@
+import asyncio
 import hashlib
+import json
+import shutil
+import threading
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import httpx
+import pytest
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Resource
+from app.models import ImportJob, Resource, ScanIndexEntry
+from app.routers import imports
+from app.storage import shard_path
+from tests.conftest import async_session_test
 
 
 # ---------------------------------------------------------------------------
@@ -154,8 +162,8 @@ async def test_execute_import_creates_resources(
     assert f"{sha_b}.png" in filenames
 
     # Verify files were copied to media dir
-    assert (media_dir / f"{sha_a}.jpg").exists()
-    assert (media_dir / f"{sha_b}.png").exists()
+    assert shard_path(media_dir, f"{sha_a}.jpg").exists()
+    assert shard_path(media_dir, f"{sha_b}.png").exists()
 
 
 async def test_execute_import_skips_existing_resources(
@@ -239,3 +247,609 @@ async def test_execute_import_empty_file_list(
     data = resp.json()
     assert data["imported"] == 0
     assert data["skipped"] == 0
+
+
+async def test_execute_import_dedups_within_request(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Identical files in one request are imported once and the rest skipped."""
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+
+    files = []
+    for i in range(5):
+        src = tmp_path / f"copy{i}.jpg"
+        src.write_bytes(b"same-bytes")
+        files.append({"path": str(src), "type": "image"})
+
+    with patch("app.routers.imports.MEDIA_DIR", media_dir):
+        resp = await client.post("/api/imports/execute", json={"files": files})
+
+    assert resp.status_code == 200
+    assert resp.json() == {"imported": 1, "skipped": 4}
+
+    result = await db.execute(select(Resource))
+    resources = result.scalars().all()
+    assert [r.title for r in resources] == ["copy0.jpg"]
+
+    sha = hashlib.sha256(b"same-bytes").hexdigest()
+    assert [p.name for p in media_dir.rglob("*") if p.is_file()] == [f"{sha}.jpg"]
+
+
+# ---------------------------------------------------------------------------
+# Background import jobs: /api/imports/jobs
+# ---------------------------------------------------------------------------
+
+
+async def test_import_job_runs_in_background(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Starting a job returns immediately; the job reports progress when done."""
+    media_dir = tmp_path / "media"
+    img1 = tmp_path / "a.jpg"
+    img1.write_bytes(b"job-content-a")
+    img2 = tmp_path / "b.jpg"
+    img2.write_bytes(b"job-content-a")  # duplicate of a.jpg
+    missing = tmp_path / "missing.jpg"
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports.async_session", async_session_test),
+    ):
+        resp = await client.post(
+            "/api/imports/jobs",
+            json={
+                "files": [
+                    {"path": str(img1), "type": "image"},
+                    {"path": str(img2), "type": "image"},
+                    {"path": str(missing), "type": "image"},
+                ]
+            },
+        )
+        assert resp.status_code == 202
+        job_id = resp.json()["id"]
+        assert resp.json()["total_files"] == 3
+
+        await asyncio.gather(*imports._job_tasks.values())
+
+    resp = await client.get(f"/api/imports/jobs/{job_id}")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "completed"
+    assert data["files_done"] == 3
+    assert data["imported"] == 1
+    assert data["skipped"] == 1
+    assert data["failed"] == 1
+    assert data["bytes_copied"] == len(b"job-content-a")
+    assert data["finished_at"] is not None
+
+    result = await db.execute(select(Resource))
+    assert [r.title for r in result.scalars().all()] == ["a.jpg"]
+
+
+async def test_import_job_resumes_from_committed_cursor(
+    db: AsyncSession, tmp_path: Path
+):
+    """A job interrupted mid-way resumes after the last committed file."""
+    media_dir = tmp_path / "media"
+    done = tmp_path / "done.jpg"
+    done.write_bytes(b"already-imported")
+    todo = tmp_path / "todo.jpg"
+    todo.write_bytes(b"still-to-import")
+
+    db.add(
+        ImportJob(
+            id="resume-me",
+            status="running",
+            files=[
+                {"path": str(done), "type": "image"},
+                {"path": str(todo), "type": "image"},
+            ],
+            total_files=2,
+            files_done=1,
+            imported=1,
+        )
+    )
+    await db.commit()
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports.async_session", async_session_test),
+    ):
+        await imports.resume_import_jobs()
+        await asyncio.gather(*imports._job_tasks.values())
+
+    job = await db.get(ImportJob, "resume-me")
+    await db.refresh(job)
+    assert job.status == "completed"
+    assert job.files_done == 2
+    assert job.imported == 2
+
+    result = await db.execute(select(Resource))
+    assert [r.title for r in result.scalars().all()] == ["todo.jpg"]
+
+
+async def test_cancel_pending_import_job(client: httpx.AsyncClient, db: AsyncSession):
+    db.add(ImportJob(id="queued", status="pending", files=[], total_files=0))
+    await db.commit()
+
+    resp = await client.post("/api/imports/jobs/queued/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "cancelled"
+
+
+async def test_cancel_running_import_job(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Cancelling a job mid-run marks it cancelled and drops its live state."""
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"never-imported")
+    started = asyncio.Event()
+
+    async def stuck_batch(db, job, items):
+        # Open a transaction, as a real batch does, so cancelling rolls back
+        await db.execute(select(Resource.id))
+        started.set()
+        await asyncio.sleep(3600)
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", tmp_path / "media"),
+        patch("app.routers.imports.async_session", async_session_test),
+        patch("app.routers.imports._import_batch", stuck_batch),
+    ):
+        resp = await client.post(
+            "/api/imports/jobs",
+            json={"files": [{"path": str(src), "type": "image"}]},
+        )
+        job_id = resp.json()["id"]
+        await asyncio.wait_for(started.wait(), 5)
+
+        resp = await client.post(f"/api/imports/jobs/{job_id}/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "cancelled"
+    assert resp.json()["finished_at"] is not None
+    assert imports._job_clock == {}
+    assert imports._cancel_requested == set()
+
+    job = await db.get(ImportJob, job_id)
+    await db.refresh(job)
+    assert job.status == "cancelled"
+
+
+async def test_cancel_import_job_right_after_start(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """A cancel landing before the job runs still marks it cancelled."""
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"never-imported")
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", tmp_path / "media"),
+        patch("app.routers.imports.async_session", async_session_test),
+        patch("app.routers.imports._import_batch", side_effect=AssertionError),
+    ):
+        resp = await client.post(
+            "/api/imports/jobs",
+            json={"files": [{"path": str(src), "type": "image"}]},
+        )
+        job_id = resp.json()["id"]
+        resp = await client.post(f"/api/imports/jobs/{job_id}/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "cancelled"
+    assert imports._cancel_requested == set()
+
+    job = await db.get(ImportJob, job_id)
+    await db.refresh(job)
+    assert (job.status, job.files_done) == ("cancelled", 0)
+
+
+async def test_get_unknown_import_job_returns_404(client: httpx.AsyncClient):
+    resp = await client.get("/api/imports/jobs/nope")
+    assert resp.status_code == 404
+
+
+async def test_execute_import_keeps_committed_batches_on_crash(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Batches committed before a crash survive and the cursor points past them."""
+    media_dir = tmp_path / "media"
+    files = []
+    for i in range(5):
+        src = tmp_path / f"f{i}.jpg"
+        src.write_bytes(f"content-{i}".encode())
+        files.append({"path": str(src), "type": "image"})
+
+    real_copy = imports.copy_hashed
+
+    def flaky_copy(src: Path, directory: Path, ext: str):
+        if src.name == "f4.jpg":
+            raise RuntimeError("disk controller on fire")
+        return real_copy(src, directory, ext)
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports.IMPORT_BATCH_SIZE", 2),
+        patch("app.routers.imports.copy_hashed", flaky_copy),
+    ):
+        with pytest.raises(RuntimeError):
+            await client.post("/api/imports/execute", json={"files": files})
+
+    result = await db.execute(select(Resource.title).order_by(Resource.title))
+    assert result.scalars().all() == ["f0.jpg", "f1.jpg", "f2.jpg", "f3.jpg"]
+
+    job = (await db.execute(select(ImportJob))).scalar_one()
+    assert job.status == "failed"
+    assert job.files_done == 4
+    assert job.imported == 4
+
+
+async def test_incremental_scan_returns_only_new_files(
+    client: httpx.AsyncClient, tmp_path: Path
+):
+    """An incremental scan reports files added since the last scan only."""
+    album = tmp_path / "album"
+    album.mkdir()
+    (album / "old.jpg").write_bytes(b"old")
+    (tmp_path / "root.png").write_bytes(b"root")
+
+    resp = await client.post("/api/imports/scan", json={"path": str(tmp_path)})
+    assert {f["name"] for f in resp.json()["files"]} == {"old.jpg", "root.png"}
+
+    resp = await client.post(
+        "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+    )
+    assert resp.json()["files"] == []
+
+    (album / "new.jpg").write_bytes(b"new")
+    resp = await client.post(
+        "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+    )
+    files = resp.json()["files"]
+    assert [(f["name"], f["path"]) for f in files] == [
+        ("new.jpg", str(album / "new.jpg"))
+    ]
+
+    # A full scan still reports everything
+    resp = await client.post("/api/imports/scan", json={"path": str(tmp_path)})
+    assert {f["name"] for f in resp.json()["files"]} == {
+        "old.jpg",
+        "new.jpg",
+        "root.png",
+    }
+
+
+async def test_scan_index_drops_removed_files(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Files that disappear are removed from the scan index."""
+    (tmp_path / "keep.jpg").write_bytes(b"keep")
+    gone = tmp_path / "gone.jpg"
+    gone.write_bytes(b"gone")
+
+    await client.post("/api/imports/scan", json={"path": str(tmp_path)})
+    gone.unlink()
+    await client.post(
+        "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+    )
+
+    result = await db.execute(select(ScanIndexEntry.path))
+    assert set(result.scalars().all()) == {str(tmp_path), str(tmp_path / "keep.jpg")}
+
+
+async def test_scan_index_drops_removed_subtrees(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """A removed directory takes its whole subtree out of the scan index."""
+    nested = tmp_path / "album" / "2024"
+    nested.mkdir(parents=True)
+    (nested / "a.jpg").write_bytes(b"a")
+    sibling = tmp_path / "album2"
+    sibling.mkdir()
+    (sibling / "b.jpg").write_bytes(b"b")
+
+    await client.post("/api/imports/scan", json={"path": str(tmp_path)})
+    shutil.rmtree(tmp_path / "album")
+    await client.post(
+        "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+    )
+
+    result = await db.execute(select(ScanIndexEntry.path))
+    assert set(result.scalars().all()) == {
+        str(tmp_path),
+        str(sibling),
+        str(sibling / "b.jpg"),
+    }
+
+
+async def test_scan_loads_index_per_batch_of_directories(
+    client: httpx.AsyncClient, tmp_path: Path
+):
+    """The index is read a few directories at a time, not for the whole tree."""
+    for i in range(5):
+        folder = tmp_path / f"d{i}" / "inner"
+        folder.mkdir(parents=True)
+        (folder / f"{i}.jpg").write_bytes(b"x")
+
+    loaded: list[list[str]] = []
+    load_children = imports._load_scan_children
+
+    async def spy(db, dirs):
+        loaded.append(dirs)
+        return await load_children(db, dirs)
+
+    with (
+        patch("app.routers.imports._SCAN_DIR_BATCH", 2),
+        patch("app.routers.imports._load_scan_children", spy),
+    ):
+        resp = await client.post("/api/imports/scan", json={"path": str(tmp_path)})
+        assert len(resp.json()["files"]) == 5
+
+        (tmp_path / "d3" / "inner" / "new.jpg").write_bytes(b"y")
+        resp = await client.post(
+            "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+        )
+    assert [f["name"] for f in resp.json()["files"]] == ["new.jpg"]
+    assert max(len(dirs) for dirs in loaded) == 2
+
+
+# ---------------------------------------------------------------------------
+# POST /api/imports/scan/stream
+# ---------------------------------------------------------------------------
+
+
+async def test_scan_stream_emits_ndjson_events(
+    client: httpx.AsyncClient, tmp_path: Path
+):
+    """Streaming scan emits one event per file, progress counters and a summary."""
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "b.mp4").write_bytes(b"bb")
+    (sub / "notes.txt").write_text("skip")
+
+    with patch("app.routers.imports.async_session", async_session_test):
+        resp = await client.post(
+            "/api/imports/scan/stream", json={"path": str(tmp_path)}
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in resp.text.splitlines()]
+
+    files = {e["file"]["name"]: e["file"] for e in events if e["event"] == "file"}
+    assert files["a.jpg"] == {
+        "path": str(tmp_path / "a.jpg"),
+        "name": "a.jpg",
+        "type": "image",
+        "size": 1,
+    }
+    assert files["b.mp4"]["type"] == "video"
+    assert any(e["event"] == "progress" for e in events)
+    assert events[-1] == {"event": "done", "dirs": 2, "files": 2, "matched": 2}
+
+
+async def test_aborted_scan_stream_reports_files_again(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Files of a batch the client never got are not marked seen in the index."""
+    (tmp_path / "a.jpg").write_bytes(b"a")
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "b.jpg").write_bytes(b"b")
+
+    with patch("app.routers.imports._SCAN_DIR_BATCH", 1):
+        walk = imports._walk_scan(db, imports._TreeScanner(str(tmp_path), True))
+        assert [f.name for f in await anext(walk)] == ["a.jpg"]
+        # The client disconnects before asking for more
+        await walk.aclose()
+
+        resp = await client.post(
+            "/api/imports/scan", json={"path": str(tmp_path), "incremental": True}
+        )
+    assert {f["name"] for f in resp.json()["files"]} == {"a.jpg", "b.jpg"}
+
+
+async def test_scan_stream_rejects_missing_path(client: httpx.AsyncClient):
+    resp = await client.post(
+        "/api/imports/scan/stream", json={"path": "/nonexistent/path/abc123"}
+    )
+    assert resp.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# Size-prefiltered duplicate detection
+# ---------------------------------------------------------------------------
+
+
+async def test_execute_import_skips_full_hash_for_unique_sizes(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Files whose size matches no resource are hashed only while copied."""
+    media_dir = tmp_path / "media"
+    db.add(Resource(category="image", filename="other.jpg", size=3))
+    await db.commit()
+
+    src = tmp_path / "unique.jpg"
+    src.write_bytes(b"unique-size-content")
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports.hash_file", new_callable=AsyncMock) as mock_hash,
+    ):
+        resp = await client.post(
+            "/api/imports/execute",
+            json={"files": [{"path": str(src), "type": "image"}]},
+        )
+
+    assert resp.json() == {"imported": 1, "skipped": 0}
+    mock_hash.assert_not_awaited()
+
+    sha = hashlib.sha256(b"unique-size-content").hexdigest()
+    resource = await db.scalar(select(Resource).where(Resource.title == "unique.jpg"))
+    assert resource.filename == f"{sha}.jpg"
+    assert resource.size == len(b"unique-size-content")
+
+
+async def test_execute_import_looks_up_existing_files_off_the_loop(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """Candidate duplicates are located on a worker thread, not the event loop."""
+    media_dir = tmp_path / "media"
+    db.add(Resource(category="image", filename="other.jpg", size=4))
+    await db.commit()
+    src = tmp_path / "same.jpg"
+    src.write_bytes(b"same")
+
+    threads = []
+    existing_path = imports._existing_path
+
+    def spy(*args):
+        threads.append(threading.current_thread())
+        return existing_path(*args)
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports._existing_path", spy),
+    ):
+        resp = await client.post(
+            "/api/imports/execute",
+            json={"files": [{"path": str(src), "type": "image"}]},
+        )
+
+    assert resp.json() == {"imported": 1, "skipped": 0}
+    assert threads and threading.main_thread() not in threads
+
+
+async def test_execute_import_detects_duplicate_by_size_and_fingerprint(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """A same-size file is a duplicate only if its full hash matches."""
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    content = b"x" * 200_000
+    sha = hashlib.sha256(content).hexdigest()
+    (media_dir / f"{sha}.mp4").write_bytes(content)
+    db.add(
+        Resource(category="video", filename=f"{sha}.mp4", size=len(content), title="A")
+    )
+    await db.commit()
+
+    dup = tmp_path / "dup.mp4"
+    dup.write_bytes(content)
+    # Same size, same head and tail, different middle
+    near = tmp_path / "near.mp4"
+    near.write_bytes(content[:100_000] + b"y" + content[100_001:])
+
+    with patch("app.routers.imports.MEDIA_DIR", media_dir):
+        resp = await client.post(
+            "/api/imports/execute",
+            json={
+                "files": [
+                    {"path": str(dup), "type": "video"},
+                    {"path": str(near), "type": "video"},
+                ]
+            },
+        )
+
+    assert resp.json() == {"imported": 1, "skipped": 1}
+    result = await db.execute(select(Resource.title).order_by(Resource.id))
+    assert result.scalars().all() == ["A", "near.mp4"]
+
+
+async def test_execute_import_with_hardlink_strategy(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """The hardlink strategy links files into the library instead of copying."""
+    media_dir = tmp_path / "media"
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"link-me")
+
+    with patch("app.routers.imports.MEDIA_DIR", media_dir):
+        resp = await client.post(
+            "/api/imports/execute",
+            json={
+                "files": [{"path": str(src), "type": "image"}],
+                "strategy": "hardlink",
+            },
+        )
+
+    assert resp.json() == {"imported": 1, "skipped": 0}
+    sha = hashlib.sha256(b"link-me").hexdigest()
+    assert shard_path(media_dir, f"{sha}.jpg").stat().st_ino == src.stat().st_ino
+
+
+async def test_execute_import_move_keeps_source_of_duplicate(
+    client: httpx.AsyncClient, tmp_path: Path
+):
+    """Moving two identical files moves one and leaves the duplicate in place."""
+    media_dir = tmp_path / "media"
+    first = tmp_path / "a.jpg"
+    first.write_bytes(b"same-bytes")
+    second = tmp_path / "b.jpg"
+    second.write_bytes(b"same-bytes")
+
+    with patch("app.routers.imports.MEDIA_DIR", media_dir):
+        resp = await client.post(
+            "/api/imports/execute",
+            json={
+                "files": [
+                    {"path": str(first), "type": "image"},
+                    {"path": str(second), "type": "image"},
+                ],
+                "strategy": "move",
+            },
+        )
+
+    assert resp.json() == {"imported": 1, "skipped": 1}
+    sha = hashlib.sha256(b"same-bytes").hexdigest()
+    assert shard_path(media_dir, f"{sha}.jpg").read_bytes() == b"same-bytes"
+    assert [p.exists() for p in (first, second)].count(True) == 1
+
+
+async def test_cancel_during_move_import_records_moved_files(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    """A cancel mid-move still records every file already moved into storage."""
+    media_dir = tmp_path / "media"
+    sources = []
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        src = tmp_path / name
+        src.write_bytes(name.encode())
+        sources.append(src)
+    moving = threading.Event()
+    release = threading.Event()
+    place_file = imports.place_file
+
+    def slow_place(src, dest, strategy):
+        if src.name == "b.jpg":
+            moving.set()
+            release.wait(5)
+        return place_file(src, dest, strategy)
+
+    with (
+        patch("app.routers.imports.MEDIA_DIR", media_dir),
+        patch("app.routers.imports.async_session", async_session_test),
+        patch("app.routers.imports.place_file", slow_place),
+    ):
+        resp = await client.post(
+            "/api/imports/jobs",
+            json={
+                "files": [{"path": str(p), "type": "image"} for p in sources],
+                "strategy": "move",
+            },
+        )
+        job_id = resp.json()["id"]
+        assert await asyncio.to_thread(moving.wait, 5)
+        cancel = asyncio.create_task(client.post(f"/api/imports/jobs/{job_id}/cancel"))
+        await asyncio.sleep(0.05)
+        release.set()
+        resp = await cancel
+
+    assert resp.json()["status"] == "cancelled"
+    assert resp.json()["files_done"] == 2
+    result = await db.execute(select(Resource.filename, Resource.title))
+    rows = dict(result.all())
+    assert sorted(rows.values()) == ["a.jpg", "b.jpg"]
+    stored = {p.name for p in media_dir.rglob("*") if p.is_file()}
+    assert stored == set(rows)
+    assert [p.exists() for p in sources] == [False, False, True]
@@ -0,0 +1,234 @@
+"""Tests for the in-process media and image header readers."""
+
+import struct
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from app.converters import read_image_header, read_image_size, read_media_header
+from app.converters.media_header import MATROSKA_CONTAINER, MP4_CONTAINER
+from app.converters.probe import ProbeResult
+from app.models import Resource
+from app.routers import thumbnails
+from app.storage import shard_path
+
+
+def _box(kind: bytes, *children: bytes) -> bytes:
+    body = b"".join(children)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _trak(handler: bytes, entry: bytes) -> bytes:
+    stsd = _box(b"stsd", struct.pack(">II", 0, 1), entry)
+    return _box(
+        b"trak",
+        _box(b"tkhd", bytes(84)),
+        _box(
+            b"mdia",
+            _box(b"mdhd", bytes(24)),
+            _box(b"hdlr", bytes(8), handler, bytes(13)),
+            _box(b"minf", _box(b"stbl", stsd, _box(b"stsz", bytes(12)))),
+        ),
+    )
+
+
+def _mp4(
+    *,
+    video: bytes | None = b"avc1",
+    audio: int | None = 0x40,
+    duration: int = 12500,
+    moov_last: bool = False,
+) -> bytes:
+    """A minimal MP4: ``audio`` is the objectTypeIndication of an mp4a track."""
+    mvhd = _box(b"mvhd", struct.pack(">4xIIII", 0, 0, 1000, duration), bytes(80))
+    tracks = []
+    if video:
+        sizes = struct.pack(">HH", 1920, 1080)
+        entry = _box(video, bytes(6), b"\0\1", bytes(16), sizes, bytes(50))
+        tracks.append(_trak(b"vide", entry))
+    if audio:
+        decoder = bytes([0x04, 0x11, audio]) + bytes(16)
+        es = bytes([0x03, 0x80, 0x80, 0x80, 3 + len(decoder), 0, 1, 0]) + decoder
+        entry = _box(b"mp4a", bytes(6), b"\0\1", bytes(20), _box(b"esds", bytes(4), es))
+        tracks.append(_trak(b"soun", entry))
+    moov = _box(b"moov", mvhd, *tracks)
+    ftyp = _box(b"ftyp", b"isom", bytes(4), b"isomavc1")
+    mdat = _box(b"mdat", bytes(4096))
+    return ftyp + mdat + moov if moov_last else ftyp + moov + mdat
+
+
+def _ebml(element: int, *children: bytes | int) -> bytes:
+    body = b"".join(
+        c.to_bytes(max(1, (c.bit_length() + 7) // 8), "big")
+        if isinstance(c, int)
+        else c
+        for c in children
+    )
+    element_id = element.to_bytes((element.bit_length() + 7) // 8, "big")
+    return element_id + (1 << 56 | len(body)).to_bytes(8, "big") + body
+
+
+def _track(track_type: int, codec: str, size: tuple[int, int] | None = None) -> bytes:
+    children = [_ebml(0x83, track_type), _ebml(0x86, codec.encode())]
+    if size:
+        children.append(_ebml(0xE0, _ebml(0xB0, size[0]), _ebml(0xBA, size[1])))
+    return _ebml(0xAE, *children)
+
+
+def _mkv(
+    *,
+    video: str = "V_VP9",
+    audio: str = "A_OPUS",
+    duration: bytes | None = struct.pack(">d", 95500.0),
+    scale: int = 1_000_000,
+    unknown_size: bool = False,
+) -> bytes:
+    info = [_ebml(0x2AD7B1, scale)]
+    if duration is not None:
+        info.append(_ebml(0x4489, duration))
+    segment = (
+        _ebml(0x114D9B74, bytes(32))  # SeekHead, skipped
+        + _ebml(0x1549A966, *info)
+        + _ebml(0x1654AE6B, _track(1, video, (3840, 2160)), _track(2, audio))
+        + _ebml(0x1F43B675, bytes(4096))
+    )
+    header = _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+    if unknown_size:
+        return header + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff" + segment
+    return header + _ebml(0x18538067, segment)
+
+
+def _write(tmp_path: Path, name: str, content: bytes) -> Path:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+class TestMp4:
+    @pytest.mark.parametrize("moov_last", [False, True])
+    def test_reads_moov(self, tmp_path: Path, moov_last: bool):
+        path = _write(tmp_path, "a.mp4", _mp4(moov_last=moov_last))
+        assert read_media_header(path) == ProbeResult(
+            "h264", "aac", MP4_CONTAINER, 12.5, 1920, 1080
+        )
+
+    def test_video_only(self, tmp_path: Path):
+        path = _write(tmp_path, "a.mp4", _mp4(video=b"hvc1", audio=None))
+        probe = read_media_header(path)
+        assert (probe.video_codec, probe.audio_codec) == ("hevc", None)
+
+    def test_mp3_in_mp4a(self, tmp_path: Path):
+        path = _write(tmp_path, "a.mp4", _mp4(audio=0x6B))
+        assert read_media_header(path).audio_codec == "mp3"
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            _mp4(video=b"encv"),  # unknown sample entry
+            _mp4(audio=0xA5),  # unknown objectTypeIndication
+            _mp4(duration=0),  # fragmented
+            _mp4(moov_last=True)[:-200],  # truncated
+        ],
+        ids=["codec", "object-type", "fragmented", "truncated"],
+    )
+    def test_falls_back(self, tmp_path: Path, content: bytes):
+        assert read_media_header(_write(tmp_path, "a.mp4", content)) is None
+
+
+class TestMatroska:
+    @pytest.mark.parametrize("unknown_size", [False, True])
+    def test_reads_info_and_tracks(self, tmp_path: Path, unknown_size: bool):
+        path = _write(tmp_path, "a.webm", _mkv(unknown_size=unknown_size))
+        assert read_media_header(path) == ProbeResult(
+            "vp9", "opus", MATROSKA_CONTAINER, 95.5, 3840, 2160
+        )
+
+    def test_timestamp_scale_and_float_duration(self, tmp_path: Path):
+        content = _mkv(
+            video="V_MPEG4/ISO/AVC",
+            audio="A_AAC/MPEG4/LC",
+            duration=struct.pack(">f", 1500.0),
+            scale=10_000_000,
+        )
+        probe = read_media_header(_write(tmp_path, "a.mkv", content))
+        assert (probe.video_codec, probe.audio_codec) == ("h264", "aac")
+        assert probe.duration == 15.0
+
+    @pytest.mark.parametrize(
+        "content",
+        [_mkv(duration=None), _mkv(video="V_MS/VFW/FOURCC")],
+        ids=["no-duration", "codec"],
+    )
+    def test_falls_back(self, tmp_path: Path, content: bytes):
+        assert read_media_header(_write(tmp_path, "a.mkv", content)) is None
+
+
+@pytest.mark.parametrize("content", [b"", b"not a video at all"], ids=["empty", "junk"])
+def test_unknown_format(tmp_path: Path, content: bytes):
+    assert read_media_header(_write(tmp_path, "a.avi", content)) is None
+
+
+class TestImageHeader:
+    @pytest.mark.parametrize(
+        "fmt, kwargs",
+        [
+            ("PNG", {}),
+            ("JPEG", {}),
+            ("JPEG", {"progressive": True}),
+            ("WEBP", {}),
+            ("WEBP", {"lossless": True}),
+            ("GIF", {}),
+        ],
+    )
+    def test_matches_pillow(self, tmp_path: Path, fmt: str, kwargs: dict):
+        path = tmp_path / "image"
+        Image.new("RGB", (1234, 567), "red").save(path, format=fmt, **kwargs)
+        assert read_image_header(path) == (1234, 567, 1)
+
+    def test_webp_with_alpha(self, tmp_path: Path):
+        path = tmp_path / "image.webp"
+        Image.new("RGBA", (300, 200), (0, 0, 0, 0)).save(path, lossless=False)
+        assert read_image_header(path) == (300, 200, 1)
+
+    @pytest.mark.parametrize("byte_order", ["<", ">"])
+    def test_jpeg_exif_orientation(self, tmp_path: Path, byte_order: str):
+        path = tmp_path / "photo.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif.endian = byte_order
+        Image.new("RGB", (400, 300)).save(path, exif=exif)
+        assert read_image_header(path) == (400, 300, 6)
+        assert read_image_size(path) == (300, 400)
+
+    @pytest.mark.parametrize("fmt", ["PNG", "WEBP"])
+    def test_exif_left_to_pillow(self, tmp_path: Path, fmt: str):
+        path = tmp_path / "image"
+        exif = Image.Exif()
+        exif[0x0112] = 8
+        Image.new("RGB", (400, 300)).save(path, format=fmt, exif=exif)
+        assert read_image_header(path) is None
+        assert read_image_size(path) == (300, 400)
+
+    def test_other_formats_left_to_pillow(self, tmp_path: Path):
+        path = tmp_path / "image.bmp"
+        Image.new("RGB", (40, 30)).save(path)
+        assert read_image_header(path) is None
+        assert read_image_size(path) == (40, 30)
+
+
+async def test_probe_resource_skips_ffprobe(tmp_path: Path):
+    source = shard_path(tmp_path, "clip.mp4")
+    source.parent.mkdir(parents=True)
+    source.write_bytes(_mp4(moov_last=True))
+    resource = Resource(category="video", filename="clip.mp4")
+    with (
+        patch("app.routers.thumbnails.MEDIA_DIR", tmp_path),
+        patch("app.routers.thumbnails.probe_video") as probe_video,
+    ):
+        await thumbnails.probe_resource(resource)
+    probe_video.assert_not_called()
+    assert (resource.video_codec, resource.duration) == ("h264", 12.5)
+    assert resource.container == MP4_CONTAINER
+    assert resource.probed_at is not None
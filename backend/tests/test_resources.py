@@ -1,11 +1,31 @@
 """Tests for the resources router."""
 
+import asyncio
+import hashlib
+from datetime import UTC, datetime
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 import httpx
+import pytest
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Resource, Tag
+from app.models import DownloadJob, DownloadSource, Resource, Tag
+from app.routers import resources
+from app.hls import Segment
+from app.routers.resources import (
+    _bg_download,
+    _download_direct,
+    _download_m3u8,
+    _fetch_segment,
+    _iter_segments,
+    _KeyCache,
+)
+from app.storage import StoredFile, shard_path
+from tests.conftest import async_session_test
 
 
 async def _create_resource(
@@ -209,6 +229,82 @@ class TestListResources:
         titles = [item["title"] for item in data["items"]]
         assert titles == ["Alpha", "Bravo", "Charlie"]
 
+    async def _add_videos(self, db: AsyncSession):
+        db.add_all(
+            [
+                Resource(
+                    category="video",
+                    filename="short.mp4",
+                    duration=30.0,
+                    height=720,
+                    video_codec="h264",
+                ),
+                Resource(
+                    category="video",
+                    filename="long.mkv",
+                    duration=3600.0,
+                    height=2160,
+                    video_codec="hevc",
+                ),
+                Resource(
+                    category="video",
+                    filename="mid.webm",
+                    duration=300.0,
+                    height=1080,
+                    video_codec="vp9",
+                ),
+                Resource(category="image", filename="photo.jpg", height=3000),
+            ]
+        )
+        await db.commit()
+
+    async def test_filter_by_probe_metadata(
+        self, client: httpx.AsyncClient, db: AsyncSession
+    ):
+        await self._add_videos(db)
+
+        async def filenames(**params):
+            resp = await client.get("/api/resources", params=params)
+            return sorted(item["filename"] for item in resp.json()["items"])
+
+        assert await filenames(min_duration=60) == ["long.mkv", "mid.webm"]
+        assert await filenames(max_duration=300) == ["mid.webm", "short.mp4"]
+        assert await filenames(min_height=1080, category="video") == [
+            "long.mkv",
+            "mid.webm",
+        ]
+        assert await filenames(max_height=1080) == ["mid.webm", "short.mp4"]
+        assert await filenames(video_codec=["hevc", "vp9"]) == [
+            "long.mkv",
+            "mid.webm",
+        ]
+        resp = await client.get("/api/resources", params={"min_duration": 60})
+        assert resp.json()["total"] == 2
+
+    async def test_sort_by_duration(self, client: httpx.AsyncClient, db: AsyncSession):
+        await self._add_videos(db)
+        resp = await client.get(
+            "/api/resources",
+            params={"category": "video", "sort_by": "duration", "sort_desc": False},
+        )
+        items = resp.json()["items"]
+        assert [item["filename"] for item in items] == [
+            "short.mp4",
+            "mid.webm",
+            "long.mkv",
+        ]
+        assert items[0]["duration"] == 30.0
+        assert items[0]["video_codec"] == "h264"
+
+        resp = await client.get(
+            "/api/resources/ids",
+            params={"sort_by": "height", "min_height": 1000},
+        )
+        filenames = []
+        for resource_id in resp.json():
+            filenames.append((await db.get(Resource, resource_id)).filename)
+        assert filenames == ["photo.jpg", "long.mkv", "mid.webm"]
+
 
 # ---------------------------------------------------------------------------
 # GET /api/resources/ids
@@ -469,17 +565,44 @@ class TestBatchDelete:
 
 
 class TestDownloadResource:
+    @pytest.fixture(autouse=True)
+    def _queue(self):
+        """Fresh scheduling state, with jobs run against the test database."""
+        with (
+            patch("app.routers.resources.async_session", async_session_test),
+            patch("app.routers.resources._download_slots", None),
+            patch("app.routers.resources._host_slots", {}),
+            patch("app.routers.resources._DOWNLOAD_RETRY_DELAY", 0),
+        ):
+            yield
+
+    async def _drain(self):
+        await asyncio.gather(*list(resources._download_tasks.values()))
+
     @patch("app.routers.resources._bg_download", new_callable=AsyncMock)
     async def test_returns_202_for_valid_image_url(
         self, mock_bg: AsyncMock, client: httpx.AsyncClient
     ):
+        mock_bg.return_value = 42
         resp = await client.post(
             "/api/resources/download",
             json={"url": "https://example.com/photo.jpg"},
         )
         assert resp.status_code == 202
-        assert resp.json()["status"] == "downloading"
-        mock_bg.assert_awaited_once_with("https://example.com/photo.jpg", ".jpg")
+        job = resp.json()
+        assert job["status"] == "pending"
+
+        await self._drain()
+        mock_bg.assert_awaited_once()
+        assert mock_bg.await_args.args[:3] == (
+            "https://example.com/photo.jpg",
+            ".jpg",
+            None,
+        )
+        resp = await client.get(f"/api/resources/downloads/{job['id']}")
+        assert resp.json()["status"] == "completed"
+        assert resp.json()["resource_id"] == 42
+        assert resp.json()["attempts"] == 1
 
     async def test_returns_400_for_unsupported_extension(
         self, client: httpx.AsyncClient
@@ -490,3 +613,860 @@ class TestDownloadResource:
         )
         assert resp.status_code == 400
         assert "Unsupported URL extension" in resp.json()["detail"]
+
+    async def test_transient_failure_is_retried(self, client: httpx.AsyncClient):
+        with patch(
+            "app.routers.resources._bg_download",
+            new_callable=AsyncMock,
+            side_effect=[httpx.ConnectError("reset"), 7],
+        ):
+            resp = await client.post(
+                "/api/resources/download", json={"url": "https://a.test/v.mp4"}
+            )
+            await self._drain()
+
+        resp = await client.get(f"/api/resources/downloads/{resp.json()['id']}")
+        assert resp.json()["status"] == "completed"
+        assert resp.json()["attempts"] == 2
+        assert resp.json()["error"] is None
+
+    async def test_client_error_fails_without_retry(self, client: httpx.AsyncClient):
+        not_found = httpx.HTTPStatusError(
+            "404 Not Found",
+            request=httpx.Request("GET", "https://a.test/v.mp4"),
+            response=httpx.Response(404),
+        )
+        with patch(
+            "app.routers.resources._bg_download",
+            new_callable=AsyncMock,
+            side_effect=not_found,
+        ):
+            resp = await client.post(
+                "/api/resources/download", json={"url": "https://a.test/v.mp4"}
+            )
+            await self._drain()
+
+        resp = await client.get(f"/api/resources/downloads/{resp.json()['id']}")
+        assert resp.json()["status"] == "failed"
+        assert resp.json()["attempts"] == 1
+        assert "404" in resp.json()["error"]
+
+    async def test_concurrency_is_limited_overall_and_per_host(
+        self, client: httpx.AsyncClient
+    ):
+        running: dict[str, int] = {}
+        peak_host = peak_total = 0
+        gate = asyncio.Event()
+
+        async def fake_download(url, ext, max_height, on_chunk):
+            nonlocal peak_host, peak_total
+            host = httpx.URL(url).host
+            running[host] = running.get(host, 0) + 1
+            peak_host = max(peak_host, running[host])
+            peak_total = max(peak_total, sum(running.values()))
+            on_chunk(100)
+            await gate.wait()
+            running[host] -= 1
+            return 1
+
+        with (
+            patch("app.routers.resources._bg_download", side_effect=fake_download),
+            patch("app.routers.resources.DOWNLOAD_CONCURRENCY", 3),
+            patch("app.routers.resources.DOWNLOAD_PER_HOST", 2),
+        ):
+            for host in ("a", "b", "c"):
+                for i in range(4):
+                    resp = await client.post(
+                        "/api/resources/download",
+                        json={"url": f"https://{host}.test/{i}.jpg"},
+                    )
+                    assert resp.status_code == 202
+
+            async def saturated():
+                while sum(running.values()) < 3:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(saturated(), timeout=5)
+            gate.set()
+            await self._drain()
+
+        assert peak_host == 2
+        assert peak_total == 3
+        resp = await client.get(f"/api/resources/downloads/{resp.json()['id']}")
+        assert resp.json()["bytes_received"] == 100
+
+    async def test_cancel_running_download(self, client: httpx.AsyncClient):
+        started = asyncio.Event()
+
+        async def hang(*args):
+            started.set()
+            await asyncio.Event().wait()
+
+        with patch("app.routers.resources._bg_download", side_effect=hang):
+            resp = await client.post(
+                "/api/resources/download", json={"url": "https://a.test/v.mp4"}
+            )
+            job_id = resp.json()["id"]
+            await started.wait()
+            resp = await client.post(f"/api/resources/downloads/{job_id}/cancel")
+
+        assert resp.json()["status"] == "cancelled"
+        assert job_id not in resources._download_tasks
+
+    async def test_resume_requeues_unfinished_jobs(self, db: AsyncSession):
+        db.add(
+            DownloadJob(
+                id="interrupted",
+                url="https://a.test/v.mp4",
+                ext=".mp4",
+                status="running",
+            )
+        )
+        await db.commit()
+
+        with patch(
+            "app.routers.resources._bg_download", new_callable=AsyncMock, return_value=3
+        ):
+            await resources.resume_download_jobs()
+            await self._drain()
+
+        job = await db.get(DownloadJob, "interrupted")
+        await db.refresh(job)
+        assert job.status == "completed"
+        assert job.resource_id == 3
+
+    async def test_unknown_job_returns_404(self, client: httpx.AsyncClient):
+        resp = await client.get("/api/resources/downloads/nope")
+        assert resp.status_code == 404
+
+
+def _mock_remote(handler) -> httpx.AsyncClient:
+    """A client that serves requests from ``handler`` instead of the network."""
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), follow_redirects=True
+    )
+
+
+class TestBackgroundDownload:
+    async def test_streams_direct_download_to_content_addressed_file(
+        self, db: AsyncSession, tmp_path: Path
+    ):
+        content = b"\xff\xd8" + b"\x01" * (3 * 1024 * 1024)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=content)
+
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path / ".downloads"),
+            patch("app.routers.resources.async_session", async_session_test),
+            patch(
+                "app.routers.resources.get_http_client",
+                return_value=_mock_remote(handler),
+            ),
+        ):
+            await _bg_download("https://example.com/big.jpg", ".jpg")
+
+        sha = hashlib.sha256(content).hexdigest()
+        assert shard_path(tmp_path, f"{sha}.jpg").read_bytes() == content
+        assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [f"{sha}.jpg"]
+        resource = await db.scalar(select(Resource))
+        assert resource.filename == f"{sha}.jpg"
+        assert resource.size == len(content)
+
+    async def test_failed_download_leaves_no_temp_file(self, tmp_path: Path):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404)
+
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path / ".downloads"),
+            patch("app.routers.resources.async_session", async_session_test),
+            patch(
+                "app.routers.resources.get_http_client",
+                return_value=_mock_remote(handler),
+            ),
+            pytest.raises(httpx.HTTPStatusError),
+        ):
+            await _bg_download("https://example.com/gone.png", ".png")
+        assert list(tmp_path.rglob("*")) == []
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    """A response body that drops the connection after ``data``."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+        raise httpx.ReadError("connection reset")
+
+
+class TestResumableDownload:
+    URL = "https://example.com/movie.mp4"
+
+    @pytest.fixture(autouse=True)
+    def _dirs(self, tmp_path: Path):
+        self.media_dir = tmp_path / "media"
+        with (
+            patch("app.routers.resources.MEDIA_DIR", self.media_dir),
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path / "downloads"),
+        ):
+            yield
+
+    def _server(self, content: bytes, etag: str = '"v1"', fail_after: int = 0):
+        """A range-capable stand-in server; optionally drops the first transfer."""
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+            range_header = request.headers.get("Range")
+            if range_header and request.headers.get("If-Range") == etag:
+                start, _, stop = range_header[6:].partition("-")
+                end = int(stop) + 1 if stop else len(content)
+                body = content[int(start) : end]
+                headers["Content-Range"] = f"bytes {start}-{end - 1}/{len(content)}"
+                return httpx.Response(206, headers=headers, content=body)
+            headers["Content-Length"] = str(len(content))
+            if fail_after and len(requests) == 1:
+                return httpx.Response(
+                    200, headers=headers, stream=_BrokenStream(content[:fail_after])
+                )
+            return httpx.Response(200, headers=headers, content=content)
+
+        return handler, requests
+
+    async def _download(self, handler) -> StoredFile:
+        with patch(
+            "app.routers.resources.get_http_client",
+            return_value=_mock_remote(handler),
+        ):
+            stored, _ = await _download_direct(self.URL, ".mp4")
+        return stored
+
+    async def test_resumes_from_partial_file(self):
+        content = bytes(range(256)) * 12288  # 3 MiB
+        handler, requests = self._server(content, fail_after=1536 * 1024)
+
+        with pytest.raises(httpx.ReadError):
+            await self._download(handler)
+        stored = await self._download(handler)
+
+        assert stored.path.read_bytes() == content
+        assert stored.sha256 == hashlib.sha256(content).hexdigest()
+        # Everything written before the drop (whole 1 MiB chunks) is kept
+        assert requests[1].headers["Range"] == "bytes=1048576-3145727"
+        assert requests[1].headers["If-Range"] == '"v1"'
+        assert [p for p in self.media_dir.parent.rglob("*.part")] == []
+
+    async def test_restarts_when_remote_file_changed(self):
+        old = b"o" * 5000
+        handler, _ = self._server(old, fail_after=1000)
+        with pytest.raises(httpx.ReadError):
+            await self._download(handler)
+
+        new = b"n" * 6000
+        handler, requests = self._server(new, etag='"v2"')
+        stored = await self._download(handler)
+
+        assert stored.path.read_bytes() == new
+        # The ranged attempt got a full 200 back, so the transfer restarted
+        assert len(requests) == 2
+        assert "Range" not in requests[1].headers
+
+    async def test_large_files_fetched_as_parallel_parts(self):
+        content = bytes(range(256)) * 100
+        handler, requests = self._server(content)
+
+        with (
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_THRESHOLD", 1000),
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_PARTS", 4),
+        ):
+            stored = await self._download(handler)
+
+        assert stored.path.read_bytes() == content
+        assert sorted(r.headers.get("Range", "") for r in requests[1:]) == [
+            "bytes=0-6399",
+            "bytes=12800-19199",
+            "bytes=19200-25599",
+            "bytes=6400-12799",
+        ]
+
+    def _short_ranges(self, content: bytes, count: int):
+        """Like ``_server``, but the first ``count`` range responses stop early."""
+        handler, requests = self._server(content)
+
+        def short(request: httpx.Request) -> httpx.Response:
+            resp = handler(request)
+            ranged = sum("Range" in r.headers for r in requests)
+            if resp.status_code == 206 and ranged <= count:
+                body = resp.content[: len(resp.content) // 2]
+                return httpx.Response(206, headers=resp.headers, content=body)
+            return resp
+
+        return short, requests
+
+    async def test_short_range_is_requested_again(self):
+        content = bytes(range(256)) * 100
+        handler, requests = self._short_ranges(content, count=1)
+
+        with (
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_THRESHOLD", 1000),
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_PARTS", 4),
+        ):
+            stored = await self._download(handler)
+
+        assert stored.path.read_bytes() == content
+        assert len(requests) == 1 + 4 + 1
+
+    async def test_part_that_stops_growing_fails_the_download(self):
+        content = bytes(range(256)) * 100
+        handler, _ = self._server(content)
+
+        def empty(request: httpx.Request) -> httpx.Response:
+            resp = handler(request)
+            if request.headers.get("Range", "").startswith("bytes=6400-"):
+                return httpx.Response(206, headers=resp.headers, content=b"")
+            return resp
+
+        with (
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_THRESHOLD", 1000),
+            patch("app.routers.resources.DOWNLOAD_PARALLEL_PARTS", 4),
+            pytest.raises(httpx.RemoteProtocolError),
+        ):
+            await self._download(empty)
+
+        assert not self.media_dir.exists() or not any(self.media_dir.rglob("*.mp4"))
+
+
+class TestUrlDeduplication:
+    URL = "https://example.com/photo.jpg"
+
+    @pytest.fixture(autouse=True)
+    def _env(self, tmp_path: Path):
+        self.requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"jpeg")
+
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path / "media"),
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path / "downloads"),
+            patch("app.routers.resources.async_session", async_session_test),
+            patch("app.routers.resources._download_slots", None),
+            patch("app.routers.resources._host_slots", {}),
+            patch(
+                "app.routers.resources.get_http_client",
+                return_value=_mock_remote(handler),
+            ),
+        ):
+            yield
+
+    async def test_repeat_download_within_ttl_is_not_fetched(self, db: AsyncSession):
+        first = await _bg_download(self.URL, ".jpg")
+        second = await _bg_download(self.URL, ".jpg")
+
+        assert first == second
+        assert len(self.requests) == 1
+        source = await db.get(DownloadSource, self.URL)
+        assert (source.etag, source.resource_id) == ('"v1"', first)
+
+    async def test_stale_record_revalidates_with_conditional_request(self):
+        first = await _bg_download(self.URL, ".jpg")
+        with patch("app.routers.resources.DOWNLOAD_URL_CACHE_TTL", 0):
+            second = await _bg_download(self.URL, ".jpg")
+
+        assert first == second
+        assert self.requests[1].headers["If-None-Match"] == '"v1"'
+
+    async def test_trashed_resource_is_downloaded_again(self, db: AsyncSession):
+        first = await _bg_download(self.URL, ".jpg")
+        resource = await db.get(Resource, first)
+        resource.deleted_at = datetime.now(UTC)
+        await db.commit()
+
+        await _bg_download(self.URL, ".jpg")
+        assert len(self.requests) == 2
+        assert "If-None-Match" not in self.requests[1].headers
+
+    async def test_duplicate_requests_merge_into_running_job(
+        self, client: httpx.AsyncClient
+    ):
+        gate = asyncio.Event()
+
+        async def slow_download(*args):
+            await gate.wait()
+            return 1
+
+        with patch("app.routers.resources._bg_download", side_effect=slow_download):
+            first = await client.post("/api/resources/download", json={"url": self.URL})
+            second = await client.post(
+                "/api/resources/download", json={"url": self.URL}
+            )
+            other = await client.post(
+                "/api/resources/download",
+                json={"url": self.URL, "max_height": 720},
+            )
+            gate.set()
+            await asyncio.gather(*list(resources._download_tasks.values()))
+
+        assert first.json()["id"] == second.json()["id"]
+        assert other.json()["id"] != first.json()["id"]
+        assert resources._url_jobs == {}
+
+
+class TestM3u8Download:
+    async def test_m3u8_segments_are_staged_then_remuxed(self, tmp_path: Path):
+        playlist = "#EXTM3U\n#EXTINF:2,\nseg0.ts\n#EXTINF:2,\nseg1.ts\n"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            name = request.url.path.rsplit("/", 1)[-1]
+            if name == "index.m3u8":
+                return httpx.Response(200, text=playlist)
+            return httpx.Response(200, content=name.encode())
+
+        async def fake_remux(src: Path, dest: Path) -> bool:
+            dest.write_bytes(src.read_bytes())
+            return True
+
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path / "media"),
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path / "downloads"),
+            patch("app.routers.resources.remux_to_mp4", side_effect=fake_remux),
+            patch("app.routers.resources.async_session", async_session_test),
+            patch(
+                "app.routers.resources.get_http_client",
+                return_value=_mock_remote(handler),
+            ),
+            patch(
+                "app.routers.resources._create_downloaded_resource",
+                new_callable=AsyncMock,
+                return_value=1,
+            ) as create,
+        ):
+            await _bg_download("https://example.com/live/index.m3u8", ".m3u8")
+
+        sha = hashlib.sha256(b"seg0.tsseg1.ts").hexdigest()
+        stored = create.await_args.args[0]
+        assert stored.path == shard_path(tmp_path / "media", f"{sha}.mp4")
+        assert stored.path.read_bytes() == b"seg0.tsseg1.ts"
+        # The staged TS is removed after the remux
+        assert [p for p in (tmp_path / "downloads").rglob("*") if p.is_file()] == []
+
+
+class TestHlsSegments:
+    async def test_segments_fetched_concurrently_and_written_in_order(self):
+        segments = [Segment(f"https://example.com/seg{i}.ts") for i in range(20)]
+        in_flight = peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            index = int(request.url.path[4:-3])
+            # Later segments finish first
+            await asyncio.sleep(0.001 * (20 - index))
+            in_flight -= 1
+            return httpx.Response(200, content=f"[{index}]".encode())
+
+        with patch("app.routers.resources.DOWNLOAD_SEGMENT_CONCURRENCY", 4):
+            async with _mock_remote(handler) as remote:
+                chunks = [c async for c in _iter_segments(remote, segments)]
+
+        assert chunks == [f"[{i}]".encode() for i in range(20)]
+        assert 1 < peak <= 4
+
+    async def test_transient_segment_failure_is_retried(self):
+        attempts: dict[str, int] = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path
+            attempts[path] = attempts.get(path, 0) + 1
+            if path == "/seg1.ts" and attempts[path] < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, content=path.encode())
+
+        segments = [Segment(f"https://example.com/seg{i}.ts") for i in range(3)]
+        with patch("app.routers.resources._SEGMENT_RETRY_DELAY", 0):
+            async with _mock_remote(handler) as remote:
+                chunks = [c async for c in _iter_segments(remote, segments)]
+
+        assert chunks == [b"/seg0.ts", b"/seg1.ts", b"/seg2.ts"]
+        assert attempts["/seg1.ts"] == 3
+
+    async def test_missing_segment_fails_without_retry(self):
+        attempts = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal attempts
+            attempts += 1
+            return httpx.Response(404)
+
+        async with _mock_remote(handler) as remote:
+            with pytest.raises(httpx.HTTPStatusError):
+                await _fetch_segment(
+                    remote, Segment("https://example.com/seg0.ts"), _KeyCache(remote)
+                )
+        assert attempts == 1
+
+
+def _encrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+    padder = padding.PKCS7(128).padder()
+    padded = padder.update(data) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+    return encryptor.update(padded) + encryptor.finalize()
+
+
+class TestHlsDownload:
+    """``_download_m3u8`` against a stand-in HLS server."""
+
+    async def _download(self, tmp_path: Path, routes: dict, **kwargs) -> tuple:
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            body = routes[request.url.path]
+            if isinstance(body, str):
+                return httpx.Response(200, text=body)
+            if "Range" in request.headers:
+                start, end = request.headers["Range"][6:].split("-")
+                return httpx.Response(206, content=body[int(start) : int(end) + 1])
+            return httpx.Response(200, content=body)
+
+        with (
+            patch("app.routers.resources.DOWNLOAD_DIR", tmp_path),
+            patch(
+                "app.routers.resources.get_http_client",
+                return_value=_mock_remote(handler),
+            ),
+        ):
+            stored = await _download_m3u8("https://cdn.test/master.m3u8", **kwargs)
+        return stored, requests
+
+    async def test_selects_variant_from_master_playlist(self, tmp_path: Path):
+        routes = {
+            "/master.m3u8": (
+                "#EXTM3U\n"
+                "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n"
+                "low/index.m3u8\n"
+                '#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080,CODECS="avc1,mp4a"\n'
+                "high/index.m3u8\n"
+            ),
+            "/low/index.m3u8": "#EXTM3U\n#EXTINF:4,\nseg.ts\n",
+            "/high/index.m3u8": "#EXTM3U\n#EXTINF:4,\nseg.ts\n",
+            "/low/seg.ts": b"low",
+            "/high/seg.ts": b"high",
+        }
+        stored, _ = await self._download(tmp_path, routes)
+        assert stored.path.read_bytes() == b"high"
+
+        stored, _ = await self._download(tmp_path, routes, max_height=720)
+        assert stored.path.read_bytes() == b"low"
+
+    async def test_decrypts_aes128_segments_and_caches_key(self, tmp_path: Path):
+        key = bytes(range(16))
+        iv = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+        seg0, seg1 = b"first segment" * 1000, b"second segment" * 1000
+        routes = {
+            "/master.m3u8": (
+                "#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:7\n"
+                '#EXT-X-KEY:METHOD=AES-128,URI="key.bin",IV=0x000102030405060708090a0b0c0d0e0f\n'
+                "#EXTINF:4,\nseg0.ts\n#EXTINF:4,\nseg1.ts\n"
+                '#EXT-X-KEY:METHOD=AES-128,URI="key.bin"\n'
+                "#EXTINF:4,\nseg2.ts\n"
+            ),
+            "/key.bin": key,
+            "/seg0.ts": _encrypt(key, iv, seg0),
+            "/seg1.ts": _encrypt(key, iv, seg1),
+            # No explicit IV: the media sequence number (7 + 2) is used
+            "/seg2.ts": _encrypt(key, (9).to_bytes(16, "big"), b"third"),
+        }
+        stored, requests = await self._download(tmp_path, routes)
+
+        assert stored.path.read_bytes() == seg0 + seg1 + b"third"
+        assert [r.url.path for r in requests].count("/key.bin") == 1
+
+    async def test_map_and_byterange_segments(self, tmp_path: Path):
+        media = b"INIT" + b"AAAA" + b"BBBBBB"
+        routes = {
+            "/master.m3u8": (
+                "#EXTM3U\n"
+                '#EXT-X-MAP:URI="media.mp4",BYTERANGE="4@0"\n'
+                "#EXT-X-BYTERANGE:4@4\n#EXTINF:4,\nmedia.mp4\n"
+                "#EXT-X-BYTERANGE:6\n#EXTINF:4,\nmedia.mp4\n"
+            ),
+            "/media.mp4": media,
+        }
+        stored, requests = await self._download(tmp_path, routes)
+
+        assert stored.path.suffix == ".mp4"
+        assert stored.path.read_bytes() == media
+        assert [r.headers.get("Range") for r in requests[1:]] == [
+            "bytes=0-3",
+            "bytes=4-7",
+            "bytes=8-13",
+        ]
+
+
+# ---------------------------------------------------------------------------
+# POST /api/resources/upload
+# ---------------------------------------------------------------------------
+
+
+class TestUploadResource:
+    async def test_stores_file_under_content_hash(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        content = b"\x89PNG" + b"\x00" * 3000
+        with patch("app.routers.resources.MEDIA_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/upload",
+                params={"tags": "a, b"},
+                files={"file": ("photo.png", content, "image/png")},
+            )
+        assert resp.status_code == 201, resp.text
+        data = resp.json()
+        sha = hashlib.sha256(content).hexdigest()
+        assert data["filename"] == f"{sha}.png"
+        assert data["title"] == "photo.png"
+        assert {t["name"] for t in data["tags"]} == {"a", "b"}
+        assert shard_path(tmp_path, f"{sha}.png").read_bytes() == content
+        # No temp files left behind
+        assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [f"{sha}.png"]
+
+    async def test_rejects_unsupported_extension_without_writing(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        with patch("app.routers.resources.MEDIA_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/upload",
+                files={"file": ("notes.txt", b"hello", "text/plain")},
+            )
+        assert resp.status_code == 400
+        assert list(tmp_path.iterdir()) == []
+
+
+# ---------------------------------------------------------------------------
+# Resumable uploads: /api/resources/uploads
+# ---------------------------------------------------------------------------
+
+
+class TestResumableUpload:
+    async def _put(
+        self, client: httpx.AsyncClient, upload_id: str, start: int, data: bytes, total
+    ) -> httpx.Response:
+        end = start + len(data) - 1
+        return await client.put(
+            f"/api/resources/uploads/{upload_id}",
+            content=data,
+            headers={"Content-Range": f"bytes {start}-{end}/{total}"},
+        )
+
+    async def test_chunked_upload_creates_resource(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        content = b"\xff\xd8\xff" + bytes(range(256)) * 20
+        sha = hashlib.sha256(content).hexdigest()
+        upload_dir = tmp_path / ".uploads"
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.UPLOAD_DIR", upload_dir),
+        ):
+            resp = await client.post(
+                "/api/resources/uploads",
+                json={
+                    "filename": "big.jpg",
+                    "tags": ["holiday"],
+                    "size": len(content),
+                    "sha256": sha,
+                },
+            )
+            assert resp.status_code == 201, resp.text
+            upload_id = resp.json()["id"]
+            assert resp.json()["offset"] == 0
+
+            for start in range(0, len(content), 1000):
+                resp = await self._put(
+                    client,
+                    upload_id,
+                    start,
+                    content[start : start + 1000],
+                    len(content),
+                )
+                assert resp.status_code == 200, resp.text
+
+            resp = await client.get(f"/api/resources/uploads/{upload_id}")
+            assert resp.json()["offset"] == len(content)
+
+            resp = await client.post(f"/api/resources/uploads/{upload_id}/complete")
+            assert resp.status_code == 201, resp.text
+            data = resp.json()
+
+        assert data["filename"] == f"{sha}.jpg"
+        assert data["title"] == "big.jpg"
+        assert [t["name"] for t in data["tags"]] == ["holiday"]
+        assert shard_path(tmp_path, f"{sha}.jpg").read_bytes() == content
+        assert list(upload_dir.iterdir()) == []
+
+        resp = await client.get(f"/api/resources/uploads/{upload_id}")
+        assert resp.status_code == 404
+        resp = await self._put(client, upload_id, 0, b"late", "*")
+        assert resp.status_code == 404
+        assert upload_id not in resources._upload_locks
+
+    async def test_rejects_chunk_at_wrong_offset(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        with patch("app.routers.resources.UPLOAD_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/uploads", json={"filename": "clip.mp4"}
+            )
+            upload_id = resp.json()["id"]
+
+            resp = await self._put(client, upload_id, 0, b"abcd", "*")
+            assert resp.status_code == 200
+            assert resp.json()["offset"] == 4
+
+            # Replaying the same range (e.g. after a lost response) conflicts
+            resp = await self._put(client, upload_id, 0, b"abcd", "*")
+            assert resp.status_code == 409
+            assert "committed offset is 4" in resp.json()["detail"]
+
+        assert (tmp_path / f"{upload_id}.part").read_bytes() == b"abcd"
+
+    async def test_complete_uses_running_hash(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        content = b"\x89PNG" + bytes(range(256)) * 8
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.UPLOAD_DIR", tmp_path / ".uploads"),
+            patch(
+                "app.routers.resources.sha256_file", side_effect=AssertionError
+            ) as sha256_file,
+        ):
+            resp = await client.post(
+                "/api/resources/uploads",
+                json={
+                    "filename": "a.png",
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                },
+            )
+            upload_id = resp.json()["id"]
+            await self._put(client, upload_id, 0, content[:1000], "*")
+            await self._put(client, upload_id, 1000, content[1000:1500], "*")
+            await self._put(client, upload_id, 1500, content[1500:], "*")
+
+            resp = await client.post(f"/api/resources/uploads/{upload_id}/complete")
+        assert resp.status_code == 201, resp.text
+        sha256_file.assert_not_called()
+        assert upload_id not in resources._upload_hashes
+        assert upload_id not in resources._upload_locks
+
+    async def test_complete_rehashes_after_restart(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        content = b"\x89PNG" + bytes(64)
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.UPLOAD_DIR", tmp_path / ".uploads"),
+        ):
+            resp = await client.post(
+                "/api/resources/uploads", json={"filename": "a.png"}
+            )
+            upload_id = resp.json()["id"]
+            await self._put(client, upload_id, 0, content[:10], "*")
+            resources._upload_hashes.clear()
+            await self._put(client, upload_id, 10, content[10:], "*")
+
+            resp = await client.post(f"/api/resources/uploads/{upload_id}/complete")
+        assert resp.status_code == 201, resp.text
+        assert resp.json()["filename"] == f"{hashlib.sha256(content).hexdigest()}.png"
+
+    async def test_concurrent_chunks_are_serialized(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        started = asyncio.Event()
+        gate = asyncio.Event()
+
+        async def slow_body():
+            yield b"ab"
+            started.set()
+            await gate.wait()
+            yield b"cd"
+
+        with patch("app.routers.resources.UPLOAD_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/uploads", json={"filename": "clip.mp4"}
+            )
+            upload_id = resp.json()["id"]
+            first = asyncio.create_task(
+                client.put(
+                    f"/api/resources/uploads/{upload_id}",
+                    content=slow_body(),
+                    headers={"Content-Range": "bytes 0-3/*"},
+                )
+            )
+            await started.wait()
+            second = asyncio.create_task(self._put(client, upload_id, 0, b"WXYZ", "*"))
+            await asyncio.sleep(0.05)
+            gate.set()
+            first, second = await asyncio.gather(first, second)
+
+        assert first.status_code == 200, first.text
+        assert second.status_code == 409
+        assert (tmp_path / f"{upload_id}.part").read_bytes() == b"abcd"
+
+    async def test_complete_rejects_incomplete_upload(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        with patch("app.routers.resources.UPLOAD_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/uploads", json={"filename": "a.png", "size": 10}
+            )
+            upload_id = resp.json()["id"]
+            await self._put(client, upload_id, 0, b"12345", 10)
+
+            resp = await client.post(f"/api/resources/uploads/{upload_id}/complete")
+        assert resp.status_code == 400
+        assert "5 of 10" in resp.json()["detail"]
+
+    async def test_complete_rejects_hash_mismatch(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        with (
+            patch("app.routers.resources.MEDIA_DIR", tmp_path),
+            patch("app.routers.resources.UPLOAD_DIR", tmp_path / ".uploads"),
+        ):
+            resp = await client.post(
+                "/api/resources/uploads",
+                json={"filename": "a.png", "sha256": "0" * 64},
+            )
+            upload_id = resp.json()["id"]
+            await self._put(client, upload_id, 0, b"12345", "*")
+
+            resp = await client.post(f"/api/resources/uploads/{upload_id}/complete")
+        assert resp.status_code == 400
+        assert "mismatch" in resp.json()["detail"]
+        assert list((tmp_path / ".uploads").iterdir()) == []
+
+    async def test_rejects_unsupported_extension(self, client: httpx.AsyncClient):
+        resp = await client.post("/api/resources/uploads", json={"filename": "a.txt"})
+        assert resp.status_code == 400
+
+    async def test_abort_removes_session(
+        self, client: httpx.AsyncClient, tmp_path: Path
+    ):
+        with patch("app.routers.resources.UPLOAD_DIR", tmp_path):
+            resp = await client.post(
+                "/api/resources/uploads", json={"filename": "a.png"}
+            )
+            upload_id = resp.json()["id"]
+            resp = await client.delete(f"/api/resources/uploads/{upload_id}")
+        assert resp.status_code == 204
+        assert list(tmp_path.iterdir()) == []
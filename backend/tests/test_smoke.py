@@ -18,3 +18,9 @@ async def test_health_endpoint(client):
     """Verify the async test client can reach the API."""
     resp = await client.get("/api/health")
     assert resp.status_code == 200
+
+
+async def test_http_pool_stats_endpoint(client):
+    resp = await client.get("/api/health/http")
+    assert resp.status_code == 200
+    assert resp.json()["max_connections"] > 0
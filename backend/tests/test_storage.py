@@ -0,0 +1,130 @@
+"""Tests for the content-addressed storage helpers."""
+
+import errno
+import hashlib
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.storage import find_file, place_file, shard_path, store_stream
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def test_store_stream_hashes_and_renames(tmp_path: Path):
+    stored = await store_stream(_chunks(b"abc", b"def"), tmp_path, ".jpg")
+
+    sha = hashlib.sha256(b"abcdef").hexdigest()
+    assert stored.sha256 == sha
+    assert stored.size == 6
+    assert stored.filename == f"{sha}.jpg"
+    assert stored.path == tmp_path / sha[:2] / sha[2:4] / f"{sha}.jpg"
+    assert stored.path.read_bytes() == b"abcdef"
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [f"{sha}.jpg"]
+
+
+async def test_store_stream_keeps_existing_file(tmp_path: Path):
+    sha = hashlib.sha256(b"same").hexdigest()
+    existing = shard_path(tmp_path, f"{sha}.png")
+    existing.parent.mkdir(parents=True)
+    existing.write_bytes(b"same")
+    mtime = existing.stat().st_mtime_ns
+
+    stored = await store_stream(_chunks(b"sa", b"me"), tmp_path, ".png")
+
+    assert stored.path == existing
+    assert existing.stat().st_mtime_ns == mtime
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [f"{sha}.png"]
+
+
+async def test_store_stream_removes_temp_on_failure(tmp_path: Path):
+    async def broken():
+        yield b"partial"
+        raise RuntimeError("connection dropped")
+
+    with pytest.raises(RuntimeError):
+        await store_stream(broken(), tmp_path, ".mp4")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_find_file_prefers_sharded_then_legacy(tmp_path: Path):
+    name = "abcdef.jpg"
+    sharded = shard_path(tmp_path, name)
+    assert find_file(tmp_path, name, "old") == sharded
+
+    legacy = tmp_path / "old" / name
+    legacy.parent.mkdir()
+    legacy.write_bytes(b"legacy")
+    assert find_file(tmp_path, name, "old") == legacy
+
+    sharded.parent.mkdir(parents=True)
+    sharded.write_bytes(b"sharded")
+    assert find_file(tmp_path, name, "old") == sharded
+
+
+def test_place_file_hardlink_shares_inode(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"linked")
+    dest = tmp_path / "dest.jpg"
+
+    assert place_file(src, dest, "hardlink") == "hardlink"
+    assert dest.stat().st_ino == src.stat().st_ino
+
+
+def test_place_file_falls_back_to_copy(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"cross-device")
+    dest = tmp_path / "dest.jpg"
+
+    with patch("app.storage.os.link", side_effect=OSError(errno.EXDEV, "EXDEV")):
+        assert place_file(src, dest, "hardlink") == "copy"
+    assert dest.read_bytes() == b"cross-device"
+    assert dest.stat().st_ino != src.stat().st_ino
+
+
+def test_place_file_reflink_or_copy(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"cloned")
+    dest = tmp_path / "dest.jpg"
+
+    assert place_file(src, dest, "reflink") in ("reflink", "copy")
+    assert dest.read_bytes() == b"cloned"
+    assert src.exists()
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+
+def test_place_file_move_removes_source(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"moved")
+    dest = tmp_path / "dest.jpg"
+
+    assert place_file(src, dest, "move") == "move"
+    assert not src.exists()
+    assert dest.read_bytes() == b"moved"
+
+
+def test_place_file_move_leaves_source_when_dest_exists(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"duplicate")
+    dest = tmp_path / "dest.jpg"
+    dest.write_bytes(b"duplicate")
+
+    assert place_file(src, dest, "move") == "move"
+    assert src.read_bytes() == b"duplicate"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+
+def test_place_file_move_restores_source_on_failure(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"keep-me")
+    dest = tmp_path / "dest.jpg"
+
+    with patch("app.storage.commit_temp", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            place_file(src, dest, "move")
+    assert src.read_bytes() == b"keep-me"
+    assert not dest.exists()
@@ -0,0 +1,98 @@
+"""Tests for the storage router (legacy layout migration) and sharded serving."""
+
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Resource
+from app.routers import storage
+from app.schemas import StorageMigrationResponse
+from app.storage import ShardedStaticFiles, shard_path
+from tests.conftest import async_session_test
+
+
+async def test_migrate_moves_legacy_files_into_shards(db: AsyncSession, tmp_path: Path):
+    media_dir = tmp_path / "media"
+    thumb_dir = tmp_path / "thumbnails"
+    trash_dir = tmp_path / "trash"
+    (media_dir / "holiday").mkdir(parents=True)
+    (media_dir / "holiday" / "aaaa1111.jpg").write_bytes(b"photo")
+    thumb_dir.mkdir()
+    (thumb_dir / "aaaa1111_thumb.jpg").write_bytes(b"thumb")
+    trash_dir.mkdir()
+    (trash_dir / "bbbb2222.png").write_bytes(b"trashed")
+    db.add_all(
+        [
+            Resource(
+                category="image",
+                filename="aaaa1111.jpg",
+                folder="holiday",
+                thumbnail="aaaa1111_thumb.jpg",
+            ),
+            Resource(
+                category="image",
+                filename="bbbb2222.png",
+                deleted_at=datetime.now(UTC),
+            ),
+            Resource(category="image", filename="cccc3333.png"),
+        ]
+    )
+    await db.commit()
+
+    progress = StorageMigrationResponse(status="pending")
+    with (
+        patch("app.routers.storage.async_session", async_session_test),
+        patch("app.routers.storage.MEDIA_DIR", media_dir),
+        patch("app.routers.storage.THUMBNAIL_DIR", thumb_dir),
+        patch("app.routers.storage.TRASH_DIR", trash_dir),
+    ):
+        await storage.migrate_storage(progress)
+
+    assert progress.status == "completed"
+    assert (progress.total, progress.processed) == (3, 3)
+    assert (progress.moved, progress.missing) == (3, 1)
+    assert shard_path(media_dir, "aaaa1111.jpg").read_bytes() == b"photo"
+    assert shard_path(thumb_dir, "aaaa1111_thumb.jpg").read_bytes() == b"thumb"
+    assert shard_path(trash_dir, "bbbb2222.png").read_bytes() == b"trashed"
+    # Emptied legacy folders are removed
+    assert not (media_dir / "holiday").exists()
+
+
+async def test_migrate_endpoint_reports_progress(
+    client: httpx.AsyncClient, db: AsyncSession, tmp_path: Path
+):
+    (tmp_path / "dddd4444.jpg").write_bytes(b"x")
+    db.add(Resource(category="image", filename="dddd4444.jpg"))
+    await db.commit()
+
+    with (
+        patch("app.routers.storage.async_session", async_session_test),
+        patch("app.routers.storage.MEDIA_DIR", tmp_path),
+    ):
+        resp = await client.post("/api/storage/migrate")
+        assert resp.status_code == 202
+        await storage._migration_task
+
+    resp = await client.get("/api/storage/migrate")
+    assert resp.json()["status"] == "completed"
+    assert resp.json()["moved"] == 1
+    assert shard_path(tmp_path, "dddd4444.jpg").is_file()
+
+
+def test_sharded_static_files_lookup(tmp_path: Path):
+    """Files resolve by name from the sharded layout, with a legacy fallback."""
+    files = ShardedStaticFiles(directory=tmp_path)
+    sharded = shard_path(tmp_path, "eeee5555.jpg")
+    sharded.parent.mkdir(parents=True)
+    sharded.write_bytes(b"new")
+    (tmp_path / "old").mkdir()
+    (tmp_path / "old" / "ffff6666.jpg").write_bytes(b"old")
+
+    assert files.lookup_path("some/folder/eeee5555.jpg")[0] == str(sharded)
+    assert files.lookup_path("old/ffff6666.jpg")[0] == str(
+        tmp_path / "old" / "ffff6666.jpg"
+    )
+    assert files.lookup_path("missing.jpg")[1] is None
@@ -0,0 +1,898 @@
+"""Tests for the background thumbnail workers."""
+
+import asyncio
+import base64
+import io
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+from PIL import Image, JpegImagePlugin
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.converters import crop_tile, frame_args, make_placeholder, make_thumbnails
+from app.converters.probe import ProbeResult
+from app.models import Resource
+from app.routers import thumbnails
+from app.storage import shard_path
+from tests.conftest import async_session_test
+
+
+async def _fake_extract(
+    video_path: Path, output_path: Path, timestamp=1.0, **kwargs
+) -> bool:
+    Image.new("RGB", (1920, 1080), "green").save(output_path, format="JPEG")
+    return True
+
+
+async def _failing_extract(
+    video_path: Path, output_path: Path, timestamp=1.0, **kwargs
+) -> bool:
+    return False
+
+
+async def _wait_for_status(resource_id: int, status: str, timeout: float = 5.0):
+    async def poll():
+        while True:
+            async with async_session_test() as db:
+                resource = await db.get(Resource, resource_id)
+                if resource.thumbnail_status == status:
+                    return resource
+            await asyncio.sleep(0.01)
+
+    return await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def media(tmp_path: Path):
+    media_dir = tmp_path / "media"
+    thumb_dir = media_dir / ".thumbnails"
+    with (
+        patch("app.routers.resources.MEDIA_DIR", media_dir),
+        patch("app.routers.thumbnails.MEDIA_DIR", media_dir),
+        patch("app.routers.thumbnails.THUMBNAIL_DIR", thumb_dir),
+    ):
+        yield media_dir, thumb_dir
+
+
+async def _upload_video(client: httpx.AsyncClient, content: bytes = b"video") -> dict:
+    resp = await client.post(
+        "/api/resources/upload",
+        files={"file": ("clip.mp4", content, "video/mp4")},
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()
+
+
+class TestThumbnailWorkers:
+    async def test_upload_returns_before_thumbnail_is_rendered(
+        self, client: httpx.AsyncClient, media
+    ):
+        _, thumb_dir = media
+        with patch("app.routers.thumbnails.extract_frame", _fake_extract):
+            data = await _upload_video(client)
+            assert data["thumbnail_status"] == "pending"
+            assert data["thumbnail"] is None
+
+            resource = await _wait_for_status(data["id"], "ready")
+        stem = data["filename"].removesuffix(".mp4")
+        assert resource.thumbnail == f"{stem}_thumb_320.webp"
+        assert resource.thumbnail_widths == [160, 320, 640, 1280]
+        for width in resource.thumbnail_widths:
+            with Image.open(shard_path(thumb_dir, f"{stem}_thumb_{width}.webp")) as im:
+                assert im.size == (width, width * 9 // 16)
+        # The extracted full-size frame is not kept
+        assert sorted(p.name for p in thumb_dir.rglob("*") if p.is_file()) == sorted(
+            f"{stem}_thumb_{width}.webp" for width in resource.thumbnail_widths
+        )
+
+    async def test_unexpected_error_marks_thumbnail_failed(
+        self, client: httpx.AsyncClient, media, caplog
+    ):
+        with patch(
+            "app.routers.thumbnails.render_thumbnails",
+            side_effect=RuntimeError("decoder exploded"),
+        ):
+            data = await _upload_video(client)
+            resource = await _wait_for_status(data["id"], "failed")
+        assert resource.thumbnail_error == "RuntimeError: decoder exploded"
+        assert f"Thumbnail of resource {data['id']} failed" in caplog.text
+
+        # The worker keeps going
+        with patch("app.routers.thumbnails.extract_frame", _fake_extract):
+            data = await _upload_video(client, b"other video")
+            await _wait_for_status(data["id"], "ready")
+
+    async def test_image_upload_gets_downscaled_thumbnail(
+        self, client: httpx.AsyncClient, media
+    ):
+        _, thumb_dir = media
+        buf = io.BytesIO()
+        Image.new("RGB", (2400, 1600), "red").save(buf, format="JPEG")
+        resp = await client.post(
+            "/api/resources/upload",
+            files={"file": ("photo.jpg", buf.getvalue(), "image/jpeg")},
+        )
+        data = resp.json()
+        assert data["thumbnail_status"] == "pending"
+        resource = await _wait_for_status(data["id"], "ready")
+
+        stem = data["filename"].removesuffix(".jpg")
+        assert resource.thumbnail == f"{stem}_thumb_320.webp"
+        with Image.open(shard_path(thumb_dir, resource.thumbnail)) as thumb:
+            assert thumb.format == "WEBP"
+            assert thumb.size == (320, 213)
+
+    async def test_small_image_is_not_upscaled(self, client: httpx.AsyncClient, media):
+        buf = io.BytesIO()
+        Image.new("RGB", (400, 300), "red").save(buf, format="PNG")
+        resp = await client.post(
+            "/api/resources/upload",
+            files={"file": ("small.png", buf.getvalue(), "image/png")},
+        )
+        resource = await _wait_for_status(resp.json()["id"], "ready")
+        assert resource.thumbnail_widths == [160, 320]
+
+    async def test_svg_is_not_queued(self, client: httpx.AsyncClient, media):
+        resp = await client.post(
+            "/api/resources/upload",
+            files={"file": ("logo.svg", b"<svg/>", "image/svg+xml")},
+        )
+        assert resp.json()["thumbnail_status"] is None
+        assert thumbnails._queue is None
+
+    async def test_failure_is_retried_then_marked_failed(
+        self, client: httpx.AsyncClient, media
+    ):
+        calls = 0
+
+        async def extract(video_path, output_path, timestamp=1.0, **kwargs):
+            nonlocal calls
+            calls += 1
+            return False
+
+        with (
+            patch("app.routers.thumbnails.extract_frame", extract),
+            patch("app.routers.thumbnails._THUMBNAIL_RETRY_DELAY", 0),
+            patch("app.routers.thumbnails.THUMBNAIL_RETRIES", 3),
+        ):
+            data = await _upload_video(client)
+            resource = await _wait_for_status(data["id"], "failed")
+        assert calls == 3
+        assert resource.thumbnail_attempts == 3
+        assert resource.thumbnail_error == "FFmpeg extraction failed"
+
+        resp = await client.get("/api/thumbnails/failed")
+        assert [r["id"] for r in resp.json()] == [data["id"]]
+
+    async def test_concurrent_extractions_are_capped(
+        self, client: httpx.AsyncClient, media
+    ):
+        running = 0
+        peak = 0
+        gate = asyncio.Event()
+
+        async def extract(video_path, output_path, timestamp=1.0, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await gate.wait()
+            running -= 1
+            return await _fake_extract(video_path, output_path)
+
+        with (
+            patch("app.routers.thumbnails.extract_frame", extract),
+            patch("app.routers.thumbnails.THUMBNAIL_CONCURRENCY", 2),
+        ):
+            ids = [(await _upload_video(client, b"v%d" % i))["id"] for i in range(5)]
+
+            async def saturated():
+                while running < 2:
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(saturated(), 5)
+            resp = await client.get("/api/thumbnails/queue")
+            assert resp.json() == {"queued": 3, "pending": 5, "failed": 0}
+
+            gate.set()
+            for resource_id in ids:
+                await _wait_for_status(resource_id, "ready")
+        assert peak == 2
+
+    async def test_retry_endpoint_requeues(
+        self, client: httpx.AsyncClient, db: AsyncSession, media
+    ):
+        with patch("app.routers.thumbnails.extract_frame", _failing_extract):
+            data = await _upload_video(client)
+            with patch("app.routers.thumbnails.THUMBNAIL_RETRIES", 1):
+                await _wait_for_status(data["id"], "failed")
+
+        with patch("app.routers.thumbnails.extract_frame", _fake_extract):
+            resp = await client.post(f"/api/thumbnails/{data['id']}/retry")
+            assert resp.status_code == 200
+            assert resp.json()["thumbnail_status"] == "pending"
+            resource = await _wait_for_status(data["id"], "ready")
+        assert resource.thumbnail_attempts == 1
+        assert resource.thumbnail_error is None
+
+    async def test_retry_rejects_unsupported_files(self, client: httpx.AsyncClient):
+        resp = await client.post(
+            "/api/resources", json={"category": "image", "filename": "a.svg"}
+        )
+        resp = await client.post(f"/api/thumbnails/{resp.json()['id']}/retry")
+        assert resp.status_code == 400
+
+    async def test_pending_thumbnails_resume_on_startup(self, db: AsyncSession, media):
+        media_dir, _ = media
+        video = shard_path(media_dir, "abc.mp4")
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"video")
+        resource = Resource(
+            category="video", filename="abc.mp4", thumbnail_status="pending"
+        )
+        db.add(resource)
+        await db.commit()
+
+        with patch("app.routers.thumbnails.extract_frame", _fake_extract):
+            await thumbnails.start_thumbnail_workers()
+            resource = await _wait_for_status(resource.id, "ready")
+        assert resource.thumbnail == "abc_thumb_320.webp"
+
+    async def test_backfill_queues_existing_resources(self, db: AsyncSession, media):
+        media_dir, _ = media
+        for name in ("old.mp4", "old.png"):
+            path = shard_path(media_dir, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"data")
+        db.add_all(
+            [
+                Resource(category="video", filename="old.mp4"),
+                Resource(category="image", filename="old.png"),
+                # Single-size thumbnail from before the width pyramid
+                Resource(
+                    category="video",
+                    filename="legacy.mp4",
+                    thumbnail="legacy_thumb.jpg",
+                    thumbnail_status="ready",
+                ),
+                Resource(
+                    category="video",
+                    filename="done.mp4",
+                    thumbnail="done_thumb_320.webp",
+                    thumbnail_status="ready",
+                    thumbnail_widths=[160, 320],
+                    sprite_count=0,
+                ),
+                Resource(category="image", filename="logo.svg"),
+            ]
+        )
+        await db.commit()
+
+        queued = []
+        with patch("app.routers.thumbnails.enqueue_thumbnail", queued.append):
+            await thumbnails.backfill_thumbnails(batch_size=2)
+
+        result = await db.execute(
+            select(Resource.filename, Resource.thumbnail_status).order_by(Resource.id)
+        )
+        assert result.all() == [
+            ("old.mp4", "pending"),
+            ("old.png", "pending"),
+            ("legacy.mp4", "pending"),
+            ("done.mp4", "ready"),
+            ("logo.svg", None),
+        ]
+        assert queued == [1, 2, 3]
+
+    async def test_backfill_keeps_picked_video_frame(self, db: AsyncSession, media):
+        """A legacy thumbnail, possibly set_thumbnail's frame, is scaled as is."""
+        media_dir, thumb_dir = media
+        video = shard_path(media_dir, "abc.mp4")
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"video")
+        legacy = shard_path(thumb_dir, "abc_thumb.jpg")
+        legacy.parent.mkdir(parents=True)
+        Image.new("RGB", (1280, 720), "blue").save(legacy, format="JPEG")
+        resource = Resource(
+            category="video",
+            filename="abc.mp4",
+            thumbnail="abc_thumb.jpg",
+            thumbnail_status="ready",
+        )
+        db.add(resource)
+        await db.commit()
+
+        with patch("app.routers.thumbnails.extract_frame") as extract_frame:
+            await thumbnails.backfill_thumbnails()
+            resource = await _wait_for_status(resource.id, "ready")
+        extract_frame.assert_not_called()
+        assert resource.thumbnail_widths == [160, 320, 640, 1280]
+        assert resource.thumbnail == "abc_thumb_320.webp"
+        with Image.open(shard_path(thumb_dir, "abc_thumb_640.webp")) as im:
+            assert im.size == (640, 360)
+            r, g, b = im.convert("RGB").getpixel((320, 180))
+            assert b > 200 and r < 50 and g < 50
+        assert not legacy.exists()
+
+
+class TestThumbnailEndpoint:
+    async def _resource(self, db: AsyncSession, thumb_dir: Path, widths) -> int:
+        for width in widths:
+            path = shard_path(thumb_dir, f"abc_thumb_{width}.webp")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"w%d" % width)
+        resource = Resource(
+            category="image",
+            filename="abc.jpg",
+            thumbnail="abc_thumb_320.webp",
+            thumbnail_status="ready",
+            thumbnail_widths=widths,
+        )
+        db.add(resource)
+        await db.commit()
+        return resource.id
+
+    @pytest.mark.parametrize(
+        ("params", "expected"),
+        [
+            ({}, b"w320"),
+            ({"w": 100}, b"w160"),
+            ({"w": 160}, b"w160"),
+            ({"w": 161}, b"w320"),
+            ({"w": 300, "dpr": 2}, b"w640"),
+            ({"w": 2000}, b"w1280"),
+        ],
+    )
+    async def test_serves_smallest_covering_width(
+        self, client: httpx.AsyncClient, db: AsyncSession, media, params, expected
+    ):
+        _, thumb_dir = media
+        resource_id = await self._resource(db, thumb_dir, [160, 320, 640, 1280])
+        resp = await client.get(
+            f"/api/resources/{resource_id}/thumbnail", params=params
+        )
+        assert resp.status_code == 200
+        assert resp.content == expected
+        assert "no-cache" in resp.headers["cache-control"]
+
+    async def test_revalidation_sees_re_rendered_thumbnail(
+        self, client: httpx.AsyncClient, db: AsyncSession, media
+    ):
+        _, thumb_dir = media
+        resource_id = await self._resource(db, thumb_dir, [160, 320])
+        url = f"/api/resources/{resource_id}/thumbnail"
+        etag = (await client.get(url)).headers["etag"]
+
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+
+        # As set_thumbnail does: same file name, new content
+        shard_path(thumb_dir, "abc_thumb_320.webp").write_bytes(b"picked frame")
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.content == b"picked frame"
+        assert resp.headers["etag"] != etag
+
+    async def test_legacy_single_size_thumbnail(
+        self, client: httpx.AsyncClient, db: AsyncSession, media
+    ):
+        _, thumb_dir = media
+        path = shard_path(thumb_dir, "abc_thumb.jpg")
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"legacy")
+        resource = Resource(category="video", filename="abc.mp4", thumbnail=path.name)
+        db.add(resource)
+        await db.commit()
+
+        resp = await client.get(
+            f"/api/resources/{resource.id}/thumbnail", params={"w": 1000}
+        )
+        assert resp.content == b"legacy"
+
+    async def test_missing_thumbnail_is_404(self, client: httpx.AsyncClient):
+        resp = await client.post(
+            "/api/resources", json={"category": "image", "filename": "a.png"}
+        )
+        resp = await client.get(f"/api/resources/{resp.json()['id']}/thumbnail")
+        assert resp.status_code == 404
+
+    async def test_remove_deletes_every_width(
+        self, client: httpx.AsyncClient, db: AsyncSession, media
+    ):
+        _, thumb_dir = media
+        resource_id = await self._resource(db, thumb_dir, [160, 320, 640])
+        resp = await client.delete(f"/api/resources/{resource_id}/thumbnail")
+        assert resp.json()["thumbnail"] is None
+        assert resp.json()["thumbnail_widths"] is None
+        assert [p for p in thumb_dir.rglob("*") if p.is_file()] == []
+
+
+async def _fake_sprite(video_path, output_path, *, interval, columns, rows, tile_width):
+    # Each tile filled with a distinct grey level, so crops can be told apart
+    sheet = Image.new("L", (columns * tile_width, rows * 90))
+    for index in range(columns * rows):
+        x, y = (index % columns) * tile_width, (index // columns) * 90
+        sheet.paste(index * 10, (x, y, x + tile_width, y + 90))
+    sheet.convert("RGB").save(output_path, format="JPEG", quality=100)
+    return True
+
+
+class TestFrameExtraction:
+    async def test_worker_decodes_keyframes_only(
+        self, client: httpx.AsyncClient, media
+    ):
+        calls = []
+
+        async def extract(video_path, output_path, timestamp=1.0, **kwargs):
+            calls.append((timestamp, kwargs))
+            return await _fake_extract(video_path, output_path)
+
+        with patch("app.routers.thumbnails.extract_frame", extract):
+            data = await _upload_video(client)
+            await _wait_for_status(data["id"], "ready")
+        assert calls == [
+            (1.0, {"exact": False, "max_width": 1280, "candidates": 5}),
+        ]
+
+    async def test_set_thumbnail_uses_exact_frame(
+        self, client: httpx.AsyncClient, media
+    ):
+        media_dir, _ = media
+        calls = []
+
+        async def extract(video_path, output_path, timestamp=1.0, **kwargs):
+            calls.append((timestamp, kwargs))
+            return await _fake_extract(video_path, output_path)
+
+        with patch("app.routers.thumbnails.extract_frame", extract):
+            data = await _upload_video(client)
+            await _wait_for_status(data["id"], "ready")
+            calls.clear()
+            with patch("app.routers.resources.MEDIA_DIR", media_dir):
+                resp = await client.post(
+                    f"/api/resources/{data['id']}/thumbnail", json={"timestamp": 42}
+                )
+        assert resp.status_code == 200, resp.text
+        assert calls == [(42.0, {"max_width": 1280})]
+
+    def test_fast_args_skip_non_keyframes(self):
+        args = frame_args(
+            Path("in.mkv"),
+            Path("out.jpg"),
+            30,
+            exact=False,
+            max_width=640,
+            candidates=5,
+        )
+        # Decoder options and the seek must precede the input to apply to it
+        before_input = args[: args.index("-i")]
+        assert before_input == [
+            "ffmpeg",
+            "-skip_frame",
+            "nokey",
+            "-ss",
+            "30",
+            "-noaccurate_seek",
+        ]
+        assert args[args.index("-vf") + 1] == "scale=w='min(640,iw)':h=-2,thumbnail=5"
+        assert args[-2:] == ["out.jpg", "-y"]
+
+    def test_exact_args_match_the_legacy_command(self):
+        assert frame_args(Path("in.mp4"), Path("out.jpg"), 1.0) == [
+            "ffmpeg",
+            "-ss",
+            "1.0",
+            "-i",
+            "in.mp4",
+            "-an",
+            "-sn",
+            "-dn",
+            "-frames:v",
+            "1",
+            "-q:v",
+            "2",
+            "out.jpg",
+            "-y",
+        ]
+
+
+class TestSpriteSheets:
+    @pytest.fixture
+    def sprite_video(self, media):
+        probe = ProbeResult(
+            video_codec="h264",
+            audio_codec=None,
+            container="mov",
+            duration=125.0,
+            width=1280,
+            height=720,
+        )
+        with (
+            patch("app.routers.thumbnails.extract_frame", _fake_extract),
+            patch("app.routers.thumbnails.make_sprite_sheet", _fake_sprite),
+            patch("app.routers.thumbnails.probe_video", return_value=probe),
+            patch("app.routers.thumbnails.SPRITE_INTERVAL", 10),
+            patch("app.routers.thumbnails.SPRITE_COLUMNS", 5),
+            patch("app.routers.thumbnails.SPRITE_TILE_WIDTH", 160),
+        ):
+            yield media
+
+    async def test_video_gets_sprite_and_vtt(
+        self, client: httpx.AsyncClient, sprite_video
+    ):
+        data = await _upload_video(client)
+        resource = await _wait_for_status(data["id"], "ready")
+        assert resource.sprite_count == 13
+        assert resource.sprite_columns == 5
+        assert resource.sprite_interval == 10
+
+        resp = await client.get(f"/api/resources/{data['id']}/sprite.jpg")
+        assert resp.status_code == 200
+        resp = await client.get(f"/api/resources/{data['id']}/sprite.vtt")
+        assert resp.headers["content-type"].startswith("text/vtt")
+        lines = resp.text.splitlines()
+        assert lines[:5] == [
+            "WEBVTT",
+            "",
+            "00:00:00.000 --> 00:00:10.000",
+            "sprite.jpg#xywh=0,0,160,90",
+            "",
+        ]
+        assert lines[-2:] == [
+            "00:02:00.000 --> 00:02:10.000",
+            "sprite.jpg#xywh=320,180,160,90",
+        ]
+
+    async def test_long_video_interval_is_stretched(
+        self, client: httpx.AsyncClient, sprite_video
+    ):
+        probe = ProbeResult(None, None, None, duration=7200.0, width=0, height=0)
+        with (
+            patch("app.routers.thumbnails.probe_video", return_value=probe),
+            patch("app.routers.thumbnails.SPRITE_MAX_TILES", 100),
+        ):
+            data = await _upload_video(client)
+            resource = await _wait_for_status(data["id"], "ready")
+        assert resource.sprite_interval == 72
+        assert resource.sprite_count == 100
+
+    async def test_sprite_failure_keeps_thumbnail(
+        self, client: httpx.AsyncClient, sprite_video
+    ):
+        with patch("app.routers.thumbnails.probe_video", return_value=None):
+            data = await _upload_video(client)
+            resource = await _wait_for_status(data["id"], "ready")
+        assert resource.thumbnail is not None
+        assert resource.sprite is None
+        assert resource.sprite_count == 0
+        resp = await client.get(f"/api/resources/{data['id']}/sprite.vtt")
+        assert resp.status_code == 404
+
+    async def test_set_thumbnail_from_sprite_skips_ffmpeg(
+        self, client: httpx.AsyncClient, sprite_video
+    ):
+        media_dir, thumb_dir = sprite_video
+        data = await _upload_video(client)
+        await _wait_for_status(data["id"], "ready")
+
+        with (
+            patch("app.routers.resources.MEDIA_DIR", media_dir),
+            patch("app.routers.thumbnails.extract_frame") as extract,
+        ):
+            resp = await client.post(
+                f"/api/resources/{data['id']}/thumbnail",
+                json={"timestamp": 73.5, "from_sprite": True},
+            )
+        assert resp.status_code == 200, resp.text
+        extract.assert_not_called()
+        body = resp.json()
+        # Tiles are 160px wide, so no larger width is rendered
+        assert body["thumbnail_widths"] == [160]
+        with Image.open(shard_path(thumb_dir, body["thumbnail"])) as thumb:
+            assert thumb.size == (160, 90)
+            # Tile 7 of the fake sheet is filled with grey level 70
+            assert abs(thumb.convert("L").getpixel((80, 45)) - 70) <= 3
+
+    async def test_backfill_renders_sprite_only(self, db: AsyncSession, sprite_video):
+        media_dir, _ = sprite_video
+        source = shard_path(media_dir, "picked.mp4")
+        source.parent.mkdir(parents=True)
+        source.write_bytes(b"video")
+        # Thumbnail chosen with set_thumbnail before sprites existed
+        db.add(
+            Resource(
+                category="video",
+                filename="picked.mp4",
+                thumbnail="picked_thumb_320.webp",
+                thumbnail_status="ready",
+                thumbnail_widths=[160, 320],
+            )
+        )
+        await db.commit()
+
+        queued = []
+        with (
+            patch("app.routers.thumbnails.enqueue_thumbnail", queued.append),
+            patch("app.routers.thumbnails.extract_frame") as extract,
+        ):
+            await thumbnails.backfill_thumbnails()
+            await thumbnails.backfill_sprites()
+        assert queued == []
+        extract.assert_not_called()
+
+        resource = await db.scalar(select(Resource))
+        await db.refresh(resource)
+        assert resource.thumbnail == "picked_thumb_320.webp"
+        assert resource.thumbnail_widths == [160, 320]
+        assert resource.thumbnail_status == "ready"
+        assert resource.sprite_count == 13
+
+
+class TestPlaceholders:
+    async def test_listing_includes_inline_placeholder(
+        self, client: httpx.AsyncClient, media
+    ):
+        buf = io.BytesIO()
+        Image.new("RGB", (1200, 800), (200, 30, 30)).save(buf, format="JPEG")
+        resp = await client.post(
+            "/api/resources/upload",
+            files={"file": ("photo.jpg", buf.getvalue(), "image/jpeg")},
+        )
+        await _wait_for_status(resp.json()["id"], "ready")
+
+        resp = await client.get("/api/resources")
+        placeholder = resp.json()["items"][0]["placeholder"]
+        assert placeholder.startswith("data:image/webp;base64,")
+        assert len(placeholder) < 250
+        data = base64.b64decode(placeholder.split(",", 1)[1])
+        with Image.open(io.BytesIO(data)) as img:
+            assert img.size == (16, 11)
+            r, g, b = img.convert("RGB").getpixel((8, 5))
+            assert r > 150 and g < 80 and b < 80
+
+    async def test_backfill_fills_missing_placeholders(self, db: AsyncSession, media):
+        _, thumb_dir = media
+        for stem in ("a", "b"):
+            path = shard_path(thumb_dir, f"{stem}_thumb_160.webp")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            Image.new("RGB", (160, 90), "blue").save(path)
+        db.add_all(
+            [
+                Resource(
+                    category="image",
+                    filename=f"{stem}.jpg",
+                    thumbnail=f"{stem}_thumb_160.webp",
+                    thumbnail_status="ready",
+                    thumbnail_widths=[160],
+                )
+                for stem in ("a", "b")
+            ]
+            + [
+                Resource(category="image", filename="legacy.jpg", thumbnail="x.jpg"),
+                # Its variant file is gone
+                Resource(
+                    category="image",
+                    filename="lost.jpg",
+                    thumbnail="lost_thumb_160.webp",
+                    thumbnail_status="ready",
+                    thumbnail_widths=[160],
+                ),
+                Resource(
+                    category="image",
+                    filename="trashed.jpg",
+                    thumbnail="a_thumb_160.webp",
+                    thumbnail_status="ready",
+                    thumbnail_widths=[160],
+                    deleted_at=datetime.now(UTC),
+                ),
+            ]
+        )
+        await db.commit()
+
+        await thumbnails.backfill_placeholders(batch_size=1)
+
+        result = await db.execute(
+            select(Resource.filename, Resource.placeholder).order_by(Resource.id)
+        )
+        rows = result.all()
+        assert [name for name, p in rows if p and p.startswith("data:")] == [
+            "a.jpg",
+            "b.jpg",
+        ]
+        # Single-size legacy thumbnails get one when re-rendered as a pyramid
+        assert rows[2:] == [
+            ("legacy.jpg", None),
+            ("lost.jpg", ""),
+            ("trashed.jpg", None),
+        ]
+
+        # Nothing is decoded again on the next startup
+        with patch("app.routers.thumbnails.make_placeholder") as make:
+            await thumbnails.backfill_placeholders()
+        make.assert_not_called()
+
+    async def test_remove_thumbnail_clears_placeholder(
+        self, client: httpx.AsyncClient, db: AsyncSession
+    ):
+        resource = Resource(
+            category="image", filename="a.jpg", placeholder="data:image/webp;base64,"
+        )
+        db.add(resource)
+        await db.commit()
+        resp = await client.delete(f"/api/resources/{resource.id}/thumbnail")
+        assert resp.json()["placeholder"] is None
+
+    def test_make_placeholder_returns_none_for_undecodable_file(self, tmp_path: Path):
+        source = tmp_path / "broken.webp"
+        source.write_bytes(b"RIFF")
+        assert make_placeholder(source) is None
+
+
+class TestProbeMetadata:
+    async def test_worker_stores_probe_result(self, client: httpx.AsyncClient, media):
+        probe = ProbeResult("hevc", "aac", "matroska,webm", 95.5, 3840, 2160)
+        with (
+            patch("app.routers.thumbnails.extract_frame", _fake_extract),
+            patch(
+                "app.routers.thumbnails.probe_video", return_value=probe
+            ) as probe_video,
+        ):
+            data = await _upload_video(client)
+            await _wait_for_status(data["id"], "ready")
+        probe_video.assert_awaited_once()
+
+        resp = await client.get(f"/api/resources/{data['id']}")
+        body = resp.json()
+        assert body["duration"] == 95.5
+        assert (body["width"], body["height"]) == (3840, 2160)
+        assert body["video_codec"] == "hevc"
+        assert body["audio_codec"] == "aac"
+        assert body["container"] == "matroska,webm"
+
+    async def test_image_size_read_from_header(self, client: httpx.AsyncClient, media):
+        buf = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # displayed rotated
+        Image.new("RGB", (400, 300)).save(buf, format="JPEG", exif=exif)
+        resp = await client.post(
+            "/api/resources/upload",
+            files={"file": ("photo.jpg", buf.getvalue(), "image/jpeg")},
+        )
+        resource = await _wait_for_status(resp.json()["id"], "ready")
+        assert (resource.width, resource.height) == (300, 400)
+        assert resource.duration is None
+        assert resource.probed_at is not None
+
+    async def test_convert_reuses_stored_probe(
+        self, client: httpx.AsyncClient, db: AsyncSession, media
+    ):
+        media_dir, _ = media
+        source = shard_path(media_dir, "abc.mkv")
+        source.parent.mkdir(parents=True)
+        source.write_bytes(b"mkv")
+        resource = Resource(
+            category="video",
+            filename="abc.mkv",
+            video_codec="h264",
+            audio_codec="aac",
+            probed_at=datetime.now(UTC),
+        )
+        db.add(resource)
+        await db.commit()
+
+        async def remux(src, dest):
+            dest.write_bytes(b"mp4")
+            return True
+
+        with (
+            patch("app.routers.convert.MEDIA_DIR", media_dir),
+            patch("app.routers.convert.remux_to_mp4", remux),
+            patch("app.routers.convert.transcode_to_mp4") as transcode,
+            patch("app.routers.thumbnails.probe_video") as probe_video,
+            patch("app.routers.convert.enqueue_thumbnail"),
+        ):
+            resp = await client.post(f"/api/convert/{resource.id}/mp4", json={})
+        assert resp.status_code == 200, resp.text
+        probe_video.assert_not_called()
+        transcode.assert_not_called()
+        assert resp.json()["thumbnail_status"] == "pending"
+
+    async def test_backfill_probes_unprobed_media(self, db: AsyncSession, media):
+        media_dir, _ = media
+        for name in ("a.mp4", "b.png"):
+            path = shard_path(media_dir, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+        shard_path(media_dir, "a.mp4").write_bytes(b"video")
+        Image.new("RGB", (64, 32)).save(shard_path(media_dir, "b.png"))
+        db.add_all(
+            [
+                Resource(category="video", filename="a.mp4"),
+                Resource(category="image", filename="b.png"),
+            ]
+        )
+        await db.commit()
+
+        probe = ProbeResult("h264", None, "mov", 12.0, 640, 360)
+        with patch("app.routers.thumbnails.probe_video", return_value=probe):
+            await thumbnails.backfill_probes(batch_size=1)
+
+        result = await db.execute(
+            select(Resource.duration, Resource.width, Resource.height).order_by(
+                Resource.id
+            )
+        )
+        assert result.all() == [(12.0, 640, 360), (None, 64, 32)]
+
+
+class TestCropTile:
+    def test_crops_tile_by_index(self, tmp_path: Path):
+        sheet = tmp_path / "sheet.png"
+        img = Image.new("RGB", (300, 200))
+        img.paste((255, 0, 0), (200, 100, 300, 200))
+        img.save(sheet)
+        output = tmp_path / "tile.png"
+        assert crop_tile(sheet, output, 5, columns=3, rows=2)
+        with Image.open(output) as tile:
+            assert tile.size == (100, 100)
+            assert tile.getpixel((50, 50)) == (255, 0, 0)
+
+
+class TestMakeThumbnails:
+    def test_jpeg_is_reduced_while_decoding(self, tmp_path: Path):
+        source = tmp_path / "big.jpg"
+        Image.new("RGB", (4000, 3000), "blue").save(source)
+        outputs = {w: tmp_path / f"thumb_{w}.jpg" for w in (160, 320)}
+
+        drafts = []
+        original = JpegImagePlugin.JpegImageFile.draft
+
+        def draft(self, mode, size):
+            result = original(self, mode, size)
+            drafts.append(self.size)
+            return result
+
+        with patch.object(JpegImagePlugin.JpegImageFile, "draft", draft):
+            assert make_thumbnails(source, outputs) == [160, 320]
+        # libjpeg decoded at 1/8 scale instead of the full 12 megapixels
+        assert drafts == [(500, 375)]
+        for width, path in outputs.items():
+            with Image.open(path) as thumb:
+                assert thumb.size == (width, width * 3 // 4)
+
+    def test_draft_accounts_for_exif_rotation(self, tmp_path: Path):
+        source = tmp_path / "portrait.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees: displayed as 3000x4000
+        Image.new("RGB", (4000, 3000), "blue").save(source, exif=exif)
+        output = tmp_path / "thumb.webp"
+
+        assert make_thumbnails(source, {1280: output}) == [1280]
+        with Image.open(output) as thumb:
+            assert thumb.size == (1280, 1707)
+
+    def test_transparent_png_to_jpeg(self, tmp_path: Path):
+        source = tmp_path / "alpha.png"
+        Image.new("RGBA", (100, 50), (0, 0, 0, 0)).save(source)
+        output = tmp_path / "thumb.jpg"
+        assert make_thumbnails(source, {40: output}) == [40]
+        with Image.open(output) as thumb:
+            assert thumb.mode == "RGB"
+            assert thumb.size == (40, 20)
+
+    def test_image_narrower_than_every_width(self, tmp_path: Path):
+        source = tmp_path / "tiny.png"
+        Image.new("RGB", (64, 64)).save(source)
+        outputs = {w: tmp_path / f"thumb_{w}.webp" for w in (160, 320)}
+        assert make_thumbnails(source, outputs) == [160]
+        with Image.open(outputs[160]) as thumb:
+            assert thumb.size == (64, 64)
+        assert not outputs[320].exists()
+
+    def test_returns_empty_for_undecodable_file(self, tmp_path: Path):
+        source = tmp_path / "broken.png"
+        source.write_bytes(b"\x89PNG not really")
+        assert make_thumbnails(source, {160: tmp_path / "thumb.webp"}) == []